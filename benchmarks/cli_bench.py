@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+CLI Benchmark
+Measures wall time, peak RSS and import time of every cartridge_cli.py subcommand against
+synthetic cartridges of increasing size, and optionally compares the results against a stored baseline.
+
+Usage:
+    python benchmarks/cli_bench.py --output bench.json
+    python benchmarks/cli_bench.py --sizes 10,100 --commands list,add-wiki --baseline bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CLI_PATH = REPO_ROOT / 'cartridge_cli.py'
+sys.path.insert(0, str(REPO_ROOT))
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+
+# Item types cycled through when building a synthetic cartridge
+ITEM_KINDS = ('wiki', 'assignment', 'quiz', 'discussion', 'file')
+
+# Arguments of each subcommand after the cartridge path. Targets are items every synthetic cartridge has:
+# the first item of each kind lives in "Module 1", and "Module 2" is always there to copy into
+COMMANDS = {
+    'create': ['--title', 'Bench Course', '--code', 'BENCH'],
+    'add-module': ['--title', 'Bench Module'],
+    'add-wiki': ['--module', 'Module 1', '--title', 'Bench Wiki', '--content', 'Bench content'],
+    'add-assignment': ['--module', 'Module 1', '--title', 'Bench Assignment', '--content', 'Bench content'],
+    'add-quiz': ['--module', 'Module 1', '--title', 'Bench Quiz', '--description', 'Bench description'],
+    'add-discussion': ['--module', 'Module 1', '--title', 'Bench Discussion', '--description', 'Bench description'],
+    'add-file': ['--module', 'Module 1', '--filename', 'bench-file.txt', '--content', 'Bench content'],
+    'list': ['--json'],
+    'update-wiki': ['--title', 'Wiki 1-0', '--content', 'Updated content'],
+    'update-assignment': ['--title', 'Assignment 1-1', '--content', 'Updated content'],
+    'update-quiz': ['--title', 'Quiz 1-2', '--description', 'Updated description'],
+    'update-discussion': ['--title', 'Discussion 1-3', '--content', 'Updated content'],
+    'update-file': ['--filename', 'file-1-4.txt', '--content', 'Updated content'],
+    'update-module': ['--title', 'Module 1', '--new-title', 'Module 1 Renamed'],
+    'copy-wiki': ['--title', 'Wiki 1-0', '--target-module', 'Module 2'],
+    'copy-assignment': ['--title', 'Assignment 1-1', '--target-module', 'Module 2'],
+    'copy-quiz': ['--title', 'Quiz 1-2', '--target-module', 'Module 2'],
+    'copy-discussion': ['--title', 'Discussion 1-3', '--target-module', 'Module 2'],
+    'copy-file': ['--filename', 'file-1-4.txt', '--target-module', 'Module 2'],
+    'delete-wiki': ['--title', 'Wiki 1-0'],
+    'delete-assignment': ['--title', 'Assignment 1-1'],
+    'delete-quiz': ['--title', 'Quiz 1-2'],
+    'delete-discussion': ['--title', 'Discussion 1-3'],
+    'delete-file': ['--filename', 'file-1-4.txt'],
+    'delete-module': ['--title', 'Module 1'],
+    'display-wiki': ['--title', 'Wiki 1-0'],
+    'display-assignment': ['--title', 'Assignment 1-1'],
+    'display-quiz': ['--title', 'Quiz 1-2'],
+    'display-discussion': ['--title', 'Discussion 1-3'],
+    'display-file': ['--filename', 'file-1-4.txt'],
+    'package': []
+}
+
+# Subcommands that leave the cartridge untouched, so their runs can share one copy of the fixture
+READ_ONLY_COMMANDS = {'list', 'display-wiki', 'display-assignment', 'display-quiz',
+                      'display-discussion', 'display-file', 'package'}
+
+# Metrics compared against the baseline
+COMPARED_METRICS = ('wall_s', 'max_rss_kb', 'import_ms')
+
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def build_fixture(cartridge_path, items):
+    """
+    Build a synthetic cartridge with the given number of module items.
+
+    Args:
+        cartridge_path (Path): Directory to create the cartridge in
+        items (int): Number of module items, spread over items // 10 modules (at least 2)
+    """
+    from cartridge_engine import CartridgeGenerator
+
+    generator = CartridgeGenerator('Bench Course', 'BENCH', verbose=False)
+    generator.create_base_cartridge(str(cartridge_path))
+
+    # Build everything in memory and write the cartridge out once at the end
+    generator.output_dir = None
+    module_count = max(2, items // 10)
+    module_ids = [generator.add_module(f"Module {m}", position=m) for m in range(1, module_count + 1)]
+
+    for i in range(items):
+        m = i % module_count
+        module_id = module_ids[m]
+        n = i // module_count
+        kind = ITEM_KINDS[n % len(ITEM_KINDS)]
+        label = f"{m + 1}-{n}"
+        if kind == 'wiki':
+            generator.add_wiki_page_to_module(module_id, f"Wiki {label}", page_content=f"<p>Page {label}</p>")
+        elif kind == 'assignment':
+            generator.add_assignment_to_module(module_id, f"Assignment {label}", assignment_content=f"Do {label}")
+        elif kind == 'quiz':
+            generator.add_quiz_to_module(module_id, f"Quiz {label}", quiz_description=f"Quiz {label}")
+        elif kind == 'discussion':
+            generator.add_discussion_to_module(module_id, f"Discussion {label}", f"Discuss {label}")
+        else:
+            generator.add_file_to_module(module_id, f"file-{label}.txt", f"File {label}")
+
+    generator.output_dir = str(cartridge_path)
+    generator._update_cartridge_state()
+
+
+def prime_scan_index(cartridge_path):
+    """Scan a cartridge once so its .cc_index is in place, as it is after the first edit of a course"""
+    from cartridge_engine.replicator import scan_cartridge_entries
+    scan_cartridge_entries(str(cartridge_path), use_index=True, lazy=True)
+
+
+def parse_import_times(stderr):
+    """
+    Parse the -X importtime report of a run.
+
+    Returns:
+        dict: Total import time in ms and the slowest top-level imports
+    """
+    top_level = []
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative_us, indent, name = int(match.group(2)), match.group(3), match.group(4)
+        # Nested imports are indented by two spaces per level under their importer
+        if len(indent) <= 1:
+            top_level.append((name, cumulative_us))
+
+    top_level.sort(key=lambda entry: entry[1], reverse=True)
+    return {
+        'import_ms': round(sum(us for _, us in top_level) / 1000, 3),
+        'top_imports': [{'module': name, 'ms': round(us / 1000, 3)} for name, us in top_level[:10]]
+    }
+
+
+def run_cli(argv, cwd, import_time=False):
+    """
+    Run cartridge_cli.py once in a child process.
+
+    Returns:
+        dict: Wall time, peak RSS, exit code and, with import_time, the stderr of the run
+    """
+    command = [sys.executable]
+    if import_time:
+        command += ['-X', 'importtime']
+    command += [str(CLI_PATH)] + argv
+
+    # Commands run in the child itself, a running daemon would answer them from its warm cartridges
+    env = dict(os.environ, CARTRIDGE_CLI_NO_DAEMON='1')
+
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    stderr = process.stderr.read()
+    process.stderr.close()
+    # wait4 reaps the child with its resource usage, Popen.wait would lose ru_maxrss
+    _, status, usage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    max_rss_kb = usage.ru_maxrss
+    if sys.platform == 'darwin':
+        # macOS reports bytes instead of kilobytes
+        max_rss_kb //= 1024
+
+    return {
+        'wall_s': wall,
+        'max_rss_kb': max_rss_kb,
+        'exit_code': process.returncode,
+        'stderr': stderr.decode('utf-8', errors='replace')
+    }
+
+
+def bench_command(command, fixture_path, workdir, repeat, cold):
+    """Benchmark one subcommand against one fixture, each run on its own copy unless it is read-only"""
+    shared_copy = None
+    runs = []
+    rss = []
+    exit_codes = set()
+    import_report = None
+
+    # One extra run under -X importtime, kept out of the timings since it slows imports down
+    for attempt in range(repeat + 1):
+        import_time = attempt == repeat
+
+        if command == 'create':
+            target = workdir / f"create-{attempt}"
+            shutil.rmtree(target, ignore_errors=True)
+        elif command in READ_ONLY_COMMANDS and shared_copy is not None:
+            target = shared_copy
+        else:
+            target = workdir / f"{command}-{attempt}"
+            shutil.rmtree(target, ignore_errors=True)
+            shutil.copytree(fixture_path, target, symlinks=True)
+            if cold:
+                shutil.rmtree(target / '.cc_index', ignore_errors=True)
+            if command in READ_ONLY_COMMANDS:
+                shared_copy = target
+
+        result = run_cli([command, str(target)] + COMMANDS[command], workdir, import_time=import_time)
+        exit_codes.add(result['exit_code'])
+        if import_time:
+            import_report = parse_import_times(result['stderr'])
+        else:
+            runs.append(result['wall_s'])
+            rss.append(result['max_rss_kb'])
+
+        if target != shared_copy:
+            shutil.rmtree(target, ignore_errors=True)
+
+    if shared_copy is not None:
+        shutil.rmtree(shared_copy, ignore_errors=True)
+        zip_path = shared_copy.with_name(shared_copy.name + '.zip')
+        if zip_path.exists():
+            zip_path.unlink()
+
+    return {
+        'command': command,
+        'wall_s': round(statistics.median(runs), 4),
+        'runs': [round(run, 4) for run in runs],
+        'max_rss_kb': max(rss),
+        'import_ms': import_report['import_ms'],
+        'top_imports': import_report['top_imports'],
+        'exit_code': max(exit_codes, key=abs)
+    }
+
+
+def compare_results(results, baseline, threshold):
+    """
+    Compare results against a baseline report.
+
+    Returns:
+        list: A regression entry for every metric that grew past threshold times its baseline value
+    """
+    baseline_results = {(entry['command'], entry['items']): entry for entry in baseline.get('results', [])}
+    regressions = []
+    for entry in results:
+        previous = baseline_results.get((entry['command'], entry['items']))
+        if previous is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = previous.get(metric), entry.get(metric)
+            if not old or new is None:
+                continue
+            ratio = new / old
+            entry.setdefault('baseline', {})[metric] = old
+            if ratio > threshold:
+                regressions.append({
+                    'command': entry['command'],
+                    'items': entry['items'],
+                    'metric': metric,
+                    'baseline': old,
+                    'current': new,
+                    'ratio': round(ratio, 3)
+                })
+    return regressions
+
+
+def main():
+    """Main benchmark entry point"""
+    parser = argparse.ArgumentParser(description='Benchmark cartridge_cli.py subcommands')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='Comma separated numbers of items per synthetic cartridge (default: 10,100,1000,10000)')
+    parser.add_argument('--commands', help='Comma separated subcommands to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per subcommand and size (default: 3)')
+    parser.add_argument('--cold', action='store_true', help='Remove the .cc_index of each copy so every run scans from scratch')
+    parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+    parser.add_argument('--baseline', help='JSON report of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='Ratio over the baseline that counts as a regression (default: 1.2)')
+    parser.add_argument('--workdir', help='Directory for fixtures and copies (default: a temporary directory)')
+    parser.add_argument('--keep', action='store_true', help='Keep the fixtures after the run')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    commands = list(COMMANDS) if not args.commands else [command.strip() for command in args.commands.split(',')]
+    unknown = [command for command in commands if command not in COMMANDS]
+    if unknown:
+        print(f"Error: Unknown subcommands: {', '.join(unknown)}", file=sys.stderr)
+        return 1
+    if args.repeat < 1:
+        print("Error: --repeat must be at least 1", file=sys.stderr)
+        return 1
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix='cli_bench_')).resolve()
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    try:
+        for items in sizes:
+            fixture_path = workdir / f"fixture-{items}"
+            if not fixture_path.exists():
+                print(f"Building fixture with {items} items...", file=sys.stderr)
+                start = time.perf_counter()
+                build_fixture(fixture_path, items)
+                if not args.cold:
+                    prime_scan_index(fixture_path)
+                print(f"  built in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+            for command in commands:
+                entry = bench_command(command, fixture_path, workdir, args.repeat, args.cold)
+                entry['items'] = items
+                results.append(entry)
+                status = '' if entry['exit_code'] == 0 else f" (exit code {entry['exit_code']})"
+                print(f"  {items:>6} {command:<20} {entry['wall_s']:.3f}s  {entry['max_rss_kb'] / 1024:.1f}MB  "
+                      f"imports {entry['import_ms']:.1f}ms{status}", file=sys.stderr)
+    finally:
+        if not args.keep and not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'repeat': args.repeat,
+        'cold': args.cold,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.threshold)
+        report['threshold'] = args.threshold
+        report['regressions'] = regressions
+        for regression in regressions:
+            print(f"Regression: {regression['command']} ({regression['items']} items) {regression['metric']} "
+                  f"{regression['baseline']} -> {regression['current']} (x{regression['ratio']})", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,15 +4,75 @@ Command Line Interface for Canvas Common Cartridge Generator
 """
 
 import argparse
+import base64
+import os
 import sys
 from pathlib import Path
-import shutil
-import base64
-from cartridge_engine import CartridgeGenerator
+
+# The engine is imported by the functions that use it, so forwarding a command line to a running daemon
+# does not pay for it
+
+# Commands that cannot be an operation of a batch run
+UNBATCHED_COMMANDS = {'create', 'batch', 'serve'}
+
+# Options of the batch commands that are switched on by their presence instead of taking a value,
+# the store_true options defined in create_parser
+BATCH_FLAGS = {
+    'list': {'--json'},
+    'update-wiki': {'--encode-base64', '--decode-base64'}
+}
+
+# Commands always run by this process instead of being forwarded to a running daemon
+LOCAL_COMMANDS = {'serve'}
+
+# Unix socket of the engine daemon, and the variable that turns off forwarding to it
+# It lives in $TMPDIR or /tmp, where tempfile.gettempdir() looks first, without importing tempfile
+DAEMON_SOCKET = os.environ.get(
+    'CARTRIDGE_CLI_SOCKET', os.path.join(os.environ.get('TMPDIR') or '/tmp', f"cartridge-cli-{os.getuid()}.sock"))
+NO_DAEMON_ENV = 'CARTRIDGE_CLI_NO_DAEMON'
+
+# Variable naming a blob store directory, binary files of the cartridges are then deduplicated through it
+BLOB_STORE_ENV = 'CARTRIDGE_BLOB_STORE'
+
+# Generator shared by the operations of a batch run, so the cartridge is only hydrated once
+_batch_generator = None
+
+# Hydrated generators kept warm by the daemon between requests
+_daemon_service = None
+
+
+def blob_store_from_env():
+    """Get the blob store named by BLOB_STORE_ENV, or None if it is not set"""
+    from cartridge_engine.blob_store import BlobStore
+    
+    store_dir = os.environ.get(BLOB_STORE_ENV)
+    return BlobStore(os.path.abspath(store_dir)) if store_dir else None
+
+
+def load_cartridge(cartridge_name):
+    """Get the hydrated generator of an existing cartridge, or None if it cannot be loaded"""
+    from cartridge_engine import CartridgeGenerator
+    
+    if _batch_generator is not None:
+        return _batch_generator
+    
+    if _daemon_service is not None:
+        try:
+            return _daemon_service.get_generator(cartridge_name)
+        except ValueError:
+            return None
+    
+    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
+    generator.blob_store = blob_store_from_env()
+    if not generator.hydrate_from_existing_cartridge(cartridge_name):
+        return None
+    return generator
 
 
 def create_cartridge(args):
     """Create a new cartridge"""
+    from cartridge_engine import CartridgeGenerator
+    
     cartridge_path = Path(args.cartridge_name)
     
     if cartridge_path.exists():
@@ -29,7 +89,7 @@ def create_cartridge(args):
     print(f"✓ Cartridge '{args.cartridge_name}' created successfully")
     print(f"  Title: {args.title}")
     print(f"  Code: {args.code}")
-    print(f"  Components: {len(generator.df)}")
+    print(f"  Components: {len(generator.graph)}")
     
     return 0
 
@@ -43,8 +103,8 @@ def add_module(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
@@ -56,7 +116,7 @@ def add_module(args):
     print(f"  Module ID: {module_id}")
     print(f"  Position: {args.position}")
     print(f"  Published: {args.published}")
-    print(f"  Total components: {len(generator.df)}")
+    print(f"  Total components: {len(generator.graph)}")
     
     return 0
 
@@ -70,26 +130,20 @@ def add_wiki(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
     # Find module by title
     try:
-        module_row = generator.df[(generator.df["type"] == "module") & (generator.df["title"] == args.module)]
-        if module_row.empty:
-            print(f"Error: Module '{args.module}' not found in cartridge")
-            print("Available modules:")
-            modules = generator.df[generator.df["type"] == "module"]["title"].tolist()
-            for module in modules:
-                print(f"  - {module}")
-            return 1
-        
-        module_id = module_row.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding module: {e}")
+        module_id = generator.find_module_id(args.module)
+    except ValueError:
+        print(f"Error: Module '{args.module}' not found in cartridge")
+        print("Available modules:")
+        all_modules = generator.list_titles('module')
+        for module in all_modules:
+            print(f"  - {module}")
         return 1
     
     # Add wiki page to module
@@ -99,7 +153,7 @@ def add_wiki(args):
     print(f"✓ Wiki page '{args.title}' added successfully")
     print(f"  Module: {args.module}")
     print(f"  Content length: {len(args.content)} characters")
-    print(f"  Total components: {len(generator.df)}")
+    print(f"  Total components: {len(generator.graph)}")
     
     return 0
 
@@ -113,26 +167,20 @@ def add_assignment(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
     # Find module by title
     try:
-        module_row = generator.df[(generator.df["type"] == "module") & (generator.df["title"] == args.module)]
-        if module_row.empty:
-            print(f"Error: Module '{args.module}' not found in cartridge")
-            print("Available modules:")
-            modules = generator.df[generator.df["type"] == "module"]["title"].tolist()
-            for module in modules:
-                print(f"  - {module}")
-            return 1
-        
-        module_id = module_row.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding module: {e}")
+        module_id = generator.find_module_id(args.module)
+    except ValueError:
+        print(f"Error: Module '{args.module}' not found in cartridge")
+        print("Available modules:")
+        all_modules = generator.list_titles('module')
+        for module in all_modules:
+            print(f"  - {module}")
         return 1
     
     # Add assignment to module
@@ -143,7 +191,7 @@ def add_assignment(args):
     print(f"  Module: {args.module}")
     print(f"  Points: {args.points}")
     print(f"  Content length: {len(args.content)} characters")
-    print(f"  Total components: {len(generator.df)}")
+    print(f"  Total components: {len(generator.graph)}")
     
     return 0
 
@@ -157,26 +205,20 @@ def add_quiz(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
     # Find module by title
     try:
-        module_row = generator.df[(generator.df["type"] == "module") & (generator.df["title"] == args.module)]
-        if module_row.empty:
-            print(f"Error: Module '{args.module}' not found in cartridge")
-            print("Available modules:")
-            modules = generator.df[generator.df["type"] == "module"]["title"].tolist()
-            for module in modules:
-                print(f"  - {module}")
-            return 1
-        
-        module_id = module_row.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding module: {e}")
+        module_id = generator.find_module_id(args.module)
+    except ValueError:
+        print(f"Error: Module '{args.module}' not found in cartridge")
+        print("Available modules:")
+        all_modules = generator.list_titles('module')
+        for module in all_modules:
+            print(f"  - {module}")
         return 1
     
     # Add quiz to module
@@ -187,7 +229,7 @@ def add_quiz(args):
     print(f"  Module: {args.module}")
     print(f"  Points: {args.points}")
     print(f"  Description length: {len(args.description)} characters")
-    print(f"  Total components: {len(generator.df)}")
+    print(f"  Total components: {len(generator.graph)}")
     
     return 0
 
@@ -201,26 +243,20 @@ def add_discussion(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
     # Find module by title
     try:
-        module_row = generator.df[(generator.df["type"] == "module") & (generator.df["title"] == args.module)]
-        if module_row.empty:
-            print(f"Error: Module '{args.module}' not found in cartridge")
-            print("Available modules:")
-            modules = generator.df[generator.df["type"] == "module"]["title"].tolist()
-            for module in modules:
-                print(f"  - {module}")
-            return 1
-        
-        module_id = module_row.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding module: {e}")
+        module_id = generator.find_module_id(args.module)
+    except ValueError:
+        print(f"Error: Module '{args.module}' not found in cartridge")
+        print("Available modules:")
+        all_modules = generator.list_titles('module')
+        for module in all_modules:
+            print(f"  - {module}")
         return 1
     
     # Add discussion to module
@@ -230,7 +266,7 @@ def add_discussion(args):
     print(f"✓ Discussion '{args.title}' added successfully")
     print(f"  Module: {args.module}")
     print(f"  Description length: {len(args.description)} characters")
-    print(f"  Total components: {len(generator.df)}")
+    print(f"  Total components: {len(generator.graph)}")
     
     return 0
 
@@ -244,36 +280,42 @@ def add_file(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
     # Find module by title
     try:
-        module_row = generator.df[(generator.df["type"] == "module") & (generator.df["title"] == args.module)]
-        if module_row.empty:
-            print(f"Error: Module '{args.module}' not found in cartridge")
-            print("Available modules:")
-            modules = generator.df[generator.df["type"] == "module"]["title"].tolist()
-            for module in modules:
-                print(f"  - {module}")
-            return 1
-        
-        module_id = module_row.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding module: {e}")
+        module_id = generator.find_module_id(args.module)
+    except ValueError:
+        print(f"Error: Module '{args.module}' not found in cartridge")
+        print("Available modules:")
+        all_modules = generator.list_titles('module')
+        for module in all_modules:
+            print(f"  - {module}")
+        return 1
+    
+    if args.source is not None and not Path(args.source).is_file():
+        print(f"Error: Source file '{args.source}' does not exist")
         return 1
     
-    # Add file to module
+    # Add file to module, a source file is streamed in as is
     print(f"Adding file '{args.filename}' to module '{args.module}' in cartridge '{args.cartridge_name}'")
-    generator.add_file_to_module(module_id, args.filename, args.content, position=None)
+    if args.source is not None:
+        with open(args.source, 'rb') as source:
+            file_id = generator.add_file_to_module(module_id, args.filename, source, position=None)
+    else:
+        file_id = generator.add_file_to_module(module_id, args.filename, args.content, position=None)
     
     print(f"✓ File '{args.filename}' added successfully")
     print(f"  Module: {args.module}")
-    print(f"  Content length: {len(args.content)} characters")
-    print(f"  Total components: {len(generator.df)}")
+    if args.source is not None:
+        file_info = next(f for f in generator.files if f['identifier'] == file_id)
+        print(f"  Size: {file_info.get('size', len(file_info['content'] or ''))} bytes")
+    else:
+        print(f"  Content length: {len(args.content)} characters")
+    print(f"  Total components: {len(generator.graph)}")
     
     return 0
 
@@ -282,6 +324,8 @@ def list_cartridge(args):
     """List contents of an existing cartridge"""
     import json
     import xml.etree.ElementTree as ET
+    from cartridge_engine.cartridge_listing import read_cartridge_listing
+    from cartridge_engine.course_catalog import CONTENT_TYPE_NAMES, resource_content_type
     
     cartridge_path = Path(args.cartridge_name)
     
@@ -292,28 +336,36 @@ def list_cartridge(args):
             print(f"Error: Cartridge '{args.cartridge_name}' does not exist")
         return 1
     
+    if hasattr(args, 'json') and args.json:
+        # Only the manifest and course settings are read, content files are never opened
+        try:
+            listing = read_cartridge_listing(args.cartridge_name)
+        except (OSError, ET.ParseError) as e:
+            print(json.dumps({"error": f"Failed to load existing cartridge: {e}"}))
+            return 1
+        output_data = {'cartridge_name': args.cartridge_name, **listing}
+        print(json.dumps(output_data, indent=2))
+        return 0
+    
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
-        if hasattr(args, 'json') and args.json:
-            print(json.dumps({"error": "Failed to load existing cartridge"}))
-        else:
-            print("Failed to load existing cartridge")
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
+        print("Failed to load existing cartridge")
         return 1
     
     # Get summary
     summary = generator.get_hydration_summary()
     
-    # Build module structure for both JSON and text output
+    # Build module structure for the text output
     modules_data = []
-    modules = generator.df[generator.df["type"] == "module"]
+    modules = generator.graph.of_type("module")
     
-    if not modules.empty:
+    if modules:
         # Parse organization structure from manifest to get proper module-item hierarchy
-        manifest_row = generator.df[generator.df["type"] == "manifest"]
-        if not manifest_row.empty:
+        manifest_row = generator.graph.first("manifest")
+        if manifest_row is not None:
             try:
-                manifest_xml = manifest_row.iloc[0]['xml_content']
+                manifest_xml = manifest_row.xml_content
                 root = ET.fromstring(manifest_xml)
                 
                 # Find LearningModules organization
@@ -343,8 +395,8 @@ def list_cartridge(args):
                             module_items_map[module_id] = child_items
                     
                     # Build modules data structure
-                    for _, module in modules.iterrows():
-                        module_items = module_items_map.get(module['identifier'], [])
+                    for module in modules:
+                        module_items = module_items_map.get(module.identifier, [])
                         
                         # Remove duplicates while preserving order
                         seen_items = set()
@@ -368,38 +420,19 @@ def list_cartridge(args):
                                 # Try to determine content type from identifierref
                                 if identifierref:
                                     # Check resources for this identifierref
-                                    resource_match = generator.df[
-                                        (generator.df['identifier'] == identifierref) & 
-                                        (generator.df['type'] == 'resource')
-                                    ]
-                                    if not resource_match.empty:
-                                        resource_type = resource_match.iloc[0]['resource_type']
+                                    resource_match = generator.graph.get(identifierref, 'resource')
+                                    if resource_match is not None:
+                                        resource_type = resource_match.resource_type
                                         if resource_type:
-                                            if 'assessment' in resource_type:
-                                                content_type = "Quiz"
-                                            elif 'imsdt' in resource_type:
-                                                content_type = "Discussion"
-                                            elif resource_type == 'webcontent':
-                                                content_type = "WikiPage"
-                                            elif 'assignment' in resource_type:
-                                                content_type = "Assignment"
-                                            else:
-                                                content_type = "File"
+                                            content_type = resource_content_type(resource_type)
                                 
                                 # Also check module_item data for content_type
-                                module_item_match = generator.df[
-                                    (generator.df['title'] == item_title) & 
-                                    (generator.df['type'] == 'module_item')
-                                ]
-                                if not module_item_match.empty:
-                                    item_content_type = module_item_match.iloc[0].get('content_type')
+                                module_item_match = generator.graph.first('module_item', item_title)
+                                if module_item_match is not None:
+                                    item_content_type = module_item_match.get('content_type')
                                     if item_content_type:
-                                        content_type = item_content_type
                                         # Clean up content type names
-                                        if content_type == "Quizzes::Quiz":
-                                            content_type = "Quiz"
-                                        elif content_type == "Attachment":
-                                            content_type = "File"
+                                        content_type = CONTENT_TYPE_NAMES.get(item_content_type, item_content_type)
                                 
                                 items_data.append({
                                     'title': item_title,
@@ -415,73 +448,64 @@ def list_cartridge(args):
                                 })
                         
                         modules_data.append({
-                            'id': module['identifier'],
-                            'title': module['title'],
+                            'id': module.identifier,
+                            'title': module.title,
                             'items': items_data
                         })
                             
             except ET.ParseError as e:
                 # Fallback to simple module listing
-                for _, module in modules.iterrows():
+                for module in modules:
                     modules_data.append({
-                        'id': module['identifier'],
-                        'title': module['title'],
+                        'id': module.identifier,
+                        'title': module.title,
                         'items': []
                     })
     
-    # Output based on format requested
-    if hasattr(args, 'json') and args.json:
-        # JSON output only
-        output_data = {
-            'cartridge_name': args.cartridge_name,
-            'course_title': summary['course_title'],
-            'course_code': summary['course_code'],
-            'total_components': summary['total_components'],
-            'modules': modules_data,
-            'component_types': {k: int(v) for k, v in summary['component_types'].items()}
-        }
-        print(json.dumps(output_data, indent=2))
-    else:
-        # Text output (original format)
-        print(f"Cartridge: {args.cartridge_name}")
-        print(f"  Course: {summary['course_title']} ({summary['course_code']})")
-        print(f"  Total components: {summary['total_components']}")
-        print()
-        
-        if modules_data:
-            print("Modules:")
-            for module in modules_data:
-                print(f"  📁 {module['title']} (ID: {module['id']})")
-                
-                if module['items']:
-                    for item in module['items']:
-                        icons = {
-                            "WikiPage": "📄",
-                            "Assignment": "📝", 
-                            "Quiz": "❓",
-                            "DiscussionTopic": "💬",
-                            "Discussion": "💬",
-                            "File": "📎"
-                        }
-                        icon = icons.get(item['content_type'], "❓")
-                        print(f"    {icon} {item['title']} ({item['content_type']})")
-                else:
-                    print("    (no items)")
-        
-        # List component types
-        print("\nComponent breakdown:")
-        for comp_type, count in summary['component_types'].items():
-            print(f"  {comp_type}: {count}")
-        
-        # Export DataFrame to HTML for inspection
-        html_file = f"{args.cartridge_name}/table_inspect.html"
-        temp_display_df = generator.current_df.copy()
-        for index, row in temp_display_df.iterrows():
-            if len(str(row['xml_content'])) > 2000:
-                temp_display_df.at[index, 'xml_content'] = str(row['xml_content'])[:2000] + " ... cell length reached limit"
-        temp_display_df.to_html(html_file, escape=False)
-        print(f"\n✓ DataFrame exported to {html_file} for inspection")
+    # Text output (original format)
+    print(f"Cartridge: {args.cartridge_name}")
+    print(f"  Course: {summary['course_title']} ({summary['course_code']})")
+    print(f"  Total components: {summary['total_components']}")
+    print()
+    
+    if modules_data:
+        print("Modules:")
+        for module in modules_data:
+            print(f"  📁 {module['title']} (ID: {module['id']})")
+            
+            if module['items']:
+                for item in module['items']:
+                    icons = {
+                        "WikiPage": "📄",
+                        "Assignment": "📝", 
+                        "Quiz": "❓",
+                        "DiscussionTopic": "💬",
+                        "Discussion": "💬",
+                        "File": "📎"
+                    }
+                    icon = icons.get(item['content_type'], "❓")
+                    print(f"    {icon} {item['title']} ({item['content_type']})")
+            else:
+                print("    (no items)")
     
+    # List component types
+    print("\nComponent breakdown:")
+    for comp_type, count in summary['component_types'].items():
+        print(f"  {comp_type}: {count}")
+    
+    # Export DataFrame to HTML for inspection
+    html_file = f"{args.cartridge_name}/table_inspect.html"
+    try:
+        temp_display_df = generator.graph.to_dataframe()
+    except ImportError:
+        print(f"\nNote: install pandas to export {html_file} for inspection")
+        return 0
+    for index, row in temp_display_df.iterrows():
+        if len(str(row['xml_content'])) > 2000:
+            temp_display_df.at[index, 'xml_content'] = str(row['xml_content'])[:2000] + " ... cell length reached limit"
+    temp_display_df.to_html(html_file, escape=False)
+    print(f"\n✓ DataFrame exported to {html_file} for inspection")
+
     return 0
 
 
@@ -494,29 +518,23 @@ def update_wiki(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
     # Find wiki page by title
     try:
-        wiki_pages = generator.df[(generator.df["type"] == "wiki_page") & (generator.df["title"] == args.title)]
-        if wiki_pages.empty:
-            print(f"Error: Wiki page '{args.title}' not found in cartridge")
-            print("Available wiki pages:")
-            all_wiki_pages = generator.df[generator.df["type"] == "wiki_page"]["title"].tolist()
-            if all_wiki_pages:
-                for page in all_wiki_pages:
-                    print(f"  - {page}")
-            else:
-                print("  (no wiki pages found)")
-            return 1
-        
-        wiki_page_id = wiki_pages.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding wiki page: {e}")
+        wiki_page_id = generator.find_wiki_id(args.title)
+    except ValueError:
+        print(f"Error: Wiki page '{args.title}' not found in cartridge")
+        print("Available wiki pages:")
+        all_wiki_pages = generator.list_titles('wiki_page')
+        if all_wiki_pages:
+            for page in all_wiki_pages:
+                print(f"  - {page}")
+        else:
+            print("  (no wiki pages found)")
         return 1
     
     # Handle base64 encoding/decoding flags
@@ -551,7 +569,7 @@ def update_wiki(args):
             position=args.position
         )
         
-        print(f"  Total components: {len(generator.df)}")
+        print(f"  Total components: {len(generator.graph)}")
         
     except Exception as e:
         print(f"Error updating wiki page: {e}")
@@ -569,46 +587,34 @@ def copy_wiki(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
     # Find wiki page by title
     try:
-        wiki_pages = generator.df[(generator.df["type"] == "wiki_page") & (generator.df["title"] == args.title)]
-        if wiki_pages.empty:
-            print(f"Error: Wiki page '{args.title}' not found in cartridge")
-            print("Available wiki pages:")
-            all_wiki_pages = generator.df[generator.df["type"] == "wiki_page"]["title"].tolist()
-            if all_wiki_pages:
-                for page in all_wiki_pages:
-                    print(f"  - {page}")
-            else:
-                print("  (no wiki pages found)")
-            return 1
-        
-        selected_wiki = wiki_pages.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding wiki page: {e}")
+        selected_wiki = generator.find_wiki_id(args.title)
+    except ValueError:
+        print(f"Error: Wiki page '{args.title}' not found in cartridge")
+        print("Available wiki pages:")
+        all_wiki_pages = generator.list_titles('wiki_page')
+        if all_wiki_pages:
+            for page in all_wiki_pages:
+                print(f"  - {page}")
+        else:
+            print("  (no wiki pages found)")
         return 1
     
     # Find target module by title
     try:
-        target_module_row = generator.df[(generator.df["type"] == "module") & (generator.df["title"] == args.target_module)]
-        if target_module_row.empty:
-            print(f"Error: Target module '{args.target_module}' not found in cartridge")
-            print("Available modules:")
-            modules = generator.df[generator.df["type"] == "module"]["title"].tolist()
-            for module in modules:
-                print(f"  - {module}")
-            return 1
-        
-        target_module_id = target_module_row.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding target module: {e}")
+        target_module_id = generator.find_module_id(args.target_module)
+    except ValueError:
+        print(f"Error: Target module '{args.target_module}' not found in cartridge")
+        print("Available modules:")
+        all_modules = generator.list_titles('module')
+        for module in all_modules:
+            print(f"  - {module}")
         return 1
     
     # Copy wiki page to target module
@@ -619,7 +625,7 @@ def copy_wiki(args):
         print(f"✓ Wiki page '{args.title}' copied successfully")
         print(f"  New wiki ID: {new_wiki_id}")
         print(f"  Target module: {args.target_module}")
-        print(f"  Total components: {len(generator.df)}")
+        print(f"  Total components: {len(generator.graph)}")
         
     except Exception as e:
         print(f"Error copying wiki page: {e}")
@@ -637,46 +643,34 @@ def copy_assignment(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
     # Find assignment by title
     try:
-        assignments = generator.df[(generator.df["type"] == "assignment_settings") & (generator.df["title"] == args.title)]
-        if assignments.empty:
-            print(f"Error: Assignment '{args.title}' not found in cartridge")
-            print("Available assignments:")
-            all_assignments = generator.df[generator.df["type"] == "assignment_settings"]["title"].tolist()
-            if all_assignments:
-                for assignment in all_assignments:
-                    print(f"  - {assignment}")
-            else:
-                print("  (no assignments found)")
-            return 1
-        
-        selected_assignment = assignments.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding assignment: {e}")
+        selected_assignment = generator.find_assignment_id(args.title)
+    except ValueError:
+        print(f"Error: Assignment '{args.title}' not found in cartridge")
+        print("Available assignments:")
+        all_assignments = generator.list_titles('assignment')
+        if all_assignments:
+            for assignment in all_assignments:
+                print(f"  - {assignment}")
+        else:
+            print("  (no assignments found)")
         return 1
     
     # Find target module by title
     try:
-        target_module_row = generator.df[(generator.df["type"] == "module") & (generator.df["title"] == args.target_module)]
-        if target_module_row.empty:
-            print(f"Error: Target module '{args.target_module}' not found in cartridge")
-            print("Available modules:")
-            modules = generator.df[generator.df["type"] == "module"]["title"].tolist()
-            for module in modules:
-                print(f"  - {module}")
-            return 1
-        
-        target_module_id = target_module_row.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding target module: {e}")
+        target_module_id = generator.find_module_id(args.target_module)
+    except ValueError:
+        print(f"Error: Target module '{args.target_module}' not found in cartridge")
+        print("Available modules:")
+        all_modules = generator.list_titles('module')
+        for module in all_modules:
+            print(f"  - {module}")
         return 1
     
     # Copy assignment to target module
@@ -687,7 +681,7 @@ def copy_assignment(args):
         print(f"✓ Assignment '{args.title}' copied successfully")
         print(f"  New assignment ID: {new_assignment_id}")
         print(f"  Target module: {args.target_module}")
-        print(f"  Total components: {len(generator.df)}")
+        print(f"  Total components: {len(generator.graph)}")
         
     except Exception as e:
         print(f"Error copying assignment: {e}")
@@ -705,56 +699,34 @@ def copy_discussion(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
-    # Find discussion by title - discussions use module items with Discussion content type
+    # Find discussion by the title of its module item
     try:
-        discussion_items = generator.df[
-            (generator.df["type"] == "module_item") & 
-            (generator.df["title"] == args.title) &
-            (generator.df["content_type"].isin(["DiscussionTopic", "Discussion"]))
-        ]
-        
-        if discussion_items.empty:
-            print(f"Error: Discussion '{args.title}' not found in cartridge")
-            print("Available discussions:")
-            all_discussions = generator.df[
-                (generator.df["type"] == "module_item") & 
-                (generator.df["content_type"].isin(["DiscussionTopic", "Discussion"]))
-            ]["title"].tolist()
-            if all_discussions:
-                for discussion in all_discussions:
-                    print(f"  - {discussion}")
-            else:
-                print("  (no discussions found)")
-            return 1
-        
-        # Get the identifierref from the module item to find the actual discussion resource
-        discussion_item = discussion_items.iloc[0]
-        selected_discussion = discussion_item["identifierref"]
-        
-    except Exception as e:
-        print(f"Error finding discussion: {e}")
+        selected_discussion = generator.find_discussion_id(args.title)
+    except ValueError:
+        print(f"Error: Discussion '{args.title}' not found in cartridge")
+        print("Available discussions:")
+        all_discussions = generator.list_titles('discussion')
+        if all_discussions:
+            for discussion in all_discussions:
+                print(f"  - {discussion}")
+        else:
+            print("  (no discussions found)")
         return 1
     
     # Find target module by title
     try:
-        target_module_row = generator.df[(generator.df["type"] == "module") & (generator.df["title"] == args.target_module)]
-        if target_module_row.empty:
-            print(f"Error: Target module '{args.target_module}' not found in cartridge")
-            print("Available modules:")
-            modules = generator.df[generator.df["type"] == "module"]["title"].tolist()
-            for module in modules:
-                print(f"  - {module}")
-            return 1
-        
-        target_module_id = target_module_row.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding target module: {e}")
+        target_module_id = generator.find_module_id(args.target_module)
+    except ValueError:
+        print(f"Error: Target module '{args.target_module}' not found in cartridge")
+        print("Available modules:")
+        all_modules = generator.list_titles('module')
+        for module in all_modules:
+            print(f"  - {module}")
         return 1
     
     # Copy discussion to target module
@@ -765,7 +737,7 @@ def copy_discussion(args):
         print(f"✓ Discussion '{args.title}' copied successfully")
         print(f"  New discussion ID: {new_discussion_id}")
         print(f"  Target module: {args.target_module}")
-        print(f"  Total components: {len(generator.df)}")
+        print(f"  Total components: {len(generator.graph)}")
         
     except Exception as e:
         print(f"Error copying discussion: {e}")
@@ -783,52 +755,34 @@ def copy_quiz(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
-    # Find quiz by title - quizzes use type "assessment_meta"
+    # Find quiz by title
     try:
-        quiz_assessments = generator.df[
-            (generator.df["type"] == "assessment_meta") & 
-            (generator.df["title"] == args.title)
-        ]
-        
-        if quiz_assessments.empty:
-            print(f"Error: Quiz '{args.title}' not found in cartridge")
-            print("Available quizzes:")
-            all_quizzes = generator.df[
-                generator.df["type"] == "assessment_meta"
-            ]["title"].tolist()
-            if all_quizzes:
-                for quiz in all_quizzes:
-                    print(f"  - {quiz}")
-            else:
-                print("  (no quizzes found)")
-            return 1
-        
-        selected_quiz = quiz_assessments.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding quiz: {e}")
+        selected_quiz = generator.find_quiz_id(args.title)
+    except ValueError:
+        print(f"Error: Quiz '{args.title}' not found in cartridge")
+        print("Available quizzes:")
+        all_quizzes = generator.list_titles('quiz')
+        if all_quizzes:
+            for quiz in all_quizzes:
+                print(f"  - {quiz}")
+        else:
+            print("  (no quizzes found)")
         return 1
     
     # Find target module by title
     try:
-        target_module_row = generator.df[(generator.df["type"] == "module") & (generator.df["title"] == args.target_module)]
-        if target_module_row.empty:
-            print(f"Error: Target module '{args.target_module}' not found in cartridge")
-            print("Available modules:")
-            modules = generator.df[generator.df["type"] == "module"]["title"].tolist()
-            for module in modules:
-                print(f"  - {module}")
-            return 1
-        
-        target_module_id = target_module_row.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding target module: {e}")
+        target_module_id = generator.find_module_id(args.target_module)
+    except ValueError:
+        print(f"Error: Target module '{args.target_module}' not found in cartridge")
+        print("Available modules:")
+        all_modules = generator.list_titles('module')
+        for module in all_modules:
+            print(f"  - {module}")
         return 1
     
     # Copy quiz to target module
@@ -839,7 +793,7 @@ def copy_quiz(args):
         print(f"✓ Quiz '{args.title}' copied successfully")
         print(f"  New quiz ID: {new_quiz_id}")
         print(f"  Target module: {args.target_module}")
-        print(f"  Total components: {len(generator.df)}")
+        print(f"  Total components: {len(generator.graph)}")
         
     except Exception as e:
         print(f"Error copying quiz: {e}")
@@ -857,54 +811,34 @@ def copy_file(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
-    # Find file by filename - files use type "resource" and href contains web_resources/filename
+    # Find file by its filename in web_resources/
     try:
-        file_resources = generator.df[
-            (generator.df["type"] == "resource") & 
-            (generator.df["href"].str.contains(f"web_resources/{args.filename}", na=False))
-        ]
-        
-        if file_resources.empty:
-            print(f"Error: File '{args.filename}' not found in cartridge")
-            print("Available files:")
-            all_files = generator.df[
-                (generator.df["type"] == "resource") & 
-                (generator.df["href"].str.contains("web_resources/", na=False))
-            ]["href"].tolist()
-            if all_files:
-                for file_href in all_files:
-                    filename = file_href.split("/")[-1] if "/" in file_href else file_href
-                    print(f"  - {filename}")
-            else:
-                print("  (no files found)")
-            return 1
-        
-        selected_file = file_resources.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding file: {e}")
+        selected_file = generator.find_file_id(args.filename)
+    except ValueError:
+        print(f"Error: File '{args.filename}' not found in cartridge")
+        print("Available files:")
+        all_files = generator.list_titles('file')
+        if all_files:
+            for filename in all_files:
+                print(f"  - {filename}")
+        else:
+            print("  (no files found)")
         return 1
     
     # Find target module by title
     try:
-        target_module_row = generator.df[(generator.df["type"] == "module") & (generator.df["title"] == args.target_module)]
-        if target_module_row.empty:
-            print(f"Error: Target module '{args.target_module}' not found in cartridge")
-            print("Available modules:")
-            modules = generator.df[generator.df["type"] == "module"]["title"].tolist()
-            for module in modules:
-                print(f"  - {module}")
-            return 1
-        
-        target_module_id = target_module_row.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding target module: {e}")
+        target_module_id = generator.find_module_id(args.target_module)
+    except ValueError:
+        print(f"Error: Target module '{args.target_module}' not found in cartridge")
+        print("Available modules:")
+        all_modules = generator.list_titles('module')
+        for module in all_modules:
+            print(f"  - {module}")
         return 1
     
     # Copy file to target module
@@ -915,7 +849,7 @@ def copy_file(args):
         print(f"✓ File '{args.filename}' copied successfully")
         print(f"  New file ID: {new_file_id}")
         print(f"  Target module: {args.target_module}")
-        print(f"  Total components: {len(generator.df)}")
+        print(f"  Total components: {len(generator.graph)}")
         
     except Exception as e:
         print(f"Error copying file: {e}")
@@ -933,35 +867,23 @@ def update_assignment(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
     # Find assignment by title
     try:
-        assignment_settings = generator.df[
-            (generator.df["type"] == "assignment_settings") & 
-            (generator.df["title"] == args.title)
-        ]
-        
-        if assignment_settings.empty:
-            print(f"Error: Assignment '{args.title}' not found in cartridge")
-            print("Available assignments:")
-            all_assignments = generator.df[
-                generator.df["type"] == "assignment_settings"
-            ]["title"].tolist()
-            if all_assignments:
-                for assignment in all_assignments:
-                    print(f"  - {assignment}")
-            else:
-                print("  (no assignments found)")
-            return 1
-        
-        assignment_id = assignment_settings.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding assignment: {e}")
+        assignment_id = generator.find_assignment_id(args.title)
+    except ValueError:
+        print(f"Error: Assignment '{args.title}' not found in cartridge")
+        print("Available assignments:")
+        all_assignments = generator.list_titles('assignment')
+        if all_assignments:
+            for assignment in all_assignments:
+                print(f"  - {assignment}")
+        else:
+            print("  (no assignments found)")
         return 1
     
     # Update assignment
@@ -976,7 +898,7 @@ def update_assignment(args):
             position=args.position
         )
         
-        print(f"  Total components: {len(generator.df)}")
+        print(f"  Total components: {len(generator.graph)}")
         
     except Exception as e:
         print(f"Error updating assignment: {e}")
@@ -994,50 +916,44 @@ def update_file(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
-    # Find file by filename - files use type "resource" and href contains web_resources/filename
+    # Find file by its filename in web_resources/
     try:
-        file_resources = generator.df[
-            (generator.df["type"] == "resource") & 
-            (generator.df["href"].str.contains(f"web_resources/{args.filename}", na=False))
-        ]
-        
-        if file_resources.empty:
-            print(f"Error: File '{args.filename}' not found in cartridge")
-            print("Available files:")
-            all_files = generator.df[
-                (generator.df["type"] == "resource") & 
-                (generator.df["href"].str.contains("web_resources/", na=False))
-            ]["href"].tolist()
-            if all_files:
-                for file_href in all_files:
-                    filename = file_href.split("/")[-1] if "/" in file_href else file_href
-                    print(f"  - {filename}")
-            else:
-                print("  (no files found)")
-            return 1
-        
-        file_id = file_resources.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding file: {e}")
+        file_id = generator.find_file_id(args.filename)
+    except ValueError:
+        print(f"Error: File '{args.filename}' not found in cartridge")
+        print("Available files:")
+        all_files = generator.list_titles('file')
+        if all_files:
+            for filename in all_files:
+                print(f"  - {filename}")
+        else:
+            print("  (no files found)")
         return 1
     
-    # Update file
+    if args.source is not None and not Path(args.source).is_file():
+        print(f"Error: Source file '{args.source}' does not exist")
+        return 1
+    
+    # Update file, a source file is streamed in as is
     try:
         print(f"Updating file '{args.filename}' in cartridge '{args.cartridge_name}'")
-        generator.update_file(
-            file_id, 
-            filename=args.new_filename,
-            file_content=args.content,
-            position=args.position
-        )
+        if args.source is not None:
+            with open(args.source, 'rb') as source:
+                generator.update_file(file_id, filename=args.new_filename, file_content=source, position=args.position)
+        else:
+            generator.update_file(
+                file_id, 
+                filename=args.new_filename,
+                file_content=args.content,
+                position=args.position
+            )
         
-        print(f"  Total components: {len(generator.df)}")
+        print(f"  Total components: {len(generator.graph)}")
         
     except Exception as e:
         print(f"Error updating file: {e}")
@@ -1055,29 +971,23 @@ def delete_wiki(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
     # Find wiki page by title
     try:
-        wiki_pages = generator.df[(generator.df["type"] == "wiki_page") & (generator.df["title"] == args.title)]
-        if wiki_pages.empty:
-            print(f"Error: Wiki page '{args.title}' not found in cartridge")
-            print("Available wiki pages:")
-            all_wiki_pages = generator.df[generator.df["type"] == "wiki_page"]["title"].tolist()
-            if all_wiki_pages:
-                for page in all_wiki_pages:
-                    print(f"  - {page}")
-            else:
-                print("  (no wiki pages found)")
-            return 1
-        
-        wiki_page_id = wiki_pages.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding wiki page: {e}")
+        wiki_page_id = generator.find_wiki_id(args.title)
+    except ValueError:
+        print(f"Error: Wiki page '{args.title}' not found in cartridge")
+        print("Available wiki pages:")
+        all_wiki_pages = generator.list_titles('wiki_page')
+        if all_wiki_pages:
+            for page in all_wiki_pages:
+                print(f"  - {page}")
+        else:
+            print("  (no wiki pages found)")
         return 1
     
     # Delete wiki page
@@ -1086,7 +996,7 @@ def delete_wiki(args):
         generator.delete_wiki_page_by_id(wiki_page_id)
         
         print(f"✓ Wiki page '{args.title}' deleted successfully")
-        print(f"  Total components: {len(generator.df)}")
+        print(f"  Total components: {len(generator.graph)}")
         
     except Exception as e:
         print(f"Error deleting wiki page: {e}")
@@ -1104,46 +1014,23 @@ def delete_discussion(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
-    # Find discussion by title - discussions use type "resource" and identifierref lookup
+    # Find discussion by the title of its module item
     try:
-        # First find resources with discussion-related type
-        discussion_resources = generator.df[
-            (generator.df["type"] == "resource") & 
-            (generator.df["resource_type"] == "imsdt_xmlv1p1")
-        ]
-        
-        # Then find module items that reference these resources and match the title
-        discussion_items = generator.df[
-            (generator.df["type"] == "module_item") & 
-            (generator.df["title"] == args.title)
-        ]
-        
-        if discussion_items.empty:
-            print(f"Error: Discussion '{args.title}' not found in cartridge")
-            print("Available discussions:")
-            # Find all discussions by looking at module items with Discussion content type
-            all_discussions = generator.df[
-                (generator.df["type"] == "module_item") & 
-                (generator.df["content_type"].isin(["DiscussionTopic", "Discussion"]))
-            ]["title"].tolist()
-            if all_discussions:
-                for discussion in all_discussions:
-                    print(f"  - {discussion}")
-            else:
-                print("  (no discussions found)")
-            return 1
-        
-        # Get the identifierref from the module item to find the actual discussion resource
-        discussion_item = discussion_items.iloc[0]
-        discussion_id = discussion_item["identifierref"]
-        
-    except Exception as e:
-        print(f"Error finding discussion: {e}")
+        discussion_id = generator.find_discussion_id(args.title)
+    except ValueError:
+        print(f"Error: Discussion '{args.title}' not found in cartridge")
+        print("Available discussions:")
+        all_discussions = generator.list_titles('discussion')
+        if all_discussions:
+            for discussion in all_discussions:
+                print(f"  - {discussion}")
+        else:
+            print("  (no discussions found)")
         return 1
     
     # Delete discussion
@@ -1152,7 +1039,7 @@ def delete_discussion(args):
         generator.delete_discussion_by_id(discussion_id)
         
         print(f"✓ Discussion '{args.title}' deleted successfully")
-        print(f"  Total components: {len(generator.df)}")
+        print(f"  Total components: {len(generator.graph)}")
         
     except Exception as e:
         print(f"Error deleting discussion: {e}")
@@ -1170,36 +1057,23 @@ def delete_assignment(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
-    # Find assignment by title - assignments use type "assignment_settings"
+    # Find assignment by title
     try:
-        assignment_settings = generator.df[
-            (generator.df["type"] == "assignment_settings") & 
-            (generator.df["title"] == args.title)
-        ]
-        
-        if assignment_settings.empty:
-            print(f"Error: Assignment '{args.title}' not found in cartridge")
-            print("Available assignments:")
-            # Find all assignments by looking at assignment_settings
-            all_assignments = generator.df[
-                generator.df["type"] == "assignment_settings"
-            ]["title"].tolist()
-            if all_assignments:
-                for assignment in all_assignments:
-                    print(f"  - {assignment}")
-            else:
-                print("  (no assignments found)")
-            return 1
-        
-        assignment_id = assignment_settings.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding assignment: {e}")
+        assignment_id = generator.find_assignment_id(args.title)
+    except ValueError:
+        print(f"Error: Assignment '{args.title}' not found in cartridge")
+        print("Available assignments:")
+        all_assignments = generator.list_titles('assignment')
+        if all_assignments:
+            for assignment in all_assignments:
+                print(f"  - {assignment}")
+        else:
+            print("  (no assignments found)")
         return 1
     
     # Delete assignment
@@ -1208,7 +1082,7 @@ def delete_assignment(args):
         generator.delete_assignment_by_id(assignment_id)
         
         print(f"✓ Assignment '{args.title}' deleted successfully")
-        print(f"  Total components: {len(generator.df)}")
+        print(f"  Total components: {len(generator.graph)}")
         
     except Exception as e:
         print(f"Error deleting assignment: {e}")
@@ -1226,36 +1100,23 @@ def delete_quiz(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
-    # Find quiz by title - quizzes use type "assessment_meta"
+    # Find quiz by title
     try:
-        quiz_assessments = generator.df[
-            (generator.df["type"] == "assessment_meta") & 
-            (generator.df["title"] == args.title)
-        ]
-        
-        if quiz_assessments.empty:
-            print(f"Error: Quiz '{args.title}' not found in cartridge")
-            print("Available quizzes:")
-            # Find all quizzes by looking at assessment_meta
-            all_quizzes = generator.df[
-                generator.df["type"] == "assessment_meta"
-            ]["title"].tolist()
-            if all_quizzes:
-                for quiz in all_quizzes:
-                    print(f"  - {quiz}")
-            else:
-                print("  (no quizzes found)")
-            return 1
-        
-        quiz_id = quiz_assessments.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding quiz: {e}")
+        quiz_id = generator.find_quiz_id(args.title)
+    except ValueError:
+        print(f"Error: Quiz '{args.title}' not found in cartridge")
+        print("Available quizzes:")
+        all_quizzes = generator.list_titles('quiz')
+        if all_quizzes:
+            for quiz in all_quizzes:
+                print(f"  - {quiz}")
+        else:
+            print("  (no quizzes found)")
         return 1
     
     # Delete quiz
@@ -1264,7 +1125,7 @@ def delete_quiz(args):
         generator.delete_quiz_by_id(quiz_id)
         
         print(f"✓ Quiz '{args.title}' deleted successfully")
-        print(f"  Total components: {len(generator.df)}")
+        print(f"  Total components: {len(generator.graph)}")
         
     except Exception as e:
         print(f"Error deleting quiz: {e}")
@@ -1282,44 +1143,23 @@ def update_discussion(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
-    # Find discussion by title - discussions use type "resource" with resource_type "imsdt_xmlv1p1"
+    # Find discussion by the title of its module item
     try:
-        discussion_resources = generator.df[
-            (generator.df["type"] == "resource") & 
-            (generator.df["resource_type"] == "imsdt_xmlv1p1")
-        ]
-        
-        # Find module items that reference these resources and match the title
-        discussion_items = generator.df[
-            (generator.df["type"] == "module_item") & 
-            (generator.df["title"] == args.title)
-        ]
-        
-        if discussion_items.empty:
-            print(f"Error: Discussion '{args.title}' not found in cartridge")
-            print("Available discussions:")
-            all_discussions = generator.df[
-                (generator.df["type"] == "module_item") & 
-                (generator.df["content_type"].isin(["DiscussionTopic", "Discussion"]))
-            ]["title"].tolist()
-            if all_discussions:
-                for discussion in all_discussions:
-                    print(f"  - {discussion}")
-            else:
-                print("  (no discussions found)")
-            return 1
-        
-        # Get the identifierref from the module item to find the actual discussion resource
-        discussion_item = discussion_items.iloc[0]
-        discussion_id = discussion_item["identifierref"]
-        
-    except Exception as e:
-        print(f"Error finding discussion: {e}")
+        discussion_id = generator.find_discussion_id(args.title)
+    except ValueError:
+        print(f"Error: Discussion '{args.title}' not found in cartridge")
+        print("Available discussions:")
+        all_discussions = generator.list_titles('discussion')
+        if all_discussions:
+            for discussion in all_discussions:
+                print(f"  - {discussion}")
+        else:
+            print("  (no discussions found)")
         return 1
     
     # Update discussion
@@ -1333,7 +1173,7 @@ def update_discussion(args):
             position=args.position
         )
         
-        print(f"  Total components: {len(generator.df)}")
+        print(f"  Total components: {len(generator.graph)}")
         
     except Exception as e:
         print(f"Error updating discussion: {e}")
@@ -1351,35 +1191,23 @@ def update_quiz(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
-    # Find quiz by title - quizzes use type "assessment_meta"
+    # Find quiz by title
     try:
-        quiz_assessments = generator.df[
-            (generator.df["type"] == "assessment_meta") & 
-            (generator.df["title"] == args.title)
-        ]
-        
-        if quiz_assessments.empty:
-            print(f"Error: Quiz '{args.title}' not found in cartridge")
-            print("Available quizzes:")
-            all_quizzes = generator.df[
-                generator.df["type"] == "assessment_meta"
-            ]["title"].tolist()
-            if all_quizzes:
-                for quiz in all_quizzes:
-                    print(f"  - {quiz}")
-            else:
-                print("  (no quizzes found)")
-            return 1
-        
-        quiz_id = quiz_assessments.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding quiz: {e}")
+        quiz_id = generator.find_quiz_id(args.title)
+    except ValueError:
+        print(f"Error: Quiz '{args.title}' not found in cartridge")
+        print("Available quizzes:")
+        all_quizzes = generator.list_titles('quiz')
+        if all_quizzes:
+            for quiz in all_quizzes:
+                print(f"  - {quiz}")
+        else:
+            print("  (no quizzes found)")
         return 1
     
     # Update quiz
@@ -1394,7 +1222,7 @@ def update_quiz(args):
             position=args.position
         )
         
-        print(f"  Total components: {len(generator.df)}")
+        print(f"  Total components: {len(generator.graph)}")
         
     except Exception as e:
         print(f"Error updating quiz: {e}")
@@ -1412,35 +1240,23 @@ def update_module(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
-    # Find module by title - modules use type "module"
+    # Find module by title
     try:
-        module_rows = generator.df[
-            (generator.df["type"] == "module") & 
-            (generator.df["title"] == args.title)
-        ]
-        
-        if module_rows.empty:
-            print(f"Error: Module '{args.title}' not found in cartridge")
-            print("Available modules:")
-            all_modules = generator.df[
-                generator.df["type"] == "module"
-            ]["title"].tolist()
-            if all_modules:
-                for module in all_modules:
-                    print(f"  - {module}")
-            else:
-                print("  (no modules found)")
-            return 1
-        
-        module_id = module_rows.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding module: {e}")
+        module_id = generator.find_module_id(args.title)
+    except ValueError:
+        print(f"Error: Module '{args.title}' not found in cartridge")
+        print("Available modules:")
+        all_modules = generator.list_titles('module')
+        if all_modules:
+            for module in all_modules:
+                print(f"  - {module}")
+        else:
+            print("  (no modules found)")
         return 1
     
     # Update module
@@ -1459,7 +1275,7 @@ def update_module(args):
             # Only title update, use existing rename_module method
             generator.rename_module(module_id, args.new_title)
         
-        print(f"  Total components: {len(generator.df)}")
+        print(f"  Total components: {len(generator.graph)}")
         
     except Exception as e:
         print(f"Error updating module: {e}")
@@ -1477,40 +1293,23 @@ def delete_file(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
-    # Find file by filename - files use type "resource" and href contains web_resources/filename
+    # Find file by its filename in web_resources/
     try:
-        # Look for resources with href containing the filename in web_resources/
-        file_resources = generator.df[
-            (generator.df["type"] == "resource") & 
-            (generator.df["href"].str.contains(f"web_resources/{args.filename}", na=False))
-        ]
-        
-        if file_resources.empty:
-            print(f"Error: File '{args.filename}' not found in cartridge")
-            print("Available files:")
-            # Find all files by looking at resources with web_resources/ in href
-            all_files = generator.df[
-                (generator.df["type"] == "resource") & 
-                (generator.df["href"].str.contains("web_resources/", na=False))
-            ]["href"].tolist()
-            if all_files:
-                for file_href in all_files:
-                    # Extract just the filename from the href
-                    filename = file_href.split("/")[-1] if "/" in file_href else file_href
-                    print(f"  - {filename}")
-            else:
-                print("  (no files found)")
-            return 1
-        
-        file_id = file_resources.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding file: {e}")
+        file_id = generator.find_file_id(args.filename)
+    except ValueError:
+        print(f"Error: File '{args.filename}' not found in cartridge")
+        print("Available files:")
+        all_files = generator.list_titles('file')
+        if all_files:
+            for filename in all_files:
+                print(f"  - {filename}")
+        else:
+            print("  (no files found)")
         return 1
     
     # Delete file
@@ -1519,7 +1318,7 @@ def delete_file(args):
         generator.delete_file_by_id(file_id)
         
         print(f"✓ File '{args.filename}' deleted successfully")
-        print(f"  Total components: {len(generator.df)}")
+        print(f"  Total components: {len(generator.graph)}")
         
     except Exception as e:
         print(f"Error deleting file: {e}")
@@ -1537,29 +1336,23 @@ def delete_module(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
     # Find module by title
     try:
-        module_row = generator.df[(generator.df["type"] == "module") & (generator.df["title"] == args.title)]
-        if module_row.empty:
-            print(f"Error: Module '{args.title}' not found in cartridge")
-            print("Available modules:")
-            modules = generator.df[generator.df["type"] == "module"]["title"].tolist()
-            if modules:
-                for module in modules:
-                    print(f"  - {module}")
-            else:
-                print("  (no modules found)")
-            return 1
-        
-        module_id = module_row.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding module: {e}")
+        module_id = generator.find_module_id(args.title)
+    except ValueError:
+        print(f"Error: Module '{args.title}' not found in cartridge")
+        print("Available modules:")
+        all_modules = generator.list_titles('module')
+        if all_modules:
+            for module in all_modules:
+                print(f"  - {module}")
+        else:
+            print("  (no modules found)")
         return 1
     
     # Delete module
@@ -1568,7 +1361,7 @@ def delete_module(args):
         generator.delete_module_by_id(module_id)
         
         print(f"✓ Module '{args.title}' and all its contents deleted successfully")
-        print(f"  Total components: {len(generator.df)}")
+        print(f"  Total components: {len(generator.graph)}")
         
     except Exception as e:
         print(f"Error deleting module: {e}")
@@ -1586,29 +1379,23 @@ def display_wiki(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
     # Find wiki page by title
     try:
-        wiki_pages = generator.df[(generator.df["type"] == "wiki_page") & (generator.df["title"] == args.title)]
-        if wiki_pages.empty:
-            print(f"Error: Wiki page '{args.title}' not found in cartridge")
-            print("Available wiki pages:")
-            all_wiki_pages = generator.df[generator.df["type"] == "wiki_page"]["title"].tolist()
-            if all_wiki_pages:
-                for page in all_wiki_pages:
-                    print(f"  - {page}")
-            else:
-                print("  (no wiki pages found)")
-            return 1
-        
-        wiki_page_id = wiki_pages.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding wiki page: {e}")
+        wiki_page_id = generator.find_wiki_id(args.title)
+    except ValueError:
+        print(f"Error: Wiki page '{args.title}' not found in cartridge")
+        print("Available wiki pages:")
+        all_wiki_pages = generator.list_titles('wiki_page')
+        if all_wiki_pages:
+            for page in all_wiki_pages:
+                print(f"  - {page}")
+        else:
+            print("  (no wiki pages found)")
         return 1
     
     # Display wiki page
@@ -1630,35 +1417,23 @@ def display_assignment(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
     # Find assignment by title
     try:
-        assignment_settings = generator.df[
-            (generator.df["type"] == "assignment_settings") & 
-            (generator.df["title"] == args.title)
-        ]
-        
-        if assignment_settings.empty:
-            print(f"Error: Assignment '{args.title}' not found in cartridge")
-            print("Available assignments:")
-            all_assignments = generator.df[
-                generator.df["type"] == "assignment_settings"
-            ]["title"].tolist()
-            if all_assignments:
-                for assignment in all_assignments:
-                    print(f"  - {assignment}")
-            else:
-                print("  (no assignments found)")
-            return 1
-        
-        assignment_id = assignment_settings.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding assignment: {e}")
+        assignment_id = generator.find_assignment_id(args.title)
+    except ValueError:
+        print(f"Error: Assignment '{args.title}' not found in cartridge")
+        print("Available assignments:")
+        all_assignments = generator.list_titles('assignment')
+        if all_assignments:
+            for assignment in all_assignments:
+                print(f"  - {assignment}")
+        else:
+            print("  (no assignments found)")
         return 1
     
     # Display assignment
@@ -1680,35 +1455,23 @@ def display_quiz(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
-    # Find quiz by title - quizzes use type "assessment_meta"
+    # Find quiz by title
     try:
-        quiz_assessments = generator.df[
-            (generator.df["type"] == "assessment_meta") & 
-            (generator.df["title"] == args.title)
-        ]
-        
-        if quiz_assessments.empty:
-            print(f"Error: Quiz '{args.title}' not found in cartridge")
-            print("Available quizzes:")
-            all_quizzes = generator.df[
-                generator.df["type"] == "assessment_meta"
-            ]["title"].tolist()
-            if all_quizzes:
-                for quiz in all_quizzes:
-                    print(f"  - {quiz}")
-            else:
-                print("  (no quizzes found)")
-            return 1
-        
-        quiz_id = quiz_assessments.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding quiz: {e}")
+        quiz_id = generator.find_quiz_id(args.title)
+    except ValueError:
+        print(f"Error: Quiz '{args.title}' not found in cartridge")
+        print("Available quizzes:")
+        all_quizzes = generator.list_titles('quiz')
+        if all_quizzes:
+            for quiz in all_quizzes:
+                print(f"  - {quiz}")
+        else:
+            print("  (no quizzes found)")
         return 1
     
     # Display quiz
@@ -1730,39 +1493,23 @@ def display_discussion(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
-    # Find discussion by title - discussions use module items with Discussion content type
+    # Find discussion by the title of its module item
     try:
-        discussion_items = generator.df[
-            (generator.df["type"] == "module_item") & 
-            (generator.df["title"] == args.title) &
-            (generator.df["content_type"].isin(["DiscussionTopic", "Discussion"]))
-        ]
-        
-        if discussion_items.empty:
-            print(f"Error: Discussion '{args.title}' not found in cartridge")
-            print("Available discussions:")
-            all_discussions = generator.df[
-                (generator.df["type"] == "module_item") & 
-                (generator.df["content_type"].isin(["DiscussionTopic", "Discussion"]))
-            ]["title"].tolist()
-            if all_discussions:
-                for discussion in all_discussions:
-                    print(f"  - {discussion}")
-            else:
-                print("  (no discussions found)")
-            return 1
-        
-        # Get the identifierref from the module item to find the actual discussion resource
-        discussion_item = discussion_items.iloc[0]
-        discussion_id = discussion_item["identifierref"]
-        
-    except Exception as e:
-        print(f"Error finding discussion: {e}")
+        discussion_id = generator.find_discussion_id(args.title)
+    except ValueError:
+        print(f"Error: Discussion '{args.title}' not found in cartridge")
+        print("Available discussions:")
+        all_discussions = generator.list_titles('discussion')
+        if all_discussions:
+            for discussion in all_discussions:
+                print(f"  - {discussion}")
+        else:
+            print("  (no discussions found)")
         return 1
     
     # Display discussion
@@ -1784,37 +1531,23 @@ def display_file(args):
         return 1
     
     # Load existing cartridge
-    generator = CartridgeGenerator("temp", "temp", verbose=False)  # Will be overridden during hydration
-    if not generator.hydrate_from_existing_cartridge(args.cartridge_name):
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
         print("Failed to load existing cartridge")
         return 1
     
-    # Find file by filename - files use type "resource" and href contains web_resources/filename
+    # Find file by its filename in web_resources/
     try:
-        file_resources = generator.df[
-            (generator.df["type"] == "resource") & 
-            (generator.df["href"].str.contains(f"web_resources/{args.filename}", na=False))
-        ]
-        
-        if file_resources.empty:
-            print(f"Error: File '{args.filename}' not found in cartridge")
-            print("Available files:")
-            all_files = generator.df[
-                (generator.df["type"] == "resource") & 
-                (generator.df["href"].str.contains("web_resources/", na=False))
-            ]["href"].tolist()
-            if all_files:
-                for file_href in all_files:
-                    filename = file_href.split("/")[-1] if "/" in file_href else file_href
-                    print(f"  - {filename}")
-            else:
-                print("  (no files found)")
-            return 1
-        
-        file_id = file_resources.iloc[0]["identifier"]
-        
-    except Exception as e:
-        print(f"Error finding file: {e}")
+        file_id = generator.find_file_id(args.filename)
+    except ValueError:
+        print(f"Error: File '{args.filename}' not found in cartridge")
+        print("Available files:")
+        all_files = generator.list_titles('file')
+        if all_files:
+            for filename in all_files:
+                print(f"  - {filename}")
+        else:
+            print("  (no files found)")
         return 1
     
     # Display file
@@ -1831,6 +1564,9 @@ def display_file(args):
 
 def package_cartridge(args):
     """Package cartridge into a zip file"""
+    from cartridge_engine.cartridge_lock import cartridge_lock
+    from cartridge_engine.packager import write_cartridge_zip
+    
     cartridge_path = Path(args.cartridge_name)
     
     if not cartridge_path.exists():
@@ -1839,14 +1575,421 @@ def package_cartridge(args):
     
     print(f"Packaging cartridge '{args.cartridge_name}' into ZIP file...")
     zip_name = f"{args.cartridge_name}"
-    shutil.make_archive(zip_name, 'zip', args.cartridge_name)
+    with cartridge_lock(cartridge_path):
+        write_cartridge_zip(cartridge_path, f"{zip_name}.zip")
     
     print(f"✓ Cartridge packaged as '{zip_name}.zip'")
     
     return 0
 
 
-def main():
+def decode_markers(args):
+    """Decode the marked payloads that cartridges saved by older versions still hold, once per cartridge"""
+    from cartridge_engine import CartridgeService
+    
+    # The daemon drops the generators it holds for decoded cartridges
+    service = _daemon_service or CartridgeService()
+    for cartridge_name in args.cartridge_names:
+        if not Path(cartridge_name).is_dir():
+            print(f"Error: Cartridge '{cartridge_name}' does not exist")
+            return 1
+        decoded = service.decode_marked_files(cartridge_name)
+        print(f"✓ Decoded {decoded} files in '{cartridge_name}'")
+    
+    return 0
+
+
+def gc_blobs(args):
+    """Remove the blobs of a blob store no cartridge uses any more"""
+    from cartridge_engine.blob_store import BlobStore
+    
+    if not os.path.isdir(args.store_dir):
+        print(f"Error: Blob store '{args.store_dir}' does not exist")
+        return 1
+    
+    store = BlobStore(args.store_dir)
+    removed = store.collect_garbage()
+    stats = store.stats()
+    
+    print(f"✓ Removed {removed['blobs']} unused blobs ({removed['bytes']} bytes)")
+    print(f"  Blobs: {stats['blobs']} ({stats['bytes']} bytes)")
+    print(f"  Saved by deduplication: {stats['saved_bytes']} bytes")
+    
+    return 0
+
+
+def operation_argv(cartridge_name, line):
+    """
+    Turn a line of a batch file into the arguments of a command on the cartridge.
+    
+    A line is either a JSON object naming the command and its options, e.g.
+        {"command": "add-wiki", "module": "Week 1", "title": "Intro", "content": "<p>Hi</p>"}
+    or the command line without the cartridge name, e.g.
+        add-wiki --module "Week 1" --title "Intro" --content "<p>Hi</p>"
+    """
+    import json
+    import shlex
+    
+    if not line.startswith('{'):
+        words = shlex.split(line)
+        return [words[0], cartridge_name] + words[1:]
+    
+    operation = json.loads(line)
+    if 'command' not in operation:
+        raise ValueError("Operation has no 'command'")
+    command = operation.pop('command')
+    
+    flags = BATCH_FLAGS.get(command, set())
+    argv = [command, cartridge_name]
+    for key, value in operation.items():
+        option = f"--{key.replace('_', '-')}"
+        if value is None:
+            continue
+        if option in flags:
+            if value:
+                argv.append(option)
+        elif isinstance(value, bool):
+            argv += [option, str(value).lower()]
+        else:
+            argv += [option, str(value)]
+    return argv
+
+
+def run_captured(parser, argv):
+    """Run a command line in this process and get its exit status and everything it printed"""
+    import io
+    from contextlib import redirect_stdout, redirect_stderr
+    
+    output = io.StringIO()
+    try:
+        with redirect_stdout(output), redirect_stderr(output):
+            status = run_locked(parser.parse_args(argv))
+    except SystemExit as e:
+        # Invalid arguments or --help, argparse has printed the message
+        status = e.code if isinstance(e.code, int) else 2
+    except Exception as e:
+        output.write(f"Error: {e}\n")
+        status = 1
+    return status, output.getvalue()
+
+
+class BatchAborted(Exception):
+    """Raised inside a batch's transaction to discard its operations after one failed"""
+
+
+def run_batch_operation(parser, cartridge_name, line):
+    """Run one line of a batch file and get its result, with everything the command printed"""
+    try:
+        argv = operation_argv(cartridge_name, line)
+    except ValueError as e:
+        return {'command': None, 'ok': False, 'status': 1, 'output': f"Error: {e}\n"}
+    
+    command = argv[0]
+    if command in UNBATCHED_COMMANDS:
+        status, output = 1, f"Error: Command '{command}' cannot run in a batch\n"
+    else:
+        status, output = run_captured(parser, argv)
+    return {'command': command, 'ok': status == 0, 'status': status, 'output': output}
+
+
+def batch_cartridge(args):
+    """Apply the operations of a batch file to a cartridge, hydrating it once and writing it once"""
+    global _batch_generator
+    import json
+    from contextlib import nullcontext
+    
+    cartridge_path = Path(args.cartridge_name)
+    
+    if not cartridge_path.exists():
+        print(json.dumps({"error": f"Cartridge '{args.cartridge_name}' does not exist"}))
+        return 1
+    
+    try:
+        ops_file = nullcontext(sys.stdin) if args.ops == '-' else open(args.ops, 'r', encoding='utf-8')
+    except OSError as e:
+        print(json.dumps({"error": f"Cannot read operations: {e}"}))
+        return 1
+    
+    generator = load_cartridge(args.cartridge_name)
+    if generator is None:
+        print(json.dumps({"error": "Failed to load existing cartridge"}))
+        return 1
+    
+    parser = build_parser()
+    applied = failed = 0
+    rolled_back = False
+    _batch_generator = generator
+    try:
+        # Commands resolve titles through the generator's in-memory lists, so each operation sees the ones
+        # before it although nothing is written until the transaction ends
+        with ops_file as lines, generator.transaction():
+            for line_number, line in enumerate(lines, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                
+                result = run_batch_operation(parser, args.cartridge_name, line)
+                print(json.dumps({'line': line_number, **result}), flush=True)
+                if result['ok']:
+                    applied += 1
+                else:
+                    failed += 1
+                    if not args.continue_on_error:
+                        # Leaving the transaction with an exception writes none of the batch
+                        raise BatchAborted()
+    except BatchAborted:
+        rolled_back = True
+    except Exception as e:
+        print(json.dumps({"error": f"Failed to write cartridge: {e}"}))
+        return 1
+    finally:
+        _batch_generator = None
+    
+    print(json.dumps({'applied': applied, 'failed': failed, 'rolled_back': rolled_back}))
+    return 1 if failed else 0
+
+
+def handle_daemon_request(parser, request):
+    """
+    Answer one JSON-RPC request of a daemon client.
+    
+    Methods:
+        run: params {"argv": [...], "cwd": "..."}, runs the command line in cwd and returns {"status", "output"}
+        ping: returns "pong"
+        shutdown: stops the daemon once the response is sent
+    """
+    request_id = request.get('id') if isinstance(request, dict) else None
+    
+    def error(code, message):
+        return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+    
+    if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+        return error(-32600, "Invalid request")
+    
+    method = request['method']
+    params = request.get('params') or {}
+    if method == 'ping':
+        result = 'pong'
+    elif method == 'shutdown':
+        result = 'stopping'
+    elif method == 'run':
+        argv = params.get('argv') if isinstance(params, dict) else None
+        if not isinstance(argv, list) or not argv or not all(isinstance(arg, str) for arg in argv):
+            return error(-32602, "'argv' must be a non-empty list of strings")
+        if argv[0] in LOCAL_COMMANDS:
+            return error(-32602, f"Command '{argv[0]}' cannot run in the daemon")
+        
+        # Relative cartridge names and output files resolve against the client's directory
+        try:
+            os.chdir(params.get('cwd') or '/')
+        except (OSError, TypeError) as e:
+            return error(-32602, f"Invalid 'cwd': {e}")
+        
+        status, output = run_captured(parser, argv)
+        
+        # A failed command may have left its generator half updated, hydrate it again on next use
+        cartridge_name = argv[1] if len(argv) > 1 and not argv[1].startswith('-') else None
+        if cartridge_name is not None:
+            if status == 0:
+                _daemon_service.sync(cartridge_name)
+            else:
+                _daemon_service.release(cartridge_name)
+        result = {'status': status, 'output': output}
+    else:
+        return error(-32601, f"Unknown method: {method}")
+    
+    return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+
+
+def serve(args):
+    """Keep hydrated cartridges in memory and run commands sent over a Unix socket"""
+    global _daemon_service
+    import json
+    import socket
+    import socketserver
+    from cartridge_engine import CartridgeService
+    
+    socket_path = args.socket
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            # Left behind by a daemon that did not shut down cleanly
+            os.unlink(socket_path)
+        else:
+            print(f"Error: A daemon is already listening on '{socket_path}'")
+            return 1
+        finally:
+            probe.close()
+    
+    parser = build_parser()
+    _daemon_service = CartridgeService(blob_store=blob_store_from_env())
+    stopping = False
+    
+    class RequestHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            nonlocal stopping
+            for line in self.rfile:
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    response = {'jsonrpc': '2.0', 'id': None, 'error': {'code': -32700, 'message': "Parse error"}}
+                else:
+                    response = handle_daemon_request(parser, request)
+                    stopping = stopping or (isinstance(request, dict) and request.get('method') == 'shutdown')
+                self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+                self.wfile.flush()
+                if stopping:
+                    return
+    
+    # Requests are handled one at a time, commands chdir into the client's directory.
+    # The socket is created owner-only, so no other user can connect between its bind and a chmod
+    previous_umask = os.umask(0o177)
+    try:
+        server = socketserver.UnixStreamServer(socket_path, RequestHandler)
+    finally:
+        os.umask(previous_umask)
+    print(f"✓ Cartridge daemon listening on '{socket_path}'", flush=True)
+    try:
+        while not stopping:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        _daemon_service = None
+    
+    print("Cartridge daemon stopped")
+    return 0
+
+
+def forward_to_daemon(argv, socket_path=DAEMON_SOCKET):
+    """
+    Run a command line on a running daemon and print its output.
+    
+    Returns:
+        int: Exit status of the command, or None if no daemon is listening
+    """
+    if os.environ.get(NO_DAEMON_ENV) or not argv or argv[0] in LOCAL_COMMANDS or argv[0].startswith('-'):
+        return None
+    
+    # The daemon cannot read this process's stdin, so batches from stdin run here
+    positionals = [arg for arg in argv[1:] if arg == '-' or not arg.startswith('-')]
+    if argv[0] == 'batch' and (len(positionals) < 2 or positionals[1] == '-'):
+        return None
+    
+    import json
+    import socket
+    
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+    except OSError:
+        client.close()
+        return None
+    
+    request = {'jsonrpc': '2.0', 'id': 1, 'method': 'run', 'params': {'argv': argv, 'cwd': os.getcwd()}}
+    with client, client.makefile('rwb') as stream:
+        stream.write(json.dumps(request).encode('utf-8') + b'\n')
+        stream.flush()
+        line = stream.readline()
+    
+    if not line:
+        print("Error: The cartridge daemon closed the connection", file=sys.stderr)
+        return 1
+    response = json.loads(line)
+    if 'error' in response:
+        print(f"Error: {response['error']['message']}", file=sys.stderr)
+        return 1
+    
+    sys.stdout.write(response['result']['output'])
+    return response['result']['status']
+
+
+def run_command(args):
+    """Run the subcommand selected by the parsed arguments"""
+    # Route to appropriate function
+    if args.command == 'create':
+        return create_cartridge(args)
+    elif args.command == 'add-module':
+        return add_module(args)
+    elif args.command == 'add-wiki':
+        return add_wiki(args)
+    elif args.command == 'add-assignment':
+        return add_assignment(args)
+    elif args.command == 'add-quiz':
+        return add_quiz(args)
+    elif args.command == 'add-discussion':
+        return add_discussion(args)
+    elif args.command == 'add-file':
+        return add_file(args)
+    elif args.command == 'list':
+        return list_cartridge(args)
+    elif args.command == 'update-wiki':
+        return update_wiki(args)
+    elif args.command == 'copy-wiki':
+        return copy_wiki(args)
+    elif args.command == 'copy-assignment':
+        return copy_assignment(args)
+    elif args.command == 'copy-discussion':
+        return copy_discussion(args)
+    elif args.command == 'copy-quiz':
+        return copy_quiz(args)
+    elif args.command == 'copy-file':
+        return copy_file(args)
+    elif args.command == 'update-assignment':
+        return update_assignment(args)
+    elif args.command == 'update-file':
+        return update_file(args)
+    elif args.command == 'update-discussion':
+        return update_discussion(args)
+    elif args.command == 'update-quiz':
+        return update_quiz(args)
+    elif args.command == 'update-module':
+        return update_module(args)
+    elif args.command == 'delete-wiki':
+        return delete_wiki(args)
+    elif args.command == 'delete-discussion':
+        return delete_discussion(args)
+    elif args.command == 'delete-assignment':
+        return delete_assignment(args)
+    elif args.command == 'delete-quiz':
+        return delete_quiz(args)
+    elif args.command == 'delete-file':
+        return delete_file(args)
+    elif args.command == 'delete-module':
+        return delete_module(args)
+    elif args.command == 'display-wiki':
+        return display_wiki(args)
+    elif args.command == 'display-assignment':
+        return display_assignment(args)
+    elif args.command == 'display-quiz':
+        return display_quiz(args)
+    elif args.command == 'display-discussion':
+        return display_discussion(args)
+    elif args.command == 'display-file':
+        return display_file(args)
+    elif args.command == 'package':
+        return package_cartridge(args)
+    elif args.command == 'batch':
+        return batch_cartridge(args)
+    elif args.command == 'serve':
+        return serve(args)
+    elif args.command == 'decode-markers':
+        return decode_markers(args)
+    elif args.command == 'gc-blobs':
+        return gc_blobs(args)
+    else:
+        print(f"Unknown command: {args.command}")
+        return 1
+
+
+
+def build_parser():
+    """Build the argument parser of every command"""
     parser = argparse.ArgumentParser(description="Canvas Common Cartridge CLI Tool")
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
     
@@ -1898,7 +2041,9 @@ def main():
     file_parser.add_argument('cartridge_name', help='Name of the cartridge directory')
     file_parser.add_argument('--module', required=True, help='Module title to add file to')
     file_parser.add_argument('--filename', required=True, help='Filename')
-    file_parser.add_argument('--content', required=True, help='File content')
+    file_content_group = file_parser.add_mutually_exclusive_group(required=True)
+    file_content_group.add_argument('--content', help='File content')
+    file_content_group.add_argument('--source', help='Path of a file to copy in as is, e.g. a PDF or an image')
     
     
     # List command
@@ -1962,7 +2107,9 @@ def main():
     update_file_parser.add_argument('cartridge_name', help='Name of the cartridge directory')
     update_file_parser.add_argument('--filename', required=True, help='Current filename to update')
     update_file_parser.add_argument('--new-filename', help='New filename (optional)')
-    update_file_parser.add_argument('--content', help='New file content (optional)')
+    update_file_content_group = update_file_parser.add_mutually_exclusive_group()
+    update_file_content_group.add_argument('--content', help='New file content (optional)')
+    update_file_content_group.add_argument('--source', help='Path of a file to copy in as is as the new content (optional)')
     update_file_parser.add_argument('--position', type=int, help='Position in module (optional)')
     
     # Update-discussion command
@@ -2050,79 +2197,57 @@ def main():
     package_parser = subparsers.add_parser('package', help='Package cartridge into ZIP file')
     package_parser.add_argument('cartridge_name', help='Name of the cartridge directory')
     
+    # Batch command
+    batch_parser = subparsers.add_parser('batch', help='Apply many operations to a cartridge in one run and one write')
+    batch_parser.add_argument('cartridge_name', help='Name of the cartridge directory')
+    batch_parser.add_argument('ops', nargs='?', default='-', help='File with one operation per line (default: stdin)')
+    batch_parser.add_argument('--continue-on-error', action='store_true', help='Skip failed operations and write the rest, instead of stopping and writing nothing')
+    
+    # Serve command
+    serve_parser = subparsers.add_parser('serve', help='Run a daemon that keeps cartridges loaded and runs forwarded commands')
+    serve_parser.add_argument('--socket', default=DAEMON_SOCKET, help=f'Unix socket to listen on (default: {DAEMON_SOCKET})')
+    
+    # Decode-markers command
+    decode_markers_parser = subparsers.add_parser('decode-markers', help='Decode the base64 marker payloads left in cartridges saved by older versions')
+    decode_markers_parser.add_argument('cartridge_names', nargs='+', help='Names of the cartridge directories')
+    
+    # Gc-blobs command
+    gc_blobs_parser = subparsers.add_parser('gc-blobs', help=f'Remove unused blobs from a blob store (see {BLOB_STORE_ENV})')
+    gc_blobs_parser.add_argument('store_dir', help='Blob store directory')
+    
+    return parser
+
+
+def run_locked(args):
+    """Run a subcommand while holding the lock of its cartridge"""
+    from cartridge_engine.cartridge_lock import cartridge_lock
+    
+    cartridge_name = getattr(args, 'cartridge_name', None)
+    # The JSON listing only reads files the engine replaces by rename, so it takes no lock and leaves no
+    # lock file in a cartridge that is only listed
+    read_only = args.command == 'list' and args.json
+    if args.command != 'create' and not read_only and cartridge_name and Path(cartridge_name).is_dir():
+        # Hold the cartridge from hydration to the last write, so the web app or another
+        # CLI run cannot modify it in between
+        with cartridge_lock(cartridge_name):
+            return run_command(args)
+    return run_command(args)
+
+
+def main():
+    # A running daemon already has the cartridge loaded
+    status = forward_to_daemon(sys.argv[1:])
+    if status is not None:
+        return status
+    
+    parser = build_parser()
     args = parser.parse_args()
     
     if not args.command:
         parser.print_help()
         return 1
     
-    # Route to appropriate function
-    if args.command == 'create':
-        return create_cartridge(args)
-    elif args.command == 'add-module':
-        return add_module(args)
-    elif args.command == 'add-wiki':
-        return add_wiki(args)
-    elif args.command == 'add-assignment':
-        return add_assignment(args)
-    elif args.command == 'add-quiz':
-        return add_quiz(args)
-    elif args.command == 'add-discussion':
-        return add_discussion(args)
-    elif args.command == 'add-file':
-        return add_file(args)
-    elif args.command == 'list':
-        return list_cartridge(args)
-    elif args.command == 'update-wiki':
-        return update_wiki(args)
-    elif args.command == 'copy-wiki':
-        return copy_wiki(args)
-    elif args.command == 'copy-assignment':
-        return copy_assignment(args)
-    elif args.command == 'copy-discussion':
-        return copy_discussion(args)
-    elif args.command == 'copy-quiz':
-        return copy_quiz(args)
-    elif args.command == 'copy-file':
-        return copy_file(args)
-    elif args.command == 'update-assignment':
-        return update_assignment(args)
-    elif args.command == 'update-file':
-        return update_file(args)
-    elif args.command == 'update-discussion':
-        return update_discussion(args)
-    elif args.command == 'update-quiz':
-        return update_quiz(args)
-    elif args.command == 'update-module':
-        return update_module(args)
-    elif args.command == 'delete-wiki':
-        return delete_wiki(args)
-    elif args.command == 'delete-discussion':
-        return delete_discussion(args)
-    elif args.command == 'delete-assignment':
-        return delete_assignment(args)
-    elif args.command == 'delete-quiz':
-        return delete_quiz(args)
-    elif args.command == 'delete-file':
-        return delete_file(args)
-    elif args.command == 'delete-module':
-        return delete_module(args)
-    elif args.command == 'display-wiki':
-        return display_wiki(args)
-    elif args.command == 'display-assignment':
-        return display_assignment(args)
-    elif args.command == 'display-quiz':
-        return display_quiz(args)
-    elif args.command == 'display-discussion':
-        return display_discussion(args)
-    elif args.command == 'display-file':
-        return display_file(args)
-    elif args.command == 'package':
-        return package_cartridge(args)
-    else:
-        print(f"Unknown command: {args.command}")
-        return 1
-
+    return run_locked(args)
 
 if __name__ == "__main__":
     sys.exit(main())
\ No newline at end of file
@@ -3,7 +3,10 @@ Canvas Common Cartridge Generator Engine
 """
 
 from .generator import CartridgeGenerator
+from ._cartridge_update_mixin import decode_marked_files
+from .graph import CartridgeGraph
 from .replicator import scan_cartridge
+from .service import CartridgeService
 
 __version__ = "1.0.0"
-__all__ = ["CartridgeGenerator", "scan_cartridge"]
\ No newline at end of file
+__all__ = ["CartridgeGenerator", "CartridgeGraph", "CartridgeService", "decode_marked_files", "scan_cartridge"]
\ No newline at end of file
@@ -8,7 +8,7 @@ class CartridgeAddMixin:
     """
 
     def add_wiki_page_to_module(self, module_id, page_title, page_content="", published=True, position=None):
-        """Add a wiki page to a specific module using actual module identifier from DataFrame"""
+        """Add a wiki page to a specific module using actual module identifier from the cartridge graph"""
         page_id = f"g{uuid.uuid4().hex}"
         resource_id = f"g{uuid.uuid4().hex}"
         item_id = f"g{uuid.uuid4().hex}"
@@ -16,14 +16,12 @@ class CartridgeAddMixin:
         # Find the module in both internal list and verify it exists in current state
         module = next((m for m in self.modules if m['identifier'] == module_id), None)
         if not module:
-            # If not found in internal list, check if it exists in current DataFrame
-            if self.current_df is not None:
-                module_exists = not self.current_df[(self.current_df['type'] == 'module') & 
-                                                   (self.current_df['identifier'] == module_id)].empty
-                if module_exists:
-                    # Get module title from DataFrame to create new internal module entry
-                    module_title = self.current_df[(self.current_df['type'] == 'module') & 
-                                                  (self.current_df['identifier'] == module_id)]['title'].iloc[0]
+            # If not found in internal list, check if it exists in the current graph
+            if self.graph is not None:
+                module_row = self.graph.get(module_id, 'module')
+                if module_row is not None:
+                    # Get module title from the graph to create new internal module entry
+                    module_title = module_row.title
                     # Create internal module entry
                     module = {
                         'identifier': module_id,
@@ -112,21 +110,19 @@ class CartridgeAddMixin:
         return page_id
 
     def add_assignment_to_module(self, module_id, assignment_title, assignment_content="", points=100, published=True, position=None):
-        """Add an assignment to a specific module using actual module identifier from DataFrame"""
+        """Add an assignment to a specific module using actual module identifier from the cartridge graph"""
         assignment_id = f"g{uuid.uuid4().hex}"
         item_id = f"g{uuid.uuid4().hex}"
         
         # Find the module in both internal list and verify it exists in current state
         module = next((m for m in self.modules if m['identifier'] == module_id), None)
         if not module:
-            # If not found in internal list, check if it exists in current DataFrame
-            if self.current_df is not None:
-                module_exists = not self.current_df[(self.current_df['type'] == 'module') & 
-                                                   (self.current_df['identifier'] == module_id)].empty
-                if module_exists:
-                    # Get module title from DataFrame to create new internal module entry
-                    module_title = self.current_df[(self.current_df['type'] == 'module') & 
-                                                  (self.current_df['identifier'] == module_id)]['title'].iloc[0]
+            # If not found in internal list, check if it exists in the current graph
+            if self.graph is not None:
+                module_row = self.graph.get(module_id, 'module')
+                if module_row is not None:
+                    # Get module title from the graph to create new internal module entry
+                    module_title = module_row.title
                     # Create internal module entry
                     module = {
                         'identifier': module_id,
@@ -216,7 +212,7 @@ class CartridgeAddMixin:
         return assignment_id
 
     def add_quiz_to_module(self, module_id, quiz_title, quiz_description="", points=1, published=True, position=None):
-        """Add a quiz to a specific module using actual module identifier from DataFrame"""
+        """Add a quiz to a specific module using actual module identifier from the cartridge graph"""
         quiz_id = f"g{uuid.uuid4().hex}"
         assignment_id = f"g{uuid.uuid4().hex}"
         resource_id = f"g{uuid.uuid4().hex}"
@@ -227,14 +223,12 @@ class CartridgeAddMixin:
         # Find the module in both internal list and verify it exists in current state
         module = next((m for m in self.modules if m['identifier'] == module_id), None)
         if not module:
-            # If not found in internal list, check if it exists in current DataFrame
-            if self.current_df is not None:
-                module_exists = not self.current_df[(self.current_df['type'] == 'module') & 
-                                                   (self.current_df['identifier'] == module_id)].empty
-                if module_exists:
-                    # Get module title from DataFrame to create new internal module entry
-                    module_title = self.current_df[(self.current_df['type'] == 'module') & 
-                                                  (self.current_df['identifier'] == module_id)]['title'].iloc[0]
+            # If not found in internal list, check if it exists in the current graph
+            if self.graph is not None:
+                module_row = self.graph.get(module_id, 'module')
+                if module_row is not None:
+                    # Get module title from the graph to create new internal module entry
+                    module_title = module_row.title
                     # Create internal module entry
                     module = {
                         'identifier': module_id,
@@ -334,7 +328,7 @@ class CartridgeAddMixin:
         return quiz_id
 
     def add_discussion_to_module(self, module_id, title, body, published=True, position=None):
-        """Add a discussion topic to a specific module using actual module identifier from DataFrame"""
+        """Add a discussion topic to a specific module using actual module identifier from the cartridge graph"""
         topic_id = f"g{uuid.uuid4().hex}"
         meta_id = f"g{uuid.uuid4().hex}"
         item_id = f"g{uuid.uuid4().hex}"
@@ -342,14 +336,12 @@ class CartridgeAddMixin:
         # Find the module in both internal list and verify it exists in current state
         module = next((m for m in self.modules if m['identifier'] == module_id), None)
         if not module:
-            # If not found in internal list, check if it exists in current DataFrame
-            if self.current_df is not None:
-                module_exists = not self.current_df[(self.current_df['type'] == 'module') & 
-                                                   (self.current_df['identifier'] == module_id)].empty
-                if module_exists:
-                    # Get module title from DataFrame to create new internal module entry
-                    module_title = self.current_df[(self.current_df['type'] == 'module') & 
-                                                  (self.current_df['identifier'] == module_id)]['title'].iloc[0]
+            # If not found in internal list, check if it exists in the current graph
+            if self.graph is not None:
+                module_row = self.graph.get(module_id, 'module')
+                if module_row is not None:
+                    # Get module title from the graph to create new internal module entry
+                    module_title = module_row.title
                     # Create internal module entry
                     module = {
                         'identifier': module_id,
@@ -444,21 +436,19 @@ class CartridgeAddMixin:
         return topic_id
 
     def add_file_to_module(self, module_id, filename, file_content, position=None):
-        """Add a file to a specific module using actual module identifier from DataFrame"""
+        """Add a file to a specific module using actual module identifier from the cartridge graph"""
         file_id = f"g{uuid.uuid4().hex}"
         item_id = f"g{uuid.uuid4().hex}"
         
         # Find the module in both internal list and verify it exists in current state
         module = next((m for m in self.modules if m['identifier'] == module_id), None)
         if not module:
-            # If not found in internal list, check if it exists in current DataFrame
-            if self.current_df is not None:
-                module_exists = not self.current_df[(self.current_df['type'] == 'module') & 
-                                                   (self.current_df['identifier'] == module_id)].empty
-                if module_exists:
-                    # Get module title from DataFrame to create new internal module entry
-                    module_title = self.current_df[(self.current_df['type'] == 'module') & 
-                                                  (self.current_df['identifier'] == module_id)]['title'].iloc[0]
+            # If not found in internal list, check if it exists in the current graph
+            if self.graph is not None:
+                module_row = self.graph.get(module_id, 'module')
+                if module_row is not None:
+                    # Get module title from the graph to create new internal module entry
+                    module_title = module_row.title
                     # Create internal module entry
                     module = {
                         'identifier': module_id,
@@ -481,6 +471,9 @@ class CartridgeAddMixin:
             else:
                 raise ValueError(f"Module with identifier {module_id} not found")
         
+        # Build the file info first, binary content is streamed to disk before the module is changed
+        file_info = {'identifier': file_id, **self._new_file_info(filename, file_content)}
+        
         # Determine position for new item (1-based indexing, no gaps allowed)
         if position is None:
             item_position = len(module['items']) + 1
@@ -514,12 +507,6 @@ class CartridgeAddMixin:
         module['items'].append(item)
         
         # Store file info
-        file_info = {
-            'identifier': file_id,
-            'filename': filename,
-            'content': file_content,
-            'path': f"web_resources/{filename}"
-        }
         self.files.append(file_info)
         
         # Add to resources
@@ -1,4 +1,7 @@
+import os
 import uuid
+from .attachments import attachment_info
+from .lazy_content import load_content
 
 
 class CartridgeCopyMixin:
@@ -166,14 +169,12 @@ class CartridgeCopyMixin:
                     break
             
             if not target_module:
-                # If not found in internal list, check if it exists in current DataFrame
-                if self.current_df is not None:
-                    module_exists = not self.current_df[(self.current_df['type'] == 'module') & 
-                                                       (self.current_df['identifier'] == module_id)].empty
-                    if module_exists:
-                        # Get module title from DataFrame to create new internal module entry
-                        module_title = self.current_df[(self.current_df['type'] == 'module') & 
-                                                      (self.current_df['identifier'] == module_id)]['title'].iloc[0]
+                # If not found in internal list, check if it exists in the current graph
+                if self.graph is not None:
+                    module_row = self.graph.get(module_id, 'module')
+                    if module_row is not None:
+                        # Get module title from the graph to create new internal module entry
+                        module_title = module_row.title
                         # Create internal module entry
                         target_module = {
                             'identifier': module_id,
@@ -313,14 +314,12 @@ class CartridgeCopyMixin:
                     break
             
             if not target_module:
-                # If not found in internal list, check if it exists in current DataFrame
-                if self.current_df is not None:
-                    module_exists = not self.current_df[(self.current_df['type'] == 'module') & 
-                                                       (self.current_df['identifier'] == module_id)].empty
-                    if module_exists:
-                        # Get module title from DataFrame to create new internal module entry
-                        module_title = self.current_df[(self.current_df['type'] == 'module') & 
-                                                      (self.current_df['identifier'] == module_id)]['title'].iloc[0]
+                # If not found in internal list, check if it exists in the current graph
+                if self.graph is not None:
+                    module_row = self.graph.get(module_id, 'module')
+                    if module_row is not None:
+                        # Get module title from the graph to create new internal module entry
+                        module_title = module_row.title
                         # Create internal module entry
                         target_module = {
                             'identifier': module_id,
@@ -462,14 +461,12 @@ class CartridgeCopyMixin:
                     break
             
             if not target_module:
-                # If not found in internal list, check if it exists in current DataFrame
-                if self.current_df is not None:
-                    module_exists = not self.current_df[(self.current_df['type'] == 'module') & 
-                                                       (self.current_df['identifier'] == module_id)].empty
-                    if module_exists:
-                        # Get module title from DataFrame to create new internal module entry
-                        module_title = self.current_df[(self.current_df['type'] == 'module') & 
-                                                      (self.current_df['identifier'] == module_id)]['title'].iloc[0]
+                # If not found in internal list, check if it exists in the current graph
+                if self.graph is not None:
+                    module_row = self.graph.get(module_id, 'module')
+                    if module_row is not None:
+                        # Get module title from the graph to create new internal module entry
+                        module_title = module_row.title
                         # Create internal module entry
                         target_module = {
                             'identifier': module_id,
@@ -546,6 +543,13 @@ class CartridgeCopyMixin:
             
             return new_topic_id
 
+    def _copied_attachment_info(self, original_file, copy_filename):
+        """Attachment keys of a copy of a binary file, its bytes are copied from the original when it is written"""
+        source = original_file.get('source')
+        if source is None and self.output_dir:
+            source = os.path.abspath(os.path.join(self.output_dir, original_file['path']))
+        return attachment_info(copy_filename, original_file, source=source)
+
     def copy_file(self, file_id, module_id=None):
         """Copy a file to another module or as standalone by providing the file id and optional module id"""
         # Find the original file
@@ -574,9 +578,11 @@ class CartridgeCopyMixin:
             file_copy = {
                 'identifier': new_file_id,
                 'filename': copy_filename,
-                'content': original_file['content'],
+                'content': load_content(original_file['content']),
                 'path': f"web_resources/{copy_filename}"
             }
+            if original_file.get('binary'):
+                file_copy.update(self._copied_attachment_info(original_file, copy_filename))
             self.files.append(file_copy)
             
             # Add to resources (but not to organization structure)
@@ -602,14 +608,12 @@ class CartridgeCopyMixin:
                     break
             
             if not target_module:
-                # If not found in internal list, check if it exists in current DataFrame
-                if self.current_df is not None:
-                    module_exists = not self.current_df[(self.current_df['type'] == 'module') & 
-                                                       (self.current_df['identifier'] == module_id)].empty
-                    if module_exists:
-                        # Get module title from DataFrame to create new internal module entry
-                        module_title = self.current_df[(self.current_df['type'] == 'module') & 
-                                                      (self.current_df['identifier'] == module_id)]['title'].iloc[0]
+                # If not found in internal list, check if it exists in the current graph
+                if self.graph is not None:
+                    module_row = self.graph.get(module_id, 'module')
+                    if module_row is not None:
+                        # Get module title from the graph to create new internal module entry
+                        module_title = module_row.title
                         # Create internal module entry
                         target_module = {
                             'identifier': module_id,
@@ -650,9 +654,11 @@ class CartridgeCopyMixin:
             file_copy = {
                 'identifier': new_file_id,
                 'filename': copy_filename,
-                'content': original_file['content'],
+                'content': load_content(original_file['content']),
                 'path': f"web_resources/{copy_filename}"
             }
+            if original_file.get('binary'):
+                file_copy.update(self._copied_attachment_info(original_file, copy_filename))
             self.files.append(file_copy)
             
             # Add to resources
@@ -63,6 +63,7 @@ class CartridgeDeletionMixin:
             wiki_file_path = Path(self.output_dir) / page_to_delete['filename']
             if wiki_file_path.exists():
                 wiki_file_path.unlink()
+                self._track_cartridge_change(wiki_file_path)
                 print(f"Removed wiki file: {page_to_delete['filename']}")
         
         # Update cartridge state
@@ -124,6 +125,7 @@ class CartridgeDeletionMixin:
             assignment_dir_path = Path(self.output_dir) / assignment_id
             if assignment_dir_path.exists():
                 shutil.rmtree(assignment_dir_path)
+                self._track_cartridge_change(assignment_dir_path)
                 print(f"Removed assignment directory: {assignment_id}/")
         
         # Update cartridge state
@@ -199,6 +201,7 @@ class CartridgeDeletionMixin:
             quiz_dir_path = Path(self.output_dir) / quiz_id
             if quiz_dir_path.exists():
                 shutil.rmtree(quiz_dir_path)
+                self._track_cartridge_change(quiz_dir_path)
                 print(f"Removed quiz directory: {quiz_id}/")
             
             # Remove QTI files from non_cc_assessments directory using tracked files
@@ -211,6 +214,7 @@ class CartridgeDeletionMixin:
                         qti_file_path = non_cc_dir / qti_filename
                         if qti_file_path.exists():
                             qti_file_path.unlink()
+                            self._track_cartridge_change(qti_file_path)
                             print(f"Removed QTI file: {qti_filename}")
                     # Remove from tracking
                     del self.quiz_qti_files[quiz_id]
@@ -230,6 +234,7 @@ class CartridgeDeletionMixin:
                     
                     for qti_file in qti_files_to_remove:
                         qti_file.unlink()
+                        self._track_cartridge_change(qti_file)
                         print(f"Removed QTI file: {qti_file.name}")
         
         # Update cartridge state
@@ -291,6 +296,7 @@ class CartridgeDeletionMixin:
             file_path = Path(self.output_dir) / file_to_delete['path']
             if file_path.exists():
                 file_path.unlink()
+                self._track_cartridge_change(file_path)
                 print(f"Removed file: {file_to_delete['path']}")
         
         # Update cartridge state
@@ -374,6 +380,7 @@ class CartridgeDeletionMixin:
                 
                 for discussion_file in discussion_files_to_remove:
                     discussion_file.unlink()
+                    self._track_cartridge_change(discussion_file)
                     print(f"Removed discussion file: {discussion_file.name}")
         
         # Update cartridge state
@@ -1,4 +1,5 @@
 import json
+from .lazy_content import load_content
 
 class CartridgeDisplayMixin:
     """
@@ -192,12 +193,79 @@ class CartridgeDisplayMixin:
             'id': file_info['identifier'],
             'filename': file_info['filename'],
             'path': file_info['path'],
-            'content': file_info['content'],
+            'content': load_content(file_info['content']),
             'position': position,
             'module': module_name
         }
+        if file_info.get('binary'):
+            display_info.update({key: file_info[key] for key in ('size', 'sha256', 'mime_type')})
         
         # Print JSON output
         print(json.dumps(display_info, indent=2))
         
-        return display_info
\ No newline at end of file
+        return display_info
+    def get_modules_data(self):
+        """Get the module/item structure in the same shape as the CLI list --json output"""
+        # Module item content types by title, in module_meta.xml order
+        item_content_types = {}
+        for module in sorted(self.modules, key=lambda x: x.get('position', 1)):
+            for item in sorted(module['items'], key=lambda x: x.get('position', 1)):
+                if item.get('title') not in item_content_types:
+                    item_content_types[item.get('title')] = item.get('content_type')
+        
+        resource_types = {}
+        for resource in self.resources:
+            resource_types.setdefault(resource['identifier'], resource['type'])
+        
+        modules_data = []
+        for module in sorted(self.modules, key=lambda x: x.get('position', 1)):
+            org_module = next((m for m in self.organization_items if m['identifier'] == module['identifier']), None)
+            org_items = sorted(org_module['items'], key=lambda x: x.get('position', 1)) if org_module else []
+            
+            # Remove duplicates while preserving order
+            seen_items = set()
+            items_data = []
+            for item in org_items:
+                item_title = item.get('title')
+                if not item_title or item_title in seen_items:
+                    continue
+                seen_items.add(item_title)
+                identifierref = item.get('identifierref')
+                
+                # Look up content type from resource or module_item data
+                content_type = "WikiPage"
+                resource_type = resource_types.get(identifierref) if identifierref else None
+                if resource_type:
+                    if 'assessment' in resource_type:
+                        content_type = "Quiz"
+                    elif 'imsdt' in resource_type:
+                        content_type = "Discussion"
+                    elif resource_type == 'webcontent':
+                        content_type = "WikiPage"
+                    elif 'assignment' in resource_type:
+                        content_type = "Assignment"
+                    else:
+                        content_type = "File"
+                
+                item_content_type = item_content_types.get(item_title)
+                if item_content_type:
+                    content_type = item_content_type
+                    # Clean up content type names
+                    if content_type == "Quizzes::Quiz":
+                        content_type = "Quiz"
+                    elif content_type == "Attachment":
+                        content_type = "File"
+                
+                items_data.append({
+                    'title': item_title,
+                    'identifierref': identifierref,
+                    'content_type': content_type
+                })
+            
+            modules_data.append({
+                'id': module['identifier'],
+                'title': module['title'],
+                'items': items_data
+            })
+        
+        return modules_data
@@ -0,0 +1,77 @@
+class CartridgeLookupMixin:
+    """
+    Mixin class containing lookup methods for CartridgeGenerator.
+    This mixin provides methods to resolve content titles and filenames to their identifiers.
+    """
+
+    def find_module_id(self, module_title):
+        """Find a module's identifier by its title"""
+        for module in self.modules:
+            if module['title'] == module_title:
+                return module['identifier']
+
+        raise ValueError(f"Module '{module_title}' not found")
+
+    def find_wiki_id(self, page_title):
+        """Find a wiki page's identifier by its title"""
+        for page in self.wiki_pages:
+            if page['title'] == page_title:
+                return page['identifier']
+
+        raise ValueError(f"Wiki page '{page_title}' not found")
+
+    def find_assignment_id(self, assignment_title):
+        """Find an assignment's identifier by its title"""
+        for assignment in self.assignments:
+            if assignment['title'] == assignment_title:
+                return assignment['identifier']
+
+        raise ValueError(f"Assignment '{assignment_title}' not found")
+
+    def find_quiz_id(self, quiz_title):
+        """Find a quiz's identifier by its title"""
+        for quiz in self.quizzes:
+            if quiz['title'] == quiz_title:
+                return quiz['identifier']
+
+        raise ValueError(f"Quiz '{quiz_title}' not found")
+
+    def find_discussion_id(self, discussion_title):
+        """Find a discussion's topic identifier by the title of its module item"""
+        for module in self.modules:
+            for item in module['items']:
+                if item['title'] == discussion_title and item.get('content_type') in ['DiscussionTopic', 'Discussion']:
+                    return item['identifierref']
+
+        raise ValueError(f"Discussion '{discussion_title}' not found")
+
+    def find_file_id(self, filename):
+        """Find a file's identifier by its filename in web_resources/"""
+        for file_info in self.files:
+            if f"web_resources/{filename}" in file_info['path']:
+                return file_info['identifier']
+
+        raise ValueError(f"File '{filename}' not found")
+
+    def list_titles(self, content_type):
+        """
+        List the titles of one kind of content, or the filenames of the files.
+
+        Args:
+            content_type (str): One of 'module', 'wiki_page', 'assignment', 'quiz', 'discussion' or 'file'
+        """
+        if content_type == 'module':
+            return [module['title'] for module in self.modules]
+        if content_type == 'wiki_page':
+            return [page['title'] for page in self.wiki_pages]
+        if content_type == 'assignment':
+            return [assignment['title'] for assignment in self.assignments]
+        if content_type == 'quiz':
+            return [quiz['title'] for quiz in self.quizzes]
+        if content_type == 'discussion':
+            return [item['title'] for module in self.modules for item in module['items']
+                    if item.get('content_type') in ['DiscussionTopic', 'Discussion']]
+        if content_type == 'file':
+            return [file_info['filename'] for file_info in self.files]
+
+        raise ValueError(f"Unsupported content type: {content_type}")
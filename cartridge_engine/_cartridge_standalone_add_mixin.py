@@ -144,13 +144,8 @@ class CartridgeStandaloneAddMixin:
         """Add a standalone file (not attached to any module)"""
         file_id = f"g{uuid.uuid4().hex}"
         
-        # Store file info
-        file_info = {
-            'identifier': file_id,
-            'filename': filename,
-            'content': file_content,
-            'path': f"web_resources/{filename}"
-        }
+        # Store file info, binary content is streamed straight to web_resources/
+        file_info = {'identifier': file_id, **self._new_file_info(filename, file_content)}
         self.files.append(file_info)
         
         # Add to resources (files go in web_resources/ directory)
@@ -1,3 +1,87 @@
+import base64
+import html
+import os
+from pathlib import Path
+from .attachments import ATTACHMENT_KEYS, is_binary_file
+from .lazy_content import load_content
+from .packager import iter_cartridge_files
+from .scan_index import temp_file_path
+
+# Marker the editor views wrap base64 encoded rich content in when posting it
+CONTENT_MARKER = "@@@@@@@@@@"
+
+
+def decode_marked_content(content, escape=False):
+    """
+    Decode the base64 payloads wrapped in CONTENT_MARKER pairs, so content is stored in its final form.
+    Content without markers, or with a payload that does not decode, is returned unchanged.
+
+    Args:
+        content (str): Content that may hold marked payloads
+        escape (bool): Escape the decoded payloads for content stored as XML text
+    """
+    if not isinstance(content, str) or content.count(CONTENT_MARKER) < 2:
+        return content
+
+    parts = content.split(CONTENT_MARKER)
+    tail = ''
+    if len(parts) % 2 == 0:
+        # An unpaired last marker is kept as is
+        tail = CONTENT_MARKER + parts.pop()
+
+    try:
+        # Payloads sit between each pair of markers
+        for i in range(1, len(parts), 2):
+            parts[i] = base64.b64decode(parts[i]).decode('utf-8')
+            if escape:
+                parts[i] = html.escape(parts[i])
+    except ValueError as e:
+        print(f"Error decoding base64 content: {e}")
+        return content
+
+    return ''.join(parts) + tail
+
+
+def decode_marked_files(cartridge_path):
+    """
+    One-time migration of a cartridge saved while marked payloads were only decoded on download, run by the
+    decode-markers command. Every text file still holding payloads is decoded in place, XML files with escaped
+    payloads since the writers store item bodies as XML text. The caller holds the cartridge lock.
+
+    Args:
+        cartridge_path (str): Path to the unzipped cartridge directory
+
+    Returns:
+        list: Paths of the files decoded
+    """
+    decoded_files = []
+    for path, arcname in iter_cartridge_files(cartridge_path):
+        if arcname.endswith('/') or is_binary_file(path):
+            continue
+        try:
+            content = path.read_text(encoding='utf-8')
+        except (OSError, UnicodeDecodeError):
+            continue
+        if content.count(CONTENT_MARKER) < 2:
+            continue
+
+        decoded = decode_marked_content(content, escape=path.suffix == '.xml')
+        if decoded != content:
+            temp_path = Path(temp_file_path(path))
+            temp_path.write_text(decoded, encoding='utf-8')
+            os.replace(temp_path, path)
+            decoded_files.append(path)
+
+    if any(path.relative_to(cartridge_path).parts[0] == 'web_resources' for path in decoded_files):
+        # files_meta.xml still lists the sizes and hashes of the encoded files
+        from .generator import CartridgeGenerator
+        generator = CartridgeGenerator("temp", "temp", verbose=False)
+        if generator.hydrate_from_existing_cartridge(cartridge_path):
+            generator._update_files_meta_xml(Path(cartridge_path) / "course_settings" / "files_meta.xml")
+
+    return decoded_files
+
+
 class CartridgeUpdateMixin:
     """
     Mixin class containing update methods for CartridgeGenerator.
@@ -6,6 +90,7 @@ class CartridgeUpdateMixin:
 
     def update_wiki(self, wiki_id, page_title=None, page_content=None, published=None, position=None):
         """Update a wiki page's title, content, published status, and/or position by its identifier"""
+        page_content = decode_marked_content(page_content)
         # Find the wiki page in our internal list
         wiki_page = None
         for page in self.wiki_pages:
@@ -51,6 +136,8 @@ class CartridgeUpdateMixin:
                 new_file_path = Path(self.output_dir) / new_filename
                 if os.path.exists(old_file_path):
                     os.rename(old_file_path, new_file_path)
+                    self._track_cartridge_change(old_file_path)
+                    self._track_cartridge_change(new_file_path)
                     # Update the content with the new title
                     self._create_wiki_page_html(new_file_path, wiki_page)
         
@@ -153,6 +240,7 @@ class CartridgeUpdateMixin:
 
     def update_assignment(self, assignment_id, assignment_title=None, assignment_content=None, points=None, published=None, position=None):
         """Update an assignment's title, content, points, published status, and/or position by its identifier"""
+        assignment_content = decode_marked_content(assignment_content)
         # Find the assignment in our internal list
         assignment = None
         for assign in self.assignments:
@@ -285,6 +373,7 @@ class CartridgeUpdateMixin:
 
     def update_quiz(self, quiz_id, quiz_title=None, quiz_description=None, points=None, published=None, position=None):
         """Update a quiz's title, description, points, published status, and/or position by its identifier"""
+        quiz_description = decode_marked_content(quiz_description)
         # Find the quiz in our internal list
         quiz = None
         for q in self.quizzes:
@@ -410,6 +499,7 @@ class CartridgeUpdateMixin:
 
     def update_discussion(self, discussion_id, title=None, body=None, published=None, position=None):
         """Update a discussion's title, body, published status, and/or position by its identifier"""
+        body = decode_marked_content(body)
         # Find the discussion in our internal list (discussions are stored in announcements)
         discussion = None
         for disc in self.announcements:
@@ -533,6 +623,7 @@ class CartridgeUpdateMixin:
 
     def update_file(self, file_id, filename=None, file_content=None, position=None):
         """Update a file's filename, content, and/or position by its identifier"""
+        file_content = decode_marked_content(file_content)
         # Find the file in our internal list
         file_info = None
         for file_obj in self.files:
@@ -543,6 +634,9 @@ class CartridgeUpdateMixin:
         if not file_info:
             raise ValueError(f"File with identifier {file_id} not found")
         
+        # Read hydrated text in before the file can be renamed or replaced on disk
+        file_info['content'] = load_content(file_info['content'])
+        
         # Store old values for comparison
         old_filename = file_info['filename']
         old_content = file_info['content']
@@ -563,6 +657,12 @@ class CartridgeUpdateMixin:
             new_path = f"web_resources/{filename}"
             file_info['path'] = new_path
             
+            # Also update the corresponding resource's href
+            for resource in self.resources:
+                if resource['identifier'] == file_id:
+                    resource['href'] = new_path
+                    break
+            
             # Rename the file on disk if filename changed
             if self.output_dir and old_path != new_path:
                 import os
@@ -573,9 +673,17 @@ class CartridgeUpdateMixin:
                     # Ensure new directory exists
                     Path(new_file_path).parent.mkdir(parents=True, exist_ok=True)
                     os.rename(old_file_path, new_file_path)
+                    self._track_cartridge_change(old_file_path)
+                    self._track_cartridge_change(new_file_path)
         
-        if file_content is not None:
+        if file_content is not None and not isinstance(file_content, str):
+            # Binary content is streamed straight to the file
+            file_info.update(self._new_file_info(file_info['filename'], file_content))
+        elif file_content is not None:
             file_info['content'] = file_content
+            # Text content replaces the bytes of a binary file
+            for key in ATTACHMENT_KEYS:
+                file_info.pop(key, None)
             
             # Write the content directly to the file if we have output_dir
             if self.output_dir:
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Attachments
+Binary files of a cartridge (PDFs, images, videos, ...). They are streamed to disk in chunks with their size
+and SHA-256 computed on the way, and only described by those and their MIME type in memory and in scanned rows,
+so their bytes are never decoded or held whole
+"""
+
+import codecs
+import hashlib
+import mimetypes
+import os
+from .scan_index import temp_file_path
+
+# Bytes read or written at a time when streaming an attachment
+CHUNK_SIZE = 1024 * 1024
+
+# Bytes looked at to decide whether a file is text
+SNIFF_BYTES = 8192
+
+DEFAULT_MIME_TYPE = 'application/octet-stream'
+
+# Entity keys describing a binary file, see attachment_info
+ATTACHMENT_KEYS = ('binary', 'size', 'sha256', 'mime_type', 'source')
+
+
+def guess_mime_type(filename):
+    """MIME type of a file from its name"""
+    mime_type, _ = mimetypes.guess_type(filename, strict=False)
+    return mime_type or DEFAULT_MIME_TYPE
+
+
+def is_binary_file(file_path):
+    """Whether a file is binary, judged from its first bytes: a NUL byte or invalid UTF-8 makes it binary"""
+    try:
+        with open(file_path, 'rb') as f:
+            head = f.read(SNIFF_BYTES)
+    except OSError:
+        return False
+    if b'\0' in head:
+        return True
+    try:
+        # A multi-byte character may be cut at the end of the sniffed bytes, which is not an error
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+    except UnicodeDecodeError:
+        return True
+    return False
+
+
+def iter_chunks(source, chunk_size=CHUNK_SIZE):
+    """
+    Iterate over the bytes of an attachment source in chunks.
+
+    Args:
+        source: bytes, a binary file object, or an iterable of bytes chunks (e.g. an upload being received)
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        for start in range(0, len(source), chunk_size):
+            yield bytes(source[start:start + chunk_size])
+    elif hasattr(source, 'read'):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        for chunk in source:
+            if chunk:
+                yield chunk
+
+
+def stream_to_file(source, file_path):
+    """
+    Write an attachment source to a file chunk by chunk, next to it first and renamed over it when complete.
+
+    Returns:
+        dict: 'size' in bytes and hex 'sha256' of the written file
+    """
+    digest = hashlib.sha256()
+    size = 0
+    temp_path = temp_file_path(file_path)
+    try:
+        with open(temp_path, 'wb') as f:
+            for chunk in iter_chunks(source):
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return {'size': size, 'sha256': digest.hexdigest()}
+
+
+def file_digest(file_path):
+    """Get the 'size' and 'sha256' of a file, reading it in chunks"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(file_path, 'rb') as f:
+        for chunk in iter_chunks(f):
+            digest.update(chunk)
+            size += len(chunk)
+    return {'size': size, 'sha256': digest.hexdigest()}
+
+
+def text_digest(content):
+    """Get the 'size' and 'sha256' of a text file as it is written, UTF-8 encoded"""
+    data = (content or '').encode('utf-8')
+    return {'size': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+
+
+def attachment_fields(file_path):
+    """Scanned fields of a binary file: 'binary', 'size', 'sha256' and 'mime_type'"""
+    return {'binary': True, 'mime_type': guess_mime_type(os.path.basename(file_path)), **file_digest(file_path)}
+
+
+def attachment_info(filename, digest, source=None):
+    """
+    Entity keys of a binary file in place of its 'content'.
+
+    Args:
+        filename (str): Name of the file, its MIME type is guessed from it
+        digest (dict): 'size' and 'sha256' of its bytes
+        source (str): Path its bytes are copied from when it is written, None once they are at its own path
+    """
+    return {'content': None, 'binary': True, 'size': digest['size'], 'sha256': digest['sha256'],
+            'mime_type': guess_mime_type(filename), 'source': source}
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Blob Store
+Optional content-addressed store of binary file attachments shared by the cartridges of a working directory.
+Each payload is stored once under its SHA-256 and hardlinked into the web_resources/ of every cartridge
+using it, so copies are links instead of byte copies and the cartridges stay plain, self-contained directories
+"""
+
+import os
+from pathlib import Path
+from .attachments import file_digest, stream_to_file
+from .scan_index import temp_file_path
+
+
+class BlobStore:
+    """
+    Hash-named files under a root directory, e.g. <root>/ab/abcdef....
+    The engine only ever replaces cartridge files by rename, never writes them in place, so a payload shared
+    through hardlinks is not changed through one of its cartridges. Blobs keep the mode of the file they were
+    stored from, so packaged cartridges are the same with or without a store.
+    The root should be on the same filesystem as the cartridges, otherwise files are copied instead of linked.
+    """
+
+    def __init__(self, root):
+        self.root = Path(os.path.abspath(root))
+
+    def blob_path(self, sha256):
+        """Path of the blob holding a payload"""
+        return self.root / sha256[:2] / sha256
+
+    def __contains__(self, sha256):
+        return self.blob_path(sha256).is_file()
+
+    def add_file(self, file_path, sha256=None):
+        """
+        Store the payload of a cartridge file. If the payload is already stored the file is replaced by a
+        link to its blob, otherwise the file itself becomes the blob.
+
+        Args:
+            file_path (str): Path of the file
+            sha256 (str): Hex SHA-256 of the file if already known
+
+        Returns:
+            bool: Whether the file is now linked to its blob
+        """
+        if sha256 is None:
+            sha256 = file_digest(file_path)['sha256']
+        blob_path = self.blob_path(sha256)
+        if blob_path.is_file():
+            if os.path.samefile(blob_path, file_path):
+                return True
+            return self.link_to(sha256, file_path)
+
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(file_path, blob_path)
+        except FileExistsError:
+            # Stored meanwhile by another process
+            return self.link_to(sha256, file_path)
+        except OSError:
+            # Another filesystem, or links are not supported
+            return False
+        return True
+
+    def link_to(self, sha256, file_path):
+        """
+        Put a stored payload at a path, as a link to its blob, next to the path first and renamed over it.
+        Falls back to a chunked copy when the blob cannot be linked.
+
+        Returns:
+            bool: Whether the file was linked rather than copied
+        """
+        blob_path = self.blob_path(sha256)
+        temp_path = temp_file_path(file_path)
+        try:
+            os.link(blob_path, temp_path)
+        except OSError:
+            # Another filesystem, or links are not supported
+            with open(blob_path, 'rb') as f:
+                stream_to_file(f, file_path)
+            return False
+        os.replace(temp_path, file_path)
+        return True
+
+    def collect_garbage(self):
+        """
+        Remove the blobs no cartridge links to any more.
+
+        Returns:
+            dict: 'blobs' and 'bytes' removed
+        """
+        removed = {'blobs': 0, 'bytes': 0}
+        if not self.root.is_dir():
+            return removed
+        for blob_path in self.root.glob('*/*'):
+            try:
+                blob_stat = blob_path.stat()
+                if blob_stat.st_nlink == 1:
+                    blob_path.unlink()
+                    removed['blobs'] += 1
+                    removed['bytes'] += blob_stat.st_size
+            except OSError:
+                continue
+        return removed
+
+    def stats(self):
+        """Get the number of blobs, the bytes they hold and the bytes their extra links save"""
+        stats = {'blobs': 0, 'bytes': 0, 'saved_bytes': 0}
+        if not self.root.is_dir():
+            return stats
+        for blob_path in self.root.glob('*/*'):
+            try:
+                blob_stat = blob_path.stat()
+            except OSError:
+                continue
+            stats['blobs'] += 1
+            stats['bytes'] += blob_stat.st_size
+            # The store's own link plus one per cartridge file, every cartridge file past the first is saved
+            stats['saved_bytes'] += blob_stat.st_size * max(blob_stat.st_nlink - 2, 0)
+        return stats
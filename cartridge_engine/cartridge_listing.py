@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Cartridge Listing
+Fast path for `cartridge_cli.py list --json`: builds the same listing as a full hydration from
+imsmanifest.xml, course_settings/ and the file names of the cartridge, without reading content files
+"""
+
+import xml.etree.ElementTree as ET
+from collections import Counter
+from pathlib import Path
+from .course_catalog import CONTENT_TYPE_NAMES, parse_module_meta, resource_content_type
+from .replicator import COURSE_SETTINGS_FILE_TYPES, list_cartridge_entries, cartridge_entry_sort_key
+
+IMSCP_NS = '{http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1}'
+CCCV_NS = '{http://canvas.instructure.com/xsd/cccv1p0}'
+
+# Component types of files in UUID-named directories, by file name
+UUID_DIR_FILE_TYPES = {
+    'assignment_settings.xml': 'assignment_settings',
+    'assessment_meta.xml': 'assessment_meta',
+    'assessment_qti.xml': 'assessment_qti'
+}
+
+
+def _read_manifest(manifest_path):
+    """
+    Stream the manifest once, keeping only the resource types and the LearningModules organization.
+
+    Returns:
+        tuple: (component types in scan order, {resource identifier: type}, LearningModules element or None)
+    """
+    types = ['manifest']
+    resource_types = {}
+    organizations = None
+    resources_seen = False
+    resources_depth = 0
+    for event, elem in ET.iterparse(manifest_path, events=('start', 'end')):
+        if elem.tag == f'{IMSCP_NS}resources' and not resources_seen:
+            # Only the first <resources> element is scanned
+            resources_depth += 1 if event == 'start' else -1
+            resources_seen = event == 'end'
+        elif event == 'end' and elem.tag == f'{IMSCP_NS}resource' and resources_depth:
+            types.append('resource')
+            resource_types.setdefault(elem.get('identifier'), elem.get('type'))
+            elem.clear()
+        elif event == 'end' and elem.tag == f'{IMSCP_NS}organizations' and organizations is None:
+            organizations = elem
+
+    learning_modules = None
+    if organizations is not None:
+        learning_modules = organizations.find(f'.//{IMSCP_NS}item[@identifier="LearningModules"]')
+    if learning_modules is not None:
+        for module_item in learning_modules.iterfind(f'.//{IMSCP_NS}item'):
+            if module_item.get('identifier') != 'LearningModules':
+                types.append('module_org')
+                types.extend('module_item_org' for item in module_item.iterfind(f'.//{IMSCP_NS}item')
+                             if item is not module_item)
+    return types, resource_types, learning_modules
+
+
+def _read_course_settings_file(file_path):
+    """
+    Component types of a course_settings file, with the modules and item content types of module_meta.xml.
+
+    Returns:
+        tuple: (component types, [(module identifier, title)], {item title: content type}, course title, course code)
+    """
+    filename = file_path.name
+    types = [COURSE_SETTINGS_FILE_TYPES.get(filename, 'course_settings_file')]
+    modules = []
+    item_content_types = {}
+    title = code = None
+
+    if filename == 'course_settings.xml':
+        try:
+            root = ET.parse(file_path).getroot()
+        except ET.ParseError:
+            return types, modules, item_content_types, title, code
+        title_elem = root.find(f'.//{CCCV_NS}title')
+        code_elem = root.find(f'.//{CCCV_NS}course_code')
+        title = title_elem.text if title_elem is not None else None
+        code = code_elem.text if code_elem is not None else None
+    elif filename == 'module_meta.xml':
+        try:
+            # Modules are listed in the order of the file, like a hydration
+            module_meta = parse_module_meta(file_path, ordered=False)
+        except ET.ParseError:
+            return types, modules, item_content_types, title, code
+        for module in module_meta:
+            modules.append((module['identifier'], module['title']))
+            types.append('module')
+            for item in module['items']:
+                types.append('module_item')
+                item_content_types.setdefault(item['title'], item['content_type'])
+    return types, modules, item_content_types, title, code
+
+
+def _root_xml_type(file_path):
+    """Component type of a UUID-named XML file in the cartridge root, read from its root element only"""
+    try:
+        for _, elem in ET.iterparse(file_path, events=('start',)):
+            if 'topicMeta' in elem.tag:
+                return 'discussion_topic_meta'
+            elif 'topic' in elem.tag:
+                return 'discussion_topic_content'
+            return 'unknown_xml'
+    except ET.ParseError:
+        pass
+    return 'xml_file'
+
+
+def _entry_types(cartridge_path, phase, rel_path):
+    """Component types a scan of a non-manifest, non-course_settings entry yields, from its path"""
+    path = Path(rel_path)
+    if phase == 'content':
+        content_dir = path.parts[0]
+        if content_dir == 'wiki_content' and path.suffix == '.html':
+            return ['wiki_page']
+        elif content_dir == 'discussions' and path.suffix == '.xml':
+            return ['discussion_topic']
+        return [f'{content_dir}_file']
+    elif phase == 'root_xml':
+        return [_root_xml_type(cartridge_path / rel_path)]
+    elif phase == 'uuid_dir':
+        if path.name in UUID_DIR_FILE_TYPES:
+            return [UUID_DIR_FILE_TYPES[path.name]]
+        return ['assignment_content' if path.name.endswith('.html') else 'uuid_directory_file']
+    elif phase == 'non_cc':
+        return ['qti_assessment']
+    return ['other_file']
+
+
+def _module_items(learning_modules):
+    """Titled items below each module of the manifest organization, duplicate titles removed"""
+    module_items_map = {}
+    if learning_modules is None:
+        return module_items_map
+
+    for module_item in learning_modules.iterfind(f'.//{IMSCP_NS}item'):
+        if module_item.get('identifier') == 'LearningModules':
+            continue
+        seen_titles = set()
+        items = []
+        for child in module_item.iterfind(f'.//{IMSCP_NS}item'):
+            if child is module_item:
+                continue
+            title_elem = child.find(f'.//{IMSCP_NS}title')
+            child_title = title_elem.text if title_elem is not None else None
+            if child_title and child_title not in seen_titles:
+                seen_titles.add(child_title)
+                items.append((child_title, child.get('identifierref')))
+        module_items_map[module_item.get('identifier')] = items
+    return module_items_map
+
+
+def read_cartridge_listing(cartridge_path):
+    """
+    Build the module listing and component summary of a cartridge without hydrating it.
+    Only the manifest and course_settings/ are parsed, other files are counted by name, except UUID-named
+    XML files in the cartridge root whose root element decides their type.
+
+    Args:
+        cartridge_path (str): Path to the unzipped cartridge directory
+
+    Returns:
+        dict: 'course_title', 'course_code', 'total_components', 'modules' and 'component_types',
+              as printed by `cartridge_cli.py list --json`
+    """
+    cartridge_path = Path(cartridge_path)
+    entries = sorted(list_cartridge_entries(cartridge_path), key=cartridge_entry_sort_key)
+
+    types = []
+    resource_types = {}
+    learning_modules = None
+    modules = []
+    item_content_types = {}
+    course_title = course_code = None
+    found_course_settings = False
+    for phase, rel_path in entries:
+        if phase == 'manifest':
+            manifest_types, resource_types, learning_modules = _read_manifest(cartridge_path / rel_path)
+            types.extend(manifest_types)
+        elif phase == 'course_settings':
+            file_types, file_modules, file_item_types, title, code = _read_course_settings_file(cartridge_path / rel_path)
+            types.extend(file_types)
+            modules.extend(file_modules)
+            for item_title, content_type in file_item_types.items():
+                item_content_types.setdefault(item_title, content_type)
+            # The course comes from the first course_settings component, like a hydration
+            if file_types[0] == 'course_settings' and not found_course_settings:
+                found_course_settings = True
+                course_title, course_code = title, code
+        else:
+            types.extend(_entry_types(cartridge_path, phase, rel_path))
+
+    modules_data = []
+    if modules and 'manifest' in types and learning_modules is not None:
+        module_items_map = _module_items(learning_modules)
+        for module_id, module_title in modules:
+            items_data = []
+            for item_title, identifierref in module_items_map.get(module_id, []):
+                content_type = "WikiPage"
+                resource_type = resource_types.get(identifierref) if identifierref else None
+                if resource_type:
+                    content_type = resource_content_type(resource_type)
+
+                item_content_type = item_content_types.get(item_title)
+                if item_content_type:
+                    content_type = CONTENT_TYPE_NAMES.get(item_content_type, item_content_type)
+
+                items_data.append({
+                    'title': item_title,
+                    'identifierref': identifierref,
+                    'content_type': content_type
+                })
+            modules_data.append({'id': module_id, 'title': module_title, 'items': items_data})
+
+    return {
+        'course_title': course_title or "temp",
+        'course_code': course_code or "temp",
+        'total_components': len(types),
+        'modules': modules_data,
+        'component_types': dict(Counter(types).most_common())
+    }
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Cartridge Lock
+Per-cartridge write lock: a reentrant in-process lock for threads, plus an flock on .cc_index/lock
+so separate processes (the web app, cartridge_cli.py) do not interleave their writes to the same cartridge
+"""
+
+import os
+import threading
+from pathlib import Path
+from .scan_index import INDEX_DIR
+
+try:
+    import fcntl
+except ImportError:
+    # No flock on this platform, cartridges are only locked within the process
+    fcntl = None
+
+LOCK_FILE = 'lock'
+
+# One [lock, users] entry per cartridge directory, shared by every generator and service in the process
+# while a thread holds or waits for it, and dropped once none does
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+class _DirectoryLock:
+    """Reentrant lock on a cartridge directory, held across threads of this process and across processes"""
+
+    def __init__(self, cartridge_path):
+        self.cartridge_path = cartridge_path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def acquire(self):
+        """Acquire the lock, blocking until no other thread or process holds it"""
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._file = self._lock_file()
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        """Release one level of the lock, the file lock goes with the outermost level"""
+        self._depth -= 1
+        if self._depth == 0 and self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+    def _lock_file(self):
+        """Open and flock the lock file of the cartridge, or None if it cannot be file locked"""
+        if fcntl is None or not os.path.isdir(self.cartridge_path):
+            return None
+
+        index_dir = Path(self.cartridge_path) / INDEX_DIR
+        try:
+            index_dir.mkdir(exist_ok=True)
+            lock_file = open(index_dir / LOCK_FILE, 'a')
+        except OSError as e:
+            print(f"Warning: Could not create lock file for {self.cartridge_path}: {e}")
+            return None
+
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+
+class CartridgeLock:
+    """
+    Handle on the lock of a cartridge directory. The shared lock is looked up when it is acquired and counted
+    while held or waited for, so the process only keeps locks for the cartridges in use.
+    """
+
+    def __init__(self, cartridge_path):
+        self.cartridge_path = cartridge_path
+        self._held = []
+
+    def acquire(self):
+        """Acquire the lock, blocking until no other thread or process holds it"""
+        with _locks_guard:
+            entry = _locks.get(self.cartridge_path)
+            if entry is None:
+                entry = _locks[self.cartridge_path] = [_DirectoryLock(self.cartridge_path), 0]
+            entry[1] += 1
+        try:
+            entry[0].acquire()
+        except BaseException:
+            self._drop(entry)
+            raise
+        self._held.append(entry)
+
+    def release(self):
+        """Release one level of the lock, the file lock goes with the outermost level"""
+        entry = self._held.pop()
+        entry[0].release()
+        self._drop(entry)
+
+    def _drop(self, entry):
+        """Stop using a shared lock, forgetting it once no thread holds or waits for it"""
+        with _locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _locks[self.cartridge_path]
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+def cartridge_lock(cartridge_path):
+    """
+    Get the lock of a cartridge directory.
+
+    Args:
+        cartridge_path (str): Path to the unzipped cartridge directory
+
+    Returns:
+        CartridgeLock: A handle on the one lock shared by every path naming this directory
+    """
+    return CartridgeLock(os.path.abspath(cartridge_path))
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Course Catalog
+Small summary record per cartridge (title, code, modules and item counts) stored in its scan index
+directory and rewritten on every engine write, so course listings never hydrate a cartridge
+"""
+
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from .scan_index import INDEX_DIR, RACY_WINDOW_NS
+
+SUMMARY_FILE = 'summary.json'
+SUMMARY_VERSION = 1
+
+# Courses per catalog page when no page size is given
+DEFAULT_PAGE_SIZE = 20
+
+# Files a summary is built from, relative to the cartridge directory
+SUMMARY_SOURCES = ('course_settings/module_meta.xml', 'course_settings/course_settings.xml')
+
+# Canvas content types shown under their CLI names
+CONTENT_TYPE_NAMES = {'Quizzes::Quiz': 'Quiz', 'Attachment': 'File'}
+
+
+def resource_content_type(resource_type):
+    """Content type of a module item from the type of the resource it points to"""
+    if 'assessment' in resource_type:
+        return "Quiz"
+    elif 'imsdt' in resource_type:
+        return "Discussion"
+    elif resource_type == 'webcontent':
+        return "WikiPage"
+    elif 'assignment' in resource_type:
+        return "Assignment"
+    return "File"
+
+
+def _local_name(tag):
+    """Tag name without its namespace"""
+    return tag.rpartition('}')[2]
+
+
+def _position(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 1
+
+
+def _source_stamp(cartridge_path):
+    """Stat values of the files a summary is built from, None for missing files"""
+    stamp = []
+    for source in SUMMARY_SOURCES:
+        try:
+            stat = (Path(cartridge_path) / source).stat()
+            stamp.append([stat.st_mtime_ns, stat.st_size])
+        except OSError:
+            stamp.append(None)
+    return stamp
+
+
+def parse_module_meta(module_meta_path, ordered=True):
+    """
+    Read the modules and their items from a module_meta.xml file in one streaming pass.
+
+    Args:
+        module_meta_path (str): Path to the module_meta.xml file
+        ordered (bool): Sort modules and items by position instead of keeping the order of the file
+
+    Returns:
+        list: Module dicts with 'identifier', 'title', 'position' and 'items'.
+              Items are dicts with 'identifier', 'title', 'content_type', 'identifierref' and 'position'.
+    """
+    modules = []
+    module = None
+    item = None
+    for event, elem in ET.iterparse(module_meta_path, events=('start', 'end')):
+        tag = _local_name(elem.tag)
+        if event == 'start':
+            if tag == 'module':
+                module = {'identifier': elem.get('identifier'), 'title': None, 'position': None, 'items': []}
+            elif tag == 'item' and module is not None:
+                item = {'identifier': elem.get('identifier'), 'title': None, 'content_type': None,
+                        'identifierref': None, 'position': None}
+            continue
+
+        if tag == 'item' and item is not None:
+            module['items'].append(item)
+            item = None
+        elif tag == 'module' and module is not None:
+            modules.append(module)
+            module = None
+            elem.clear()
+        elif tag in ('title', 'content_type', 'identifierref', 'position'):
+            target = item if item is not None else module
+            if target is not None and tag in target:
+                target[tag] = (elem.text or '').strip()
+
+    if ordered:
+        modules.sort(key=lambda m: _position(m['position']))
+        for module in modules:
+            module['items'].sort(key=lambda i: _position(i['position']))
+    return modules
+
+
+def build_cartridge_summary(cartridge_path):
+    """
+    Build the summary record of a cartridge from its course settings and module_meta.xml.
+
+    Returns:
+        dict: 'title', 'code', 'modules' (title, item_count and items with title and content_type),
+              'item_counts' per content type and 'item_total'
+    """
+    settings_path = Path(cartridge_path) / 'course_settings' / 'course_settings.xml'
+    module_meta_path = Path(cartridge_path) / 'course_settings' / 'module_meta.xml'
+
+    title = code = None
+    if settings_path.exists():
+        for elem in ET.parse(settings_path).getroot():
+            tag = _local_name(elem.tag)
+            if tag == 'title':
+                title = (elem.text or '').strip()
+            elif tag == 'course_code':
+                code = (elem.text or '').strip()
+
+    modules = []
+    item_counts = {}
+    if module_meta_path.exists():
+        for module in parse_module_meta(module_meta_path):
+            # Same title rule as the engine's module listing, an item title is only listed once per module
+            seen_titles = set()
+            items = []
+            for item in module['items']:
+                if not item['title'] or item['title'] in seen_titles:
+                    continue
+                seen_titles.add(item['title'])
+                content_type = item['content_type'] or 'WikiPage'
+                content_type = CONTENT_TYPE_NAMES.get(content_type, content_type)
+                items.append({'title': item['title'], 'content_type': content_type})
+                item_counts[content_type] = item_counts.get(content_type, 0) + 1
+            modules.append({'title': module['title'], 'item_count': len(items), 'items': items})
+
+    return {
+        'title': title,
+        'code': code,
+        'modules': modules,
+        'item_counts': item_counts,
+        'item_total': sum(item_counts.values())
+    }
+
+
+def refresh_cartridge_summary(cartridge_path):
+    """Rebuild the summary record of a cartridge and store it in its scan index directory"""
+    stamp = _source_stamp(cartridge_path)
+    summary = build_cartridge_summary(cartridge_path)
+
+    # A source modified right around now may change again without its stat changing,
+    # so the record is stored without a stamp and rebuilt on its next read
+    now_ns = time.time_ns()
+    if any(source and source[0] + RACY_WINDOW_NS >= now_ns for source in stamp):
+        stamp = None
+
+    index_dir = Path(cartridge_path) / INDEX_DIR
+    summary_path = index_dir / SUMMARY_FILE
+    temp_path = index_dir / f"{SUMMARY_FILE}.{os.getpid()}.tmp"
+    try:
+        index_dir.mkdir(exist_ok=True)
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': SUMMARY_VERSION, 'source': stamp, 'summary': summary}, f)
+        os.replace(temp_path, summary_path)
+    except OSError as e:
+        print(f"Warning: Could not save course summary for {cartridge_path}: {e}")
+    return summary
+
+
+def read_cartridge_summary(cartridge_path):
+    """
+    Get the summary record of a cartridge.
+    The stored record is used while the files it was built from are unchanged, otherwise it is rebuilt,
+    so cartridges written by older versions or other tools are summarized on first listing.
+    """
+    summary_path = Path(cartridge_path) / INDEX_DIR / SUMMARY_FILE
+    try:
+        with open(summary_path, 'r', encoding='utf-8') as f:
+            record = json.load(f)
+        if record.get('version') == SUMMARY_VERSION and record.get('source') == _source_stamp(cartridge_path):
+            return record['summary']
+    except (OSError, ValueError, AttributeError):
+        pass
+    return refresh_cartridge_summary(cartridge_path)
+
+
+class CourseCatalog:
+    """Listing of the course cartridges in a working directory, read from their summary records"""
+
+    def __init__(self, working_dir):
+        self.working_dir = working_dir
+
+    def names(self):
+        """Get the course names, sorted"""
+        if not os.path.exists(self.working_dir):
+            return []
+        with os.scandir(self.working_dir) as entries:
+            return sorted(entry.name for entry in entries if entry.is_dir())
+
+    def page(self, page=1, per_page=DEFAULT_PAGE_SIZE):
+        """
+        Get one page of course summaries. Only the courses on the page are read.
+
+        Args:
+            page (int): Page number, starting at 1
+            per_page (int): Courses per page, or None for every course on one page
+
+        Returns:
+            dict: 'courses' (summaries with their course 'name'), 'page', 'per_page', 'pages' and 'total'
+        """
+        names = self.names()
+        total = len(names)
+        if per_page is None or per_page < 1:
+            per_page = max(total, 1)
+        pages = max((total + per_page - 1) // per_page, 1)
+        page = min(max(page, 1), pages)
+
+        courses = []
+        for name in names[(page - 1) * per_page:page * per_page]:
+            try:
+                summary = read_cartridge_summary(os.path.join(self.working_dir, name))
+            except (OSError, ET.ParseError) as e:
+                print(f"Failed to load course '{name}': {e}")
+                continue
+            courses.append({'name': name, **summary})
+
+        return {'courses': courses, 'page': page, 'per_page': per_page, 'pages': pages, 'total': total}
@@ -9,7 +9,18 @@ from datetime import datetime
 import filecmp
 import shutil
 import random
-from .replicator import scan_cartridge
+import hashlib
+import time
+from contextlib import contextmanager
+from .replicator import (scan_cartridge_entries, scan_cartridge_entry, cartridge_entry_phases,
+                         cartridge_entry_sort_key, manifest_dependencies,
+                         resolve_discussion_titles)
+from .graph import CartridgeGraph
+from .lazy_content import LazyContent, content_hash, load_content
+from .attachments import attachment_info, file_digest, stream_to_file, text_digest
+from .cartridge_lock import cartridge_lock
+from .course_catalog import refresh_cartridge_summary
+from .scan_index import RACY_WINDOW_NS, temp_file_path
 from ._cartridge_deletion_mixin import CartridgeDeletionMixin
 from ._cartridge_update_mixin import CartridgeUpdateMixin
 from ._cartridge_display_mixin import CartridgeDisplayMixin
@@ -17,8 +28,9 @@ from ._cartridge_add_mixin import CartridgeAddMixin
 from ._cartridge_standalone_add_mixin import CartridgeStandaloneAddMixin
 from ._cartridge_copy_mixin import CartridgeCopyMixin
 from ._cartridge_hydrator_mixin import CartridgeHydratorMixin
+from ._cartridge_lookup_mixin import CartridgeLookupMixin
 
-class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, CartridgeDisplayMixin, CartridgeAddMixin, CartridgeStandaloneAddMixin, CartridgeCopyMixin, CartridgeHydratorMixin):
+class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, CartridgeDisplayMixin, CartridgeAddMixin, CartridgeStandaloneAddMixin, CartridgeCopyMixin, CartridgeHydratorMixin, CartridgeLookupMixin):
     def __init__(self, course_title="Generated Course", course_code="GEN101", verbose=True):
         self.course_title = course_title
         self.course_code = course_code
@@ -42,35 +54,262 @@ class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, Cartridge
         # Assignment group ID (required for assignments/quizzes)
         self.assignment_group_id = f"g{uuid.uuid4().hex}"
         
-        # Store current cartridge state and DataFrame
+        # Store current cartridge state, as a component graph exported to a DataFrame on demand
         self.output_dir = None
-        self.current_df = None
+        self.graph = None
+        self._current_df = None
+        
+        # Scanned rows grouped by (phase, rel_path) entry, used to refresh state incrementally
+        self._scan_entries = None
+        self._file_snapshot = {}
+        self._pending_changes = set()
+        self.changed_files = []
+        
+        # Fingerprints of the entities last written to output_dir, so unchanged ones are not rendered again
+        self._entity_fingerprints = {}
+        self.write_stats = {'files_written': 0, 'files_skipped': 0}
+        self.last_write_stats = {'files_written': 0, 'files_skipped': 0}
+        
+        # Size and SHA-256 of the text files listed in files_meta.xml, by path, kept while their stat is unchanged
+        self._file_digests = {}
+        
+        # Optional BlobStore binary files are deduplicated through, None to keep plain copies
+        self.blob_store = None
+        
+        # Open transaction() blocks, while any is open state updates are deferred to its end
+        self._transaction_depth = 0
+        self._flush_pending = False
+    
+    @property
+    def current_df(self):
+        """Get the current state as a DataFrame, exported from the graph on first use"""
+        if self._current_df is None and self.graph is not None:
+            self._current_df = self.graph.to_dataframe()
+        return self._current_df
     
     @property
     def df(self):
         """Get the current DataFrame state"""
         return self.current_df
     
+    def _set_graph(self, graph):
+        """Replace the current component graph"""
+        self.graph = graph
+        self._current_df = None
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Batch several operations into a single write of the cartridge files.
+        The cartridge lock is held for the whole block and the files are written once, when the outermost
+        block exits. The graph is not refreshed inside the block, lookups go through the in-memory lists.
+        If the block raises nothing more is written and the scan state is reset, so hydrate again before reuse.
+        """
+        lock = cartridge_lock(self.output_dir) if self.output_dir else None
+        if lock is not None:
+            lock.acquire()
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self._flush_pending = False
+                self._reset_scan_state()
+            raise
+        else:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0 and self._flush_pending:
+                self._flush_pending = False
+                self._update_cartridge_state()
+        finally:
+            if lock is not None:
+                lock.release()
+    
     def _update_cartridge_state(self):
-        """Write cartridge files and update DataFrame state"""
+        """Write cartridge files and update the cartridge graph"""
+        if self._transaction_depth:
+            # Written once when the transaction ends
+            self._flush_pending = True
+            return
+        
         if self.output_dir:
-            self.write_cartridge_files(self.output_dir)
-            self.current_df = scan_cartridge(self.output_dir)
+            with cartridge_lock(self.output_dir):
+                write_stats = dict(self.write_stats)
+                self.write_cartridge_files(self.output_dir)
+                self.last_write_stats = {key: self.write_stats[key] - write_stats[key] for key in self.write_stats}
+                
+                # Only rescan the files written or removed since the last update
+                changed_files = sorted(self._pending_changes)
+                self._pending_changes = set()
+                rescanned_entries = None
+                if self._scan_entries is None:
+                    self._set_scan_entries(scan_cartridge_entries(self.output_dir, lazy=True))
+                else:
+                    rescanned_entries = self._refresh_scan_entries(changed_files)
+                self.changed_files = changed_files
+                
+                # Keep the course listing summary in step with the files just written
+                refresh_cartridge_summary(self.output_dir)
             
-            # Remove duplicates based on identifier and type
-            if self.current_df is not None and not self.current_df.empty:
-                # Keep only the last occurrence of each identifier+type combination
-                self.current_df = self.current_df.drop_duplicates(
-                    subset=['identifier', 'type'], 
-                    keep='last'
-                ).reset_index(drop=True)
+            # Keep only the last occurrence of each identifier+type combination
+            if rescanned_entries is None or self.graph is None:
+                self._set_graph(CartridgeGraph.from_entries(self._scan_entries, cartridge_entry_sort_key, deduplicate=True))
+            else:
+                # Only the components of the rescanned files are replaced
+                self.graph.set_deduplicate()
+                self.graph.update_entries(self._scan_entries, rescanned_entries)
+                self._current_df = None
             
             if getattr(self, 'verbose', True):
-                print(f"Cartridge state updated. Found {len(self.current_df)} components.")
+                print(f"Cartridge state updated. Found {len(self.graph)} components.")
+    
+    def _reset_scan_state(self):
+        """Forget scanned rows so the next state update does a full scan"""
+        self._scan_entries = None
+        self._file_snapshot = {}
+        self._pending_changes = set()
+        self._entity_fingerprints = {}
+    
+    def _set_scan_entries(self, entries):
+        """Store scanned rows and remember the content hash each file had on disk"""
+        self._scan_entries = entries
+        self._file_snapshot = {}
+        self._pending_changes = set()
+        for (phase, rel_path), rows in entries.items():
+            if rows:
+                self._file_snapshot[rel_path] = self._snapshot_hash(rows[0])
+    
+    def _snapshot_hash(self, row):
+        """Hash of a scanned file's content, taken from its lazy handle when it has one"""
+        content = row['xml_content']
+        if isinstance(content, LazyContent):
+            return content.digest
+        if content is None:
+            # Binary files are not read as text, their scanned SHA-256 stands in
+            return f"sha256:{(row.get('fields') or {}).get('sha256')}"
+        return content_hash(content)
+    
+    def _refresh_scan_entries(self, changed_files):
+        """
+        Rescan only the entries of files that were written or removed.
+        
+        Returns:
+            set: The (phase, rel_path) entries rescanned or removed
+        """
+        cartridge_path = Path(self.output_dir)
+        
+        # Discussion titles in the manifest rows are taken from the discussion files' rows
+        dependencies = set(manifest_dependencies(self._scan_entries.get(('manifest', 'imsmanifest.xml'), [])))
+        
+        entries_to_scan = set()
+        titles_changed = False
+        for rel_path in changed_files:
+            for phase in cartridge_entry_phases(rel_path):
+                entries_to_scan.add((phase, rel_path))
+            titles_changed = titles_changed or rel_path in dependencies or rel_path == 'imsmanifest.xml'
+        
+        for phase, rel_path in entries_to_scan:
+            if (cartridge_path / rel_path).is_file():
+                rows = scan_cartridge_entry(cartridge_path, phase, rel_path, lazy=True)
+                self._scan_entries[(phase, rel_path)] = rows
+                if rows:
+                    self._file_snapshot[rel_path] = self._snapshot_hash(rows[0])
+            else:
+                self._scan_entries.pop((phase, rel_path), None)
+                self._file_snapshot.pop(rel_path, None)
+        
+        if titles_changed:
+            # The manifest components are replaced so they pick up the new titles
+            resolve_discussion_titles(self._scan_entries)
+            entries_to_scan.add(('manifest', 'imsmanifest.xml'))
+        return entries_to_scan
+    
+    def _cartridge_rel_path(self, filepath):
+        """Get a path relative to the cartridge directory, or None if it is outside of it"""
+        if not self.output_dir:
+            return None
+        rel_path = os.path.relpath(os.path.abspath(filepath), os.path.abspath(self.output_dir))
+        if rel_path == '.' or rel_path.startswith('..'):
+            return None
+        return rel_path
+    
+    def _track_cartridge_change(self, path):
+        """Record a file or directory written, moved or removed outside _write_cartridge_file"""
+        rel_path = self._cartridge_rel_path(path)
+        if rel_path is None:
+            return
+        self._pending_changes.add(rel_path)
+        
+        # A removed directory takes all of its files with it
+        prefix = rel_path + os.sep
+        for known_path in self._file_snapshot:
+            if known_path.startswith(prefix):
+                self._pending_changes.add(known_path)
+    
+    def _write_cartridge_file(self, filepath, content):
+        """Write a cartridge file, skipping the write when it already has this content"""
+        rel_path = self._cartridge_rel_path(filepath)
+        if (rel_path is not None and rel_path not in self._pending_changes and
+                self._file_snapshot.get(rel_path) == content_hash(content)):
+            self.write_stats['files_skipped'] += 1
+            return False
+        
+        # Write next to the file and rename over it, so readers never see a partly written file
+        temp_path = temp_file_path(filepath)
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temp_path, filepath)
+        self.write_stats['files_written'] += 1
+        
+        if rel_path is not None:
+            self._pending_changes.add(rel_path)
+        return True
+    
+    def _entity_fingerprint(self, *parts):
+        """Fingerprint of everything an entity's files are rendered from"""
+        return hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+    
+    def _entity_files(self):
+        """List (kind, entity, rel_paths, fingerprint) for each entity written by write_cartridge_files"""
+        # Announcement files are written to their resources' hrefs
+        resource_hrefs = {}
+        for resource in self.resources:
+            resource_hrefs.setdefault(resource['identifier'], resource['href'])
+        
+        entity_files = []
+        for page in self.wiki_pages:
+            entity_files.append(('wiki_page', page, [page['filename']], self._entity_fingerprint(page)))
+        
+        for assignment in self.assignments:
+            rel_paths = [f"{assignment['identifier']}/assignment_settings.xml", f"{assignment['identifier']}/my-first-assignment.html"]
+            entity_files.append(('assignment', assignment, rel_paths, self._entity_fingerprint(assignment)))
+        
+        for quiz in self.quizzes:
+            rel_paths = [f"{quiz['identifier']}/assessment_meta.xml", f"{quiz['identifier']}/assessment_qti.xml",
+                         f"non_cc_assessments/{quiz['identifier']}.xml.qti"]
+            entity_files.append(('quiz', quiz, rel_paths, self._entity_fingerprint(quiz)))
+        
+        for announcement in self.announcements:
+            rel_paths = [resource_hrefs[resource_id] for resource_id in (announcement['topic_id'], announcement['meta_id'])
+                         if resource_id in resource_hrefs]
+            entity_files.append(('announcement', announcement, rel_paths, self._entity_fingerprint(announcement, rel_paths)))
+        
+        for file_info in self.files:
+            entity_files.append(('file', file_info, [file_info['path']], self._entity_fingerprint(file_info)))
+        
+        return entity_files
+    
+    def _mark_entities_clean(self):
+        """Treat every entity as already written, e.g. right after hydrating from the files on disk"""
+        self._entity_fingerprints = {}
+        for kind, entity, rel_paths, fingerprint in self._entity_files():
+            self._entity_fingerprints[(kind, tuple(rel_paths))] = fingerprint
         
     def create_base_cartridge(self, output_dir):
         """Create the base cartridge structure with core files"""
         output_path = Path(output_dir)
+        self._reset_scan_state()
         
         # Remove existing contents if directory is not empty
         if output_path.exists() and any(output_path.iterdir()):
@@ -110,8 +349,7 @@ class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, Cartridge
     def _create_canvas_export_txt(self, filepath):
         """Create canvas_export.txt file"""
         content = "Q: What did the panda say when he was forced out of his natural habitat?\nA: This is un-BEAR-able\n"
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        self._write_cartridge_file(filepath, content)
     
     def _create_course_settings_xml(self, filepath):
         """Create course_settings.xml file"""
@@ -145,8 +383,7 @@ class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, Cartridge
   <enable_course_paces>false</enable_course_paces>
 </course>
 """
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        self._write_cartridge_file(filepath, content)
     
     def _create_context_xml(self, filepath):
         """Create context.xml file"""
@@ -161,8 +398,7 @@ class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, Cartridge
   <canvas_domain>canvas.instructure.com</canvas_domain>
 </context_info>
 """
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        self._write_cartridge_file(filepath, content)
     
     def _create_assignment_groups_xml(self, filepath):
         """Create assignment_groups.xml file"""
@@ -175,8 +411,7 @@ class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, Cartridge
   </assignmentGroup>
 </assignmentGroups>
 """
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        self._write_cartridge_file(filepath, content)
     
     def _create_files_meta_xml(self, filepath):
         """Create files_meta.xml file"""
@@ -184,8 +419,7 @@ class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, Cartridge
 <fileMeta xmlns="http://canvas.instructure.com/xsd/cccv1p0" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://canvas.instructure.com/xsd/cccv1p0 https://canvas.instructure.com/xsd/cccv1p0.xsd">
 </fileMeta>
 """
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        self._write_cartridge_file(filepath, content)
     
     def _create_late_policy_xml(self, filepath):
         """Create late_policy.xml file"""
@@ -201,8 +435,7 @@ class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, Cartridge
   <late_submission_minimum_percent>0.0</late_submission_minimum_percent>
 </late_policy>
 """
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        self._write_cartridge_file(filepath, content)
     
     def _create_media_tracks_xml(self, filepath):
         """Create media_tracks.xml file"""
@@ -210,8 +443,7 @@ class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, Cartridge
 <media_tracks xmlns="http://canvas.instructure.com/xsd/cccv1p0" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://canvas.instructure.com/xsd/cccv1p0 https://canvas.instructure.com/xsd/cccv1p0.xsd">
 </media_tracks>
 """
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        self._write_cartridge_file(filepath, content)
     
     def _create_empty_module_meta_xml(self, filepath):
         """Create empty module_meta.xml file"""
@@ -219,8 +451,7 @@ class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, Cartridge
 <modules xmlns="http://canvas.instructure.com/xsd/cccv1p0" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://canvas.instructure.com/xsd/cccv1p0 https://canvas.instructure.com/xsd/cccv1p0.xsd">
 </modules>
 """
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        self._write_cartridge_file(filepath, content)
     
     def add_module(self, module_title, position=None, published=True):
         """Add a module to the cartridge"""
@@ -295,34 +526,116 @@ class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, Cartridge
         """Write all content files to the cartridge directory"""
         output_path = Path(output_dir)
         
+        # Entity fingerprints only describe what was last written to our own cartridge directory
+        track_entities = bool(self.output_dir) and os.path.abspath(output_dir) == os.path.abspath(self.output_dir)
+        
         # Update module_meta.xml
         self._update_module_meta_xml(output_path / "course_settings" / "module_meta.xml")
         
-        # Create wiki pages
-        for page in self.wiki_pages:
-            self._create_wiki_page_html(output_path / page['filename'], page)
-        
-        # Create assignments
-        for assignment in self.assignments:
-            self._create_assignment_files(output_path, assignment)
-        
-        # Create quizzes
-        for quiz in self.quizzes:
-            self._create_quiz_files(output_path, quiz)
+        entity_files = self._entity_files()
+        key_counts = {}
+        for kind, entity, rel_paths, fingerprint in entity_files:
+            key = (kind, tuple(rel_paths))
+            key_counts[key] = key_counts.get(key, 0) + 1
         
-        # Create announcements
-        for announcement in self.announcements:
-            self._create_announcement_files(output_path, announcement)
-        
-        # Create web resources
-        for file_info in self.files:
-            self._create_web_resource_file(output_path, file_info)
+        fingerprints = {}
+        for kind, entity, rel_paths, fingerprint in entity_files:
+            key = (kind, tuple(rel_paths))
+            
+            # Skip entities unchanged since the last flush whose files are still on disk as written.
+            # Entities sharing files with another entity are always written to keep the last-write-wins order.
+            if (track_entities and key_counts[key] == 1 and self._entity_fingerprints.get(key) == fingerprint and
+                    all(str(Path(rel_path)) in self._file_snapshot and str(Path(rel_path)) not in self._pending_changes
+                        for rel_path in rel_paths)):
+                fingerprints[key] = fingerprint
+                self.write_stats['files_skipped'] += len(rel_paths)
+                if kind == 'quiz':
+                    # Keep tracking the QTI file that rendering the quiz would have registered
+                    if not hasattr(self, 'quiz_qti_files'):
+                        self.quiz_qti_files = {}
+                    self.quiz_qti_files[entity['identifier']] = [f"{entity['identifier']}.xml.qti"]
+                continue
+            
+            if kind == 'wiki_page':
+                self._create_wiki_page_html(output_path / entity['filename'], entity)
+            elif kind == 'assignment':
+                self._create_assignment_files(output_path, entity)
+            elif kind == 'quiz':
+                self._create_quiz_files(output_path, entity)
+            elif kind == 'announcement':
+                self._create_announcement_files(output_path, entity)
+            elif kind == 'file':
+                self._create_web_resource_file(output_path, entity)
+            fingerprints[key] = fingerprint
+        
+        if track_entities:
+            self._entity_fingerprints = fingerprints
+        
+        # List the files with their size, hash and MIME type in files_meta.xml, once they are all in place
+        if self.files:
+            self._update_files_meta_xml(output_path / "course_settings" / "files_meta.xml")
         
         # Create manifest
         self._create_imsmanifest_xml(output_path / "imsmanifest.xml")
         
         return str(output_path)
     
+    def _update_files_meta_xml(self, filepath):
+        """
+        Update files_meta.xml with all files.
+        Each file is described at its current path: binary files by the size and hash kept in their entity,
+        text files by the file on disk when there is one, so a renamed or rewritten file is listed as it is now.
+        """
+        import html
+        
+        cartridge_path = filepath.parent.parent
+        file_digests = {}
+        content = """<?xml version="1.0" encoding="UTF-8"?>
+<fileMeta xmlns="http://canvas.instructure.com/xsd/cccv1p0" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://canvas.instructure.com/xsd/cccv1p0 https://canvas.instructure.com/xsd/cccv1p0.xsd">
+  <files>
+"""
+        for file_info in self.files:
+            filename = Path(file_info['path']).name
+            if file_info.get('binary'):
+                digest = file_info
+                mime_type = file_info['mime_type']
+            else:
+                digest = self._text_file_digest(cartridge_path / file_info['path'], file_info, file_digests)
+                mime_type = attachment_info(filename, digest)['mime_type']
+            content += f"""    <file identifier="{file_info['identifier']}">
+      <display_name>{html.escape(filename)}</display_name>
+      <content_type>{html.escape(mime_type)}</content_type>
+      <size>{digest['size']}</size>
+      <sha256>{digest['sha256']}</sha256>
+    </file>
+"""
+        content += """  </files>
+</fileMeta>
+"""
+        # Only the files listed now are remembered
+        self._file_digests = file_digests
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        self._write_cartridge_file(filepath, content)
+    
+    def _text_file_digest(self, file_path, file_info, file_digests):
+        """Size and SHA-256 of a text file on disk, hashed again only when its stat changes"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            # Not written to this directory, described by its content
+            return text_digest(load_content(file_info['content']))
+        
+        key = str(file_path)
+        stat_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        cached = self._file_digests.get(key)
+        # A file modified right around now may change again without its stat changing, so it is always hashed
+        if cached is not None and cached[0] == stat_key and stat.st_mtime_ns + RACY_WINDOW_NS < time.time_ns():
+            digest = cached[1]
+        else:
+            digest = file_digest(file_path)
+        file_digests[key] = (stat_key, digest)
+        return digest
+    
     def _update_module_meta_xml(self, filepath):
         """Update module_meta.xml with all modules"""
         content = """<?xml version="1.0" encoding="UTF-8"?>
@@ -364,8 +677,7 @@ class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, Cartridge
         
         content += "</modules>\n"
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        self._write_cartridge_file(filepath, content)
     
     def _create_wiki_page_html(self, filepath, page):
         """Create wiki page HTML file"""
@@ -383,8 +695,7 @@ class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, Cartridge
 </html>"""
         
         filepath.parent.mkdir(parents=True, exist_ok=True)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        self._write_cartridge_file(filepath, content)
     
     def _create_assignment_files(self, output_path, assignment):
         """Create assignment files"""
@@ -436,8 +747,7 @@ class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, Cartridge
 </assignment>
 """
         
-        with open(assignment_dir / "assignment_settings.xml", 'w', encoding='utf-8') as f:
-            f.write(settings_content)
+        self._write_cartridge_file(assignment_dir / "assignment_settings.xml", settings_content)
         
         # Create assignment content HTML
         html_content = f"""<html>
@@ -450,8 +760,7 @@ class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, Cartridge
 </body>
 </html>"""
         
-        with open(assignment_dir / "my-first-assignment.html", 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        self._write_cartridge_file(assignment_dir / "my-first-assignment.html", html_content)
     
     def _create_quiz_files(self, output_path, quiz):
         """Create quiz files"""
@@ -462,11 +771,19 @@ class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, Cartridge
         if not hasattr(self, 'quiz_qti_files'):
             self.quiz_qti_files = {}
         
+        # Escape the description for XML, wrapping plain text in <p> tags like discussion topics
+        import html
+        description = quiz['description']
+        if description and '<' in description and '>' in description:
+            escaped_description = html.escape(description)
+        else:
+            escaped_description = html.escape(f'<p>{description}</p>')
+        
         # Create assessment_meta.xml
         meta_content = f"""<?xml version="1.0" encoding="UTF-8"?>
 <quiz identifier="{quiz['identifier']}" xmlns="http://canvas.instructure.com/xsd/cccv1p0" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://canvas.instructure.com/xsd/cccv1p0 https://canvas.instructure.com/xsd/cccv1p0.xsd">
   <title>{quiz['title']}</title>
-  <description>&lt;p&gt;{quiz['description']}&lt;/p&gt;</description>
+  <description>{escaped_description}</description>
   <shuffle_answers>false</shuffle_answers>
   <scoring_policy>keep_highest</scoring_policy>
   <hide_results>always</hide_results>
@@ -536,8 +853,7 @@ class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, Cartridge
 </quiz>
 """
         
-        with open(quiz_dir / "assessment_meta.xml", 'w', encoding='utf-8') as f:
-            f.write(meta_content)
+        self._write_cartridge_file(quiz_dir / "assessment_meta.xml", meta_content)
         
         # Create assessment_qti.xml
         qti_content = f"""<?xml version="1.0" encoding="UTF-8"?>
@@ -617,15 +933,13 @@ class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, Cartridge
 </questestinterop>
 """
         
-        with open(quiz_dir / "assessment_qti.xml", 'w', encoding='utf-8') as f:
-            f.write(qti_content)
+        self._write_cartridge_file(quiz_dir / "assessment_qti.xml", qti_content)
         
         # Create QTI file in non_cc_assessments - only create one file per quiz
         qti_path = output_path / "non_cc_assessments" / f"{quiz['identifier']}.xml.qti"
         qti_path.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(qti_path, 'w', encoding='utf-8') as f:
-            f.write(qti_content)
+        self._write_cartridge_file(qti_path, qti_content)
         
         # Track QTI files for this quiz (only one now)
         self.quiz_qti_files[quiz['identifier']] = [f"{quiz['identifier']}.xml.qti"]
@@ -683,8 +997,7 @@ class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, Cartridge
         # Ensure directory exists and write topic file
         if topic_file_path:
             topic_file_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(topic_file_path, 'w', encoding='utf-8') as f:
-                f.write(topic_content)
+            self._write_cartridge_file(topic_file_path, topic_content)
         
         # Create announcement meta XML (topicMeta)
         meta_content = f"""<?xml version="1.0" encoding="UTF-8"?>
@@ -712,16 +1025,70 @@ class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, Cartridge
         # Ensure directory exists and write meta file
         if meta_file_path:
             meta_file_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(meta_file_path, 'w', encoding='utf-8') as f:
-                f.write(meta_content)
+            self._write_cartridge_file(meta_file_path, meta_content)
     
     def _create_web_resource_file(self, output_path, file_info):
         """Create web resource file"""
         file_path = output_path / file_info['path']
         file_path.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(file_info['content'])
+        if file_info.get('binary'):
+            self._copy_attachment_file(file_path, file_info)
+            return
+        
+        self._write_cartridge_file(file_path, load_content(file_info['content']))
+    
+    def _copy_attachment_file(self, file_path, file_info):
+        """Copy a binary file's bytes from its source in chunks, skipping the copy when they are already in place"""
+        source = file_info.get('source')
+        if source is None and self.output_dir:
+            source = Path(self.output_dir) / file_info['path']
+        if source is None or os.path.abspath(source) == os.path.abspath(file_path):
+            self.write_stats['files_skipped'] += 1
+            return False
+        
+        # With a blob store the copy is a link to the stored payload
+        if self.blob_store is not None and self.blob_store.add_file(source, file_info['sha256']):
+            self.blob_store.link_to(file_info['sha256'], file_path)
+        else:
+            with open(source, 'rb') as f:
+                stream_to_file(f, file_path)
+        self.write_stats['files_written'] += 1
+        
+        if self._cartridge_rel_path(file_path) is not None:
+            # The bytes are at the file's own path from now on
+            file_info['source'] = None
+            self._track_cartridge_change(file_path)
+        return True
+    
+    def _new_file_info(self, filename, file_content):
+        """
+        Build the entity of a new web resource file.
+        Text content is held in the entity. Any other content (bytes, a binary file object or an iterable of
+        bytes chunks, e.g. an upload) is streamed straight to web_resources/ and only described by its size,
+        hash and MIME type.
+        
+        Returns:
+            dict: File entity without its identifier
+        
+        Raises:
+            ValueError: If binary content is given to a generator without a cartridge directory
+        """
+        path = f"web_resources/{filename}"
+        if isinstance(file_content, str):
+            return {'filename': filename, 'content': file_content, 'path': path}
+        
+        if not self.output_dir:
+            raise ValueError("Binary file content needs a cartridge directory to be written to")
+        file_path = Path(self.output_dir) / path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        with cartridge_lock(self.output_dir):
+            digest = stream_to_file(file_content, file_path)
+            if self.blob_store is not None:
+                # A payload already stored for any cartridge is kept once
+                self.blob_store.add_file(file_path, digest['sha256'])
+            self._track_cartridge_change(file_path)
+        return {'filename': filename, 'path': path, **attachment_info(filename, digest)}
     
     def _create_imsmanifest_xml(self, filepath):
         """Create imsmanifest.xml file"""
@@ -854,8 +1221,7 @@ class CartridgeGenerator(CartridgeDeletionMixin, CartridgeUpdateMixin, Cartridge
 </manifest>
 """
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        self._write_cartridge_file(filepath, content)
 
 
 def count_files_and_lines(directory):
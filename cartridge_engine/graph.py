@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Cartridge Graph
+Typed in-memory model of the components extracted by scan_cartridge, indexed by identifier,
+identifierref and (type, title) so lookups do not have to filter a whole DataFrame
+"""
+
+import bisect
+from collections import Counter
+from dataclasses import dataclass
+from .lazy_content import load_content, load_rows_content
+
+# Columns of a scanned component, in the order scan_cartridge emits them
+COLUMNS = ('type', 'identifier', 'title', 'workflow_state', 'position', 'content_type',
+           'identifierref', 'href', 'resource_type', 'filename', 'xml_content')
+
+
+def _float_or_none(value):
+    """A scanned number, or None if it is not one"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(slots=True)
+class Component:
+    """A single component extracted from a cartridge file"""
+    type: str
+    identifier: str = None
+    title: str = None
+    workflow_state: str = None
+    position: str = None
+    content_type: str = None
+    identifierref: str = None
+    href: str = None
+    resource_type: str = None
+    filename: str = None
+    content: object = None  # Text of the component, or a LazyContent handle to it
+    fields: dict = None  # Values the scanner already parsed out of the file, such as page bodies or points
+
+    # Typed attributes of a subclass set from the scanned fields of the same name, with their conversions
+    FIELDS = {}
+
+    @classmethod
+    def from_row(cls, row):
+        """Build a component from a scanned row"""
+        component = cls(*[row.get(column) for column in COLUMNS[:-1]], row.get('xml_content'), row.get('fields'))
+        if component.fields:
+            for name, convert in cls.FIELDS.items():
+                value = component.fields.get(name)
+                if value is not None:
+                    setattr(component, name, convert(value))
+        return component
+
+    @property
+    def xml_content(self):
+        """Text of the component, read from the cartridge each time if it is held as a lazy handle"""
+        return load_content(self.content)
+
+    @property
+    def order(self):
+        """Position as a number, 1 when the component has none"""
+        return int(self.position) if self.position else 1
+
+    @property
+    def published(self):
+        """Whether the component is published, components without a workflow state are"""
+        return (self.workflow_state or 'published') != 'unpublished'
+
+    def to_row(self):
+        """Get the component as a scanned row, keeping lazy content as a handle"""
+        row = {column: getattr(self, column) for column in COLUMNS[:-1]}
+        row['xml_content'] = self.content
+        if self.fields is not None:
+            row['fields'] = self.fields
+        return row
+
+    def get(self, column, default=None):
+        """Get a column value, like a DataFrame row"""
+        value = getattr(self, column, None)
+        return default if value is None else value
+
+
+@dataclass(slots=True)
+class CourseSettings(Component):
+    """course_settings/course_settings.xml"""
+    course_title: str = None
+    course_code: str = None
+
+    FIELDS = {'course_title': str, 'course_code': str}
+
+
+@dataclass(slots=True)
+class Module(Component):
+    """A module from course_settings/module_meta.xml, its items follow it in the organization of the manifest"""
+
+
+@dataclass(slots=True)
+class ModuleItem(Component):
+    """An item of a module from course_settings/module_meta.xml, pointing at its resource by identifierref"""
+
+
+@dataclass(slots=True)
+class Resource(Component):
+    """A resource declared in imsmanifest.xml, resource_type and href say what and where it is"""
+
+
+@dataclass(slots=True)
+class WikiPage(Component):
+    """A page from wiki_content/"""
+    body: str = None  # HTML inside <body>, None when the row came from the scan index
+
+    FIELDS = {'body': str}
+
+
+@dataclass(slots=True)
+class AssignmentContent(Component):
+    """The HTML page of an assignment"""
+    body: str = None  # HTML inside <body>, None when the row came from the scan index
+
+    FIELDS = {'body': str}
+
+
+@dataclass(slots=True)
+class Assignment(Component):
+    """The assignment_settings.xml of an assignment"""
+    points_possible: float = None
+
+    FIELDS = {'points_possible': _float_or_none}
+
+
+@dataclass(slots=True)
+class Quiz(Component):
+    """The assessment_meta.xml of a quiz"""
+    points_possible: float = None
+    description: str = None
+    assignment_identifier: str = None
+    assignment_group_identifierref: str = None
+
+    FIELDS = {'points_possible': _float_or_none, 'description': str,
+              'assignment_identifier': str, 'assignment_group_identifierref': str}
+
+
+@dataclass(slots=True)
+class Discussion(Component):
+    """A file from discussions/, a topic or the topicMeta pointing at one"""
+    body: str = None  # Unescaped HTML of a topic, None when the row came from the scan index
+    topic_ids: list = None  # Topics a topicMeta file references
+
+    FIELDS = {'body': str, 'topic_ids': list}
+
+
+@dataclass(slots=True)
+class File(Component):
+    """A file from web_resources/, binary files are described by their size, hash and MIME type instead of text"""
+    binary: bool = False
+    size: int = None
+    sha256: str = None
+    mime_type: str = None
+
+    FIELDS = {'binary': bool, 'size': int, 'sha256': str, 'mime_type': str}
+
+
+# Component class used for each scanned type, anything else is a plain Component
+COMPONENT_CLASSES = {
+    'course_settings': CourseSettings,
+    'module': Module,
+    'module_item': ModuleItem,
+    'resource': Resource,
+    'wiki_page': WikiPage,
+    'assignment_content': AssignmentContent,
+    'assignment_settings': Assignment,
+    'assessment_meta': Quiz,
+    'discussion_topic': Discussion,
+    'discussions_file': Discussion,
+    'web_resources_file': File
+}
+
+
+def component_from_row(row):
+    """Build the typed component for a scanned row"""
+    return COMPONENT_CLASSES.get(row.get('type'), Component).from_row(row)
+
+
+class CartridgeGraph:
+    """
+    Components of a cartridge in scan order, with hash indexes for the lookups the engine does.
+    Components are grouped by the scanned entry they come from, so when files are rescanned only their
+    components are replaced in the indexes. With deduplicate, only the last component of each
+    (identifier, type) pair is indexed, like DataFrame.drop_duplicates(subset=['identifier', 'type'], keep='last').
+    """
+
+    def __init__(self, components=(), deduplicate=False, sort_key=None):
+        self.deduplicate = deduplicate
+        self.components = []
+        self._by_type = {}
+        self._by_identifier = {}
+        self._by_identifierref = {}
+        self._by_type_title = {}
+        # Every component of each (identifier, type) pair in scan order, the last one is indexed when deduplicating
+        self._by_key = {}
+        # Components of each entry, and the scan order of entries and components
+        self._entries = {}
+        self._entry_orders = {}
+        self._entry_count = 0
+        self._orders = {}
+        self._sort_key = sort_key
+        components = list(components)
+        if components:
+            self.set_entry(None, components)
+
+    @classmethod
+    def from_rows(cls, rows, deduplicate=False):
+        """
+        Build a graph from scanned rows.
+
+        Args:
+            rows (iterable): Scanned rows, in scan order
+            deduplicate (bool): Keep only the last component of each (identifier, type) pair
+
+        Returns:
+            CartridgeGraph: The graph of the rows
+        """
+        return cls([component_from_row(row) for row in rows], deduplicate=deduplicate)
+
+    @classmethod
+    def from_entries(cls, entries, sort_key, deduplicate=False):
+        """
+        Build a graph from scanned rows grouped by entry, that update_entries keeps up to date.
+
+        Args:
+            entries (dict): {entry: scanned rows}, entries of equal sort key in scan order
+            sort_key (callable): Sort key that orders entries the way they are scanned
+            deduplicate (bool): Keep only the last component of each (identifier, type) pair
+
+        Returns:
+            CartridgeGraph: The graph of the entries
+        """
+        graph = cls(deduplicate=deduplicate, sort_key=sort_key)
+        for entry, rows in sorted(entries.items(), key=lambda item: sort_key(item[0])):
+            graph.set_entry(entry, [component_from_row(row) for row in rows])
+        return graph
+
+    def update_entries(self, entries, changed_entries):
+        """
+        Replace the components of rescanned entries in place.
+
+        Args:
+            entries (dict): {entry: scanned rows} after the rescan
+            changed_entries (iterable): Entries rescanned or removed from entries
+        """
+        for entry in changed_entries:
+            if entry in entries:
+                self.set_entry(entry, [component_from_row(row) for row in entries[entry]])
+            else:
+                self.remove_entry(entry)
+
+    def set_entry(self, entry, components):
+        """Replace the components of an entry, a new entry is ordered after those of equal sort key"""
+        order = self._entry_orders.get(entry)
+        if order is None:
+            # Components added without an entry come first
+            sort_key = self._sort_key(entry) if entry is not None else ()
+            order = self._entry_orders[entry] = (sort_key, self._entry_count)
+            self._entry_count += 1
+        else:
+            for component in self._entries[entry]:
+                self._remove(component)
+        self._entries[entry] = components
+        for i, component in enumerate(components):
+            self._add(component, (order, i))
+
+    def remove_entry(self, entry):
+        """Remove the components of an entry"""
+        if entry not in self._entries:
+            return
+        for component in self._entries.pop(entry):
+            self._remove(component)
+        del self._entry_orders[entry]
+
+    def set_deduplicate(self):
+        """Index only the last component of each (identifier, type) pair from now on"""
+        if self.deduplicate:
+            return
+        self.deduplicate = True
+        for components in self._by_key.values():
+            for component in components[:-1]:
+                self._unindex(component)
+
+    def _order_of(self, component):
+        return self._orders[id(component)]
+
+    def _add(self, component, order):
+        """Add a component at its scan order and index it"""
+        self._orders[id(component)] = order
+        components = self._by_key.setdefault((component.identifier, component.type), [])
+        self._insert(components, component, order)
+        if self.deduplicate and len(components) > 1:
+            if components[-1] is not component:
+                return
+            self._unindex(components[-2])
+        self._index(component, order)
+
+    def _remove(self, component):
+        """Remove a component from the indexes, indexing the duplicate it hid if there is one"""
+        key = (component.identifier, component.type)
+        components = self._by_key[key]
+        indexed = not self.deduplicate or components[-1] is component
+        self._delete(components, component)
+        if not components:
+            del self._by_key[key]
+        if indexed:
+            self._unindex(component)
+            if self.deduplicate and components:
+                self._index(components[-1], self._order_of(components[-1]))
+        del self._orders[id(component)]
+
+    def _index(self, component, order):
+        self._insert(self.components, component, order)
+        for index, key in self._index_keys(component):
+            self._insert(index.setdefault(key, []), component, order)
+
+    def _unindex(self, component):
+        self._delete(self.components, component)
+        for index, key in self._index_keys(component):
+            self._delete(index[key], component)
+            if not index[key]:
+                del index[key]
+
+    def _index_keys(self, component):
+        """The indexes a component is listed in, with its key in each"""
+        keys = [(self._by_type, component.type), (self._by_type_title, (component.type, component.title))]
+        if component.identifier is not None:
+            keys.append((self._by_identifier, component.identifier))
+        if component.identifierref is not None:
+            keys.append((self._by_identifierref, component.identifierref))
+        return keys
+
+    def _insert(self, components, component, order):
+        """Insert a component in a list in scan order, appending it when it comes last as while building"""
+        if not components or self._orders[id(components[-1])] < order:
+            components.append(component)
+        else:
+            bisect.insort(components, component, key=self._order_of)
+
+    def _delete(self, components, component):
+        """Delete a component from a list in scan order, where no two components share an order"""
+        del components[bisect.bisect_left(components, self._order_of(component), key=self._order_of)]
+
+    def add(self, component):
+        """Add a component after the others of the graph's own entry and index it"""
+        if None not in self._entries:
+            self.set_entry(None, [])
+        components = self._entries[None]
+        components.append(component)
+        self._add(component, (self._entry_orders[None], len(components) - 1))
+
+    def __len__(self):
+        return len(self.components)
+
+    def __iter__(self):
+        return iter(self.components)
+
+    def of_type(self, component_type):
+        """Get all components of a type, in scan order"""
+        return self._by_type.get(component_type, [])
+
+    def find(self, component_type, title):
+        """Get the components of a type with the given title, in scan order"""
+        return self._by_type_title.get((component_type, title), [])
+
+    def first(self, component_type, title=None):
+        """Get the first component of a type, optionally with the given title, or None"""
+        components = self.of_type(component_type) if title is None else self.find(component_type, title)
+        return components[0] if components else None
+
+    def get(self, identifier, component_type=None):
+        """Get the first component with an identifier, optionally of a type, or None"""
+        for component in self._by_identifier.get(identifier, []):
+            if component_type is None or component.type == component_type:
+                return component
+        return None
+
+    def referencing(self, identifierref, component_type=None):
+        """Get the components whose identifierref points at an identifier, in scan order"""
+        return [component for component in self._by_identifierref.get(identifierref, [])
+                if component_type is None or component.type == component_type]
+
+    def titles(self, component_type):
+        """Get the titles of all components of a type, in scan order"""
+        return [component.title for component in self.of_type(component_type)]
+
+    def type_counts(self):
+        """Get the number of components of each type, most common first"""
+        return dict(Counter(component.type for component in self.components).most_common())
+
+    def to_dataframe(self):
+        """Export the components as the DataFrame scan_cartridge returns, for inspection (requires pandas)"""
+        import pandas as pd
+        return pd.DataFrame(load_rows_content([component.to_row() for component in self.components]), columns=COLUMNS)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Lazy Content
+Handles that stand in for the xml_content of scanned rows, so the text of every file in a cartridge
+does not have to stay in memory and is only read back from disk when it is actually used
+"""
+
+import hashlib
+import xml.etree.ElementTree as ET
+
+
+def read_file_content(file_path):
+    """Read a cartridge file as text, tolerating binary content"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except UnicodeDecodeError:
+        # Handle binary files
+        with open(file_path, 'rb') as f:
+            return f.read().decode('utf-8', errors='replace')
+
+
+def content_hash(content):
+    """Hash of a scanned file's text content"""
+    return hashlib.sha1(content.encode('utf-8', errors='surrogatepass')).hexdigest()
+
+
+class LazyContent:
+    """
+    Handle to the text of a cartridge file, or of one element re-serialized from it.
+    Elements are addressed by their position in the file's root.iter() order.
+    """
+    __slots__ = ('path', 'element_index', 'digest')
+
+    def __init__(self, path, element_index=None, digest=None):
+        self.path = str(path)
+        self.element_index = element_index
+        self.digest = digest
+
+    def load(self):
+        """Read the text from disk"""
+        if self.element_index is None:
+            return read_file_content(self.path)
+
+        root = ET.parse(self.path).getroot()
+        for i, element in enumerate(root.iter()):
+            if i == self.element_index:
+                return ET.tostring(element, encoding='unicode')
+        raise ValueError(f"Element {self.element_index} not found in {self.path}")
+
+    def __eq__(self, other):
+        if not isinstance(other, LazyContent):
+            return NotImplemented
+        return (self.path, self.element_index, self.digest) == (other.path, other.element_index, other.digest)
+
+    def __repr__(self):
+        return f"LazyContent({self.path!r}, element_index={self.element_index!r}, digest={self.digest!r})"
+
+
+def load_content(value):
+    """Get the text of an xml_content value, reading it from disk if it is a lazy handle"""
+    if isinstance(value, LazyContent):
+        return value.load()
+    return value
+
+
+def load_rows_content(rows):
+    """
+    Get copies of scanned rows with their lazy xml_content read from disk.
+    Each file is read, or parsed for element handles, only once however many rows point into it.
+    """
+    file_contents = {}
+    file_elements = {}
+    loaded_rows = []
+    for row in rows:
+        content = row.get('xml_content')
+        if isinstance(content, LazyContent):
+            if content.element_index is None:
+                if content.path not in file_contents:
+                    file_contents[content.path] = read_file_content(content.path)
+                content = file_contents[content.path]
+            else:
+                if content.path not in file_elements:
+                    file_elements[content.path] = list(ET.parse(content.path).getroot().iter())
+                content = ET.tostring(file_elements[content.path][content.element_index], encoding='unicode')
+            row = dict(row, xml_content=content)
+        loaded_rows.append(row)
+    return loaded_rows
+
+
+def lazy_entry_rows(file_path, rows):
+    """
+    Replace the xml_content of the rows scanned from a file with lazy handles.
+    The first row always carries the whole file, the others either the whole file too or a re-serialized element.
+
+    Returns:
+        list: Copies of the rows, with the content of the file's first row hashed into every whole-file handle
+    """
+    if not rows:
+        return rows
+
+    file_content = rows[0]['xml_content']
+    if file_content is None:
+        # Binary files have no text content to point back to
+        return rows
+
+    whole_file = LazyContent(file_path, digest=content_hash(file_content))
+
+    # Elements of the file by identifier, only parsed when some row holds an element
+    elements_by_identifier = None
+
+    lazy_rows = []
+    for row in rows:
+        content = row['xml_content']
+        if content is file_content or content == file_content:
+            lazy_rows.append(dict(row, xml_content=whole_file))
+            continue
+
+        if elements_by_identifier is None:
+            elements_by_identifier = {}
+            try:
+                for i, element in enumerate(ET.fromstring(file_content).iter()):
+                    identifier = element.get('identifier')
+                    if identifier is not None:
+                        elements_by_identifier.setdefault(identifier, []).append((i, element))
+            except ET.ParseError:
+                pass
+
+        element_index = None
+        for i, element in elements_by_identifier.get(row.get('identifier'), []):
+            if ET.tostring(element, encoding='unicode') == content:
+                element_index = i
+                break
+
+        if element_index is None:
+            # Content that cannot be found again in the file stays in memory
+            lazy_rows.append(row)
+        else:
+            lazy_rows.append(dict(row, xml_content=LazyContent(file_path, element_index, whole_file.digest)))
+
+    return lazy_rows
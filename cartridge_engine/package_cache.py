@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Package Cache
+Content-addressed cache of packaged cartridges. Archives are keyed by a Merkle digest of the cartridge tree,
+so an unchanged cartridge is served from memory and only packaged again once its content changes
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from .cartridge_lock import cartridge_lock
+from .packager import iter_cartridge_files, snapshot_cartridge_files, stream_zip_entries
+from .scan_index import RACY_WINDOW_NS
+
+# Default byte budget of the archives held by a PackageCache
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Cartridges whose file hashes are remembered, beyond those with a cached archive
+MAX_HASHED_CARTRIDGES = 64
+
+
+def file_digest(file_path):
+    """Hash of a file's bytes"""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def tree_digest(entries):
+    """
+    Merkle digest of a cartridge tree.
+    Each directory hashes the names, kinds and digests of its children, so the root digest changes
+    whenever any archived file is added, removed, renamed or modified.
+
+    Args:
+        entries (iterable): (arcname, digest) pairs, directory arcnames ending in '/' with a digest of None
+
+    Returns:
+        str: Hex digest of the tree
+    """
+    children = {'': []}
+    for arcname, digest in entries:
+        if arcname.endswith('/'):
+            children.setdefault(arcname, [])
+        parent = arcname.rstrip('/').rpartition('/')[0]
+        parent = f"{parent}/" if parent else ''
+        children.setdefault(parent, []).append((arcname, digest))
+
+    # Deepest directories first, so every subdirectory is hashed before its parent
+    node_digests = {}
+    for directory in sorted(children, key=lambda name: name.count('/'), reverse=True):
+        node = hashlib.sha1()
+        for arcname, digest in sorted(children[directory]):
+            if arcname.endswith('/'):
+                node.update(f"d {arcname} {node_digests[arcname]}\n".encode('utf-8'))
+            else:
+                node.update(f"f {arcname} {digest}\n".encode('utf-8'))
+        node_digests[directory] = node.hexdigest()
+    return node_digests['']
+
+
+class PackageCache:
+    """
+    LRU cache of packaged cartridges bounded by a byte budget.
+    File hashes are remembered by stat, so computing the digest of an unchanged cartridge only stats its files.
+    They are kept per cartridge for the files it last had, and dropped with the cartridge's cached archives or
+    once more than MAX_HASHED_CARTRIDGES cartridges are remembered.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._archives = OrderedDict()
+        self._archive_roots = {}
+        self._size = 0
+        self._file_hashes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def digest(self, cartridge_path):
+        """
+        Get the Merkle digest of a cartridge's archived files.
+
+        Args:
+            cartridge_path (str): Path to the unzipped cartridge directory
+
+        Returns:
+            str: Hex digest of the cartridge tree
+        """
+        root = os.path.abspath(cartridge_path)
+        with self._lock:
+            known = self._file_hashes.get(root, {})
+
+        now_ns = time.time_ns()
+        entries = []
+        hashes = {}
+        for path, arcname in iter_cartridge_files(cartridge_path):
+            if arcname.endswith('/'):
+                entries.append((arcname, None))
+                continue
+
+            stat = os.stat(path)
+            stat_key = (stat.st_mtime_ns, stat.st_size)
+            cached = known.get(arcname)
+            # A file modified right around now may change again without its stat changing, so it is always hashed
+            if cached is not None and cached[0] == stat_key and stat.st_mtime_ns + RACY_WINDOW_NS < now_ns:
+                digest = cached[1]
+            else:
+                digest = file_digest(path)
+            hashes[arcname] = (stat_key, digest)
+            entries.append((arcname, digest))
+
+        # Only the files the cartridge has now are remembered, so removed and renamed files are forgotten
+        with self._lock:
+            self._file_hashes[root] = hashes
+            self._file_hashes.move_to_end(root)
+            while len(self._file_hashes) > MAX_HASHED_CARTRIDGES:
+                self._file_hashes.popitem(last=False)
+        return tree_digest(entries)
+
+    def get(self, digest):
+        """Get the cached archive for a digest, or None"""
+        with self._lock:
+            archive = self._archives.get(digest)
+            if archive is not None:
+                self._archives.move_to_end(digest)
+            return archive
+
+    def put(self, digest, archive, cartridge_path=None):
+        """
+        Cache an archive, evicting the least recently used ones to stay within the byte budget.
+        When a cartridge has no cached archive left its file hashes are dropped as well.
+        """
+        if len(archive) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._archives.pop(digest, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._archives[digest] = archive
+            self._size += len(archive)
+            if cartridge_path is not None:
+                self._archive_roots[digest] = os.path.abspath(cartridge_path)
+            while self._size > self.max_bytes:
+                evicted_digest, evicted = self._archives.popitem(last=False)
+                self._size -= len(evicted)
+                root = self._archive_roots.pop(evicted_digest, None)
+                if root is not None and root not in self._archive_roots.values():
+                    self._file_hashes.pop(root, None)
+
+    def stream(self, cartridge_path):
+        """
+        Stream a cartridge as ZIP chunks, from a snapshot of its files taken under its lock with the digest,
+        so no edit lands in the archive sent. The archive is cached once complete if it fits the budget.
+
+        Args:
+            cartridge_path (str): Path to the unzipped cartridge directory
+
+        Returns:
+            tuple: (digest, iterable of the archive's chunks)
+        """
+        with cartridge_lock(cartridge_path):
+            digest = self.digest(cartridge_path)
+            archive = self.get(digest)
+            if archive is not None:
+                return digest, [archive]
+            snapshot_path, entries = snapshot_cartridge_files(cartridge_path)
+        return digest, self._stream_snapshot(cartridge_path, digest, snapshot_path, entries)
+
+    def _stream_snapshot(self, cartridge_path, digest, snapshot_path, entries):
+        """Yield the ZIP chunks of a snapshot and cache the archive, then remove the snapshot"""
+        try:
+            chunks = []
+            size = 0
+            for chunk in stream_zip_entries(entries):
+                if chunks is not None:
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        chunks = None
+                    else:
+                        chunks.append(chunk)
+                yield chunk
+
+            if chunks is not None:
+                self.put(digest, b''.join(chunks), cartridge_path)
+        finally:
+            shutil.rmtree(snapshot_path, ignore_errors=True)
+
+    def clear(self):
+        """Drop every cached archive and file hash"""
+        with self._lock:
+            self._archives.clear()
+            self._archive_roots.clear()
+            self._size = 0
+            self._file_hashes.clear()
+
+    @property
+    def size(self):
+        """Total bytes of the cached archives"""
+        return self._size
+
+    def __len__(self):
+        return len(self._archives)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Cartridge Packager
+Writes an unzipped cartridge directory as a ZIP (.imscc) archive, either to a file or as a stream of
+chunks produced while the files are read, so a download can start before the archive is complete
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from .scan_index import INDEX_DIR, is_temp_file
+
+# Files the tools write into a cartridge directory that are not part of the cartridge
+EXCLUDED_FILES = {'table_inspect.html'}
+
+# Size of the reads from cartridge files, and the least size of the chunks yielded by stream_cartridge_zip
+CHUNK_SIZE = 64 * 1024
+
+# Directory of the scan index that download snapshots are linked into, and the age after which one is stale
+SNAPSHOT_DIR = 'snapshots'
+SNAPSHOT_MAX_AGE = 24 * 60 * 60
+
+
+def iter_cartridge_files(cartridge_path):
+    """
+    Walk a cartridge directory in archive order.
+
+    Args:
+        cartridge_path (str): Path to the unzipped cartridge directory
+
+    Yields:
+        tuple: (path, arcname) of each directory and file, directory arcnames ending in '/'
+    """
+    cartridge_path = Path(cartridge_path)
+    for root, dirs, files in os.walk(cartridge_path):
+        # The scan index is a local cache, not part of the cartridge
+        dirs[:] = sorted(d for d in dirs if d != INDEX_DIR)
+        for name in dirs:
+            dir_path = Path(root) / name
+            yield dir_path, f"{dir_path.relative_to(cartridge_path).as_posix()}/"
+        for name in sorted(files):
+            if name in EXCLUDED_FILES or is_temp_file(name):
+                continue
+            file_path = Path(root) / name
+            yield file_path, file_path.relative_to(cartridge_path).as_posix()
+
+
+def write_cartridge_zip(cartridge_path, zip_path):
+    """Package a cartridge directory into a ZIP file"""
+    with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for path, arcname in iter_cartridge_files(cartridge_path):
+            zf.write(path, arcname)
+
+
+class _ChunkBuffer:
+    """Write-only, unseekable file object that collects what ZipFile writes until it is drained"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.pending = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        self.pending += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """Get and clear everything written since the last drain"""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        self.pending = 0
+        return data
+
+
+def stream_cartridge_zip(cartridge_path, chunk_size=CHUNK_SIZE):
+    """
+    Package a cartridge directory as a stream of ZIP chunks, without writing the archive anywhere.
+    Files are read and compressed one chunk at a time, so memory use does not grow with the cartridge.
+
+    Args:
+        cartridge_path (str): Path to the unzipped cartridge directory
+        chunk_size (int): Size of the reads from each file, and of the chunks yielded
+
+    Yields:
+        bytes: Consecutive parts of the archive
+    """
+    return stream_zip_entries(iter_cartridge_files(cartridge_path), chunk_size)
+
+
+def stream_zip_entries(entries, chunk_size=CHUNK_SIZE):
+    """
+    Package (path, arcname) entries, as yielded by iter_cartridge_files, as a stream of ZIP chunks.
+
+    Yields:
+        bytes: Consecutive parts of the archive
+    """
+    buffer = _ChunkBuffer()
+    # An unseekable output makes ZipFile write sizes and CRCs in data descriptors after each file
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for path, arcname in entries:
+            if arcname.endswith('/'):
+                zf.write(path, arcname)
+            else:
+                info = zipfile.ZipInfo.from_file(path, arcname)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with open(path, 'rb') as src, zf.open(info, 'w') as dest:
+                    while True:
+                        data = src.read(chunk_size)
+                        if not data:
+                            break
+                        dest.write(data)
+                        if buffer.pending >= chunk_size:
+                            yield buffer.drain()
+
+            # Small files are batched so the response is not split into tiny writes
+            if buffer.pending >= chunk_size:
+                yield buffer.drain()
+
+    # Rest of the last files and the central directory, written when the archive is closed
+    chunk = buffer.drain()
+    if chunk:
+        yield chunk
+
+
+def snapshot_cartridge_files(cartridge_path):
+    """
+    Link the files of a cartridge into a snapshot directory under its scan index, to be packaged later.
+    Take it under the cartridge lock. The engine replaces cartridge files by rename and never writes them
+    in place, so the links keep the content the files had when the snapshot was taken without copying it.
+    Snapshots older than SNAPSHOT_MAX_AGE, left by a crash or a download that never started, are removed.
+
+    Args:
+        cartridge_path (str): Path to the unzipped cartridge directory
+
+    Returns:
+        tuple: (snapshot directory, (path, arcname) entries to package in archive order)
+    """
+    snapshots_path = Path(cartridge_path) / INDEX_DIR / SNAPSHOT_DIR
+    snapshots_path.mkdir(parents=True, exist_ok=True)
+    expired = time.time() - SNAPSHOT_MAX_AGE
+    for entry in os.scandir(snapshots_path):
+        try:
+            if entry.stat(follow_symlinks=False).st_mtime < expired:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            continue
+
+    snapshot_path = Path(tempfile.mkdtemp(dir=snapshots_path))
+    entries = []
+    try:
+        for path, arcname in iter_cartridge_files(cartridge_path):
+            if arcname.endswith('/'):
+                # Only the metadata of directories is archived
+                entries.append((path, arcname))
+                continue
+            link_path = snapshot_path / str(len(entries))
+            try:
+                os.link(path, link_path)
+            except OSError:
+                # Links are not supported here
+                shutil.copy2(path, link_path)
+            entries.append((link_path, arcname))
+    except BaseException:
+        shutil.rmtree(snapshot_path, ignore_errors=True)
+        raise
+    return snapshot_path, entries
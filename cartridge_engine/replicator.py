@@ -14,7 +14,8 @@ INPUT REQUIREMENTS:
 """
 
 import os
-import pandas as pd
+import re
+import html
 import xml.etree.ElementTree as ET
 from pathlib import Path
 import zipfile
@@ -22,649 +23,737 @@ import shutil
 import argparse
 import filecmp
 import hashlib
+import fnmatch
+from concurrent.futures import ProcessPoolExecutor
+from .scan_index import (INDEX_DIR, load_scan_index, save_scan_index, cached_entry_rows,
+                         store_entry_rows, file_stat, entry_key, is_temp_file)
+from .lazy_content import read_file_content as _read_file_content, lazy_entry_rows, load_rows_content
+from .graph import COLUMNS
+from .attachments import is_binary_file, attachment_fields
 
 
-def scan_cartridge(input_cartridge_path):
+# Content directories scanned file by file, in scan order
+CONTENT_DIRS = ['wiki_content', 'web_content', 'web_resources', 'assignments', 'discussions', 'quizzes', 'files', 'media', 'external_tools']
+
+# Top-level directories the catch-all phase leaves to the phases above
+OTHER_FILE_SKIP_DIRS = ['course_settings', 'wiki_content', 'web_content', 'assignments', 'discussions', 'quizzes', 'files', 'media', 'external_tools']
+
+# Scan phases in the order scan_cartridge visits them
+SCAN_PHASES = ['manifest', 'course_settings', 'content', 'root_xml', 'uuid_dir', 'non_cc', 'other']
+
+# topic_id references of a topicMeta file
+TOPIC_ID_PATTERN = re.compile(r'<topic_id>([^<]*)</topic_id>')
+
+
+def _read_entry_content(file_path):
+    """
+    Read a file the scanner does not parse. Binary files are not read as text, their row holds no content but
+    the size, hash and MIME type fields of an attachment.
+    
+    Returns:
+        tuple: (text content or None, fields or None)
+    """
+    if is_binary_file(file_path):
+        return None, attachment_fields(file_path)
+    return _read_file_content(file_path), None
+
+
+def _with_fields(row, fields):
+    """Attach scanned fields to a row, if there are any"""
+    if fields is not None:
+        row['fields'] = fields
+    return row
+
+
+def parse_xml_content(content):
+    """Parse the text of a file the scanner already read, instead of reading the file again"""
+    return ET.fromstring(content.encode('utf-8', errors='surrogatepass'))
+
+
+def html_body_content(html_content, root=None):
+    """
+    Get the inner HTML of the <body> of a page.
+    
+    Args:
+        html_content (str): Text of the page
+        root (Element): The page already parsed, if it was
+        
+    Returns:
+        str: The body without its tags, or the page itself if it cannot be parsed or has no body
+    """
+    if not html_content:
+        return ""
+    
+    try:
+        if root is None:
+            root = ET.fromstring(html_content)
+        body = root.find('.//body')
+        if body is not None:
+            # Return the inner text/HTML of the body
+            content = ET.tostring(body, encoding='unicode', method='html')
+            # Remove the body tags
+            content = content.replace('<body>', '').replace('</body>', '')
+            return content.strip()
+    except ET.ParseError:
+        pass
+    
+    return html_content
+
+
+def discussion_file_fields(content, root):
+    """
+    Get the structured fields of a discussions/ file.
+    
+    Args:
+        content (str): Text of the file
+        root (Element): The parsed file, or None if it is not valid XML
+        
+    Returns:
+        dict: 'topic_ids' referenced by a topicMeta file, the 'title' and unescaped HTML 'body' of a topic
+    """
+    title = None
+    body = ''
+    if root is not None:
+        title_elem = root.find('.//{http://www.imsglobal.org/xsd/imsccv1p1/imsdt_v1p1}title')
+        if title_elem is not None:
+            title = title_elem.text
+        # Look for text element with texttype="text/html"
+        text_elem = root.find('.//{http://www.imsglobal.org/xsd/imsccv1p1/imsdt_v1p1}text[@texttype="text/html"]')
+        if text_elem is not None and text_elem.text:
+            body = html.unescape(text_elem.text)
+    return {'topic_ids': TOPIC_ID_PATTERN.findall(content), 'title': title, 'body': body}
+
+
+def _walk_cartridge_dir(dir_path, rel_prefix, files):
+    """
+    Append the cartridge-relative paths of all files below a directory to files, in the order
+    Path.rglob("*") yields them: a directory's files first, then each subdirectory in turn.
+    Symlinked subdirectories are not followed, like rglob.
+    """
+    try:
+        with os.scandir(dir_path) as it:
+            dir_entries = list(it)
+    except PermissionError:
+        return
+    
+    subdirs = []
+    for entry in dir_entries:
+        if entry.is_file():
+            if not is_temp_file(entry.name):
+                files.append(rel_prefix + entry.name)
+        elif entry.is_dir(follow_symlinks=False):
+            subdirs.append(entry)
+    
+    for entry in subdirs:
+        _walk_cartridge_dir(entry.path, rel_prefix + entry.name + os.sep, files)
+
+
+def list_cartridge_entries(input_cartridge_path):
+    """
+    List the (phase, relative path) entries of a cartridge in the order scan_cartridge visits them.
+    A file can belong to more than one phase, e.g. web_resources/ files are also picked up by the catch-all phase.
+    The tree is walked once with os.scandir and each file is dispatched to its phases by its top-level directory.
+    
+    Args:
+        input_cartridge_path (str): Path to the unzipped input cartridge directory
+        
+    Returns:
+        list: (phase, rel_path) tuples
+    """
+    cartridge_path = Path(input_cartridge_path)
+    try:
+        with os.scandir(cartridge_path) as it:
+            root_entries = list(it)
+    except OSError:
+        return []
+    
+    # Files directly in the cartridge root, and the files below each top-level directory
+    root_files = []
+    top_dirs = {}
+    for entry in root_entries:
+        if entry.is_file():
+            if not is_temp_file(entry.name):
+                root_files.append(entry.name)
+        elif entry.is_dir() and entry.name != INDEX_DIR:
+            dir_files = []
+            _walk_cartridge_dir(entry.path, entry.name + os.sep, dir_files)
+            top_dirs[entry.name] = (dir_files, entry.is_symlink())
+    
+    def dir_files(name):
+        return top_dirs[name][0] if name in top_dirs else []
+    
+    entries = []
+    
+    if 'imsmanifest.xml' in root_files:
+        entries.append(('manifest', 'imsmanifest.xml'))
+    
+    entries.extend(('course_settings', rel_path) for rel_path in dir_files('course_settings'))
+    
+    for content_dir in CONTENT_DIRS:
+        entries.extend(('content', rel_path) for rel_path in dir_files(content_dir))
+    
+    entries.extend(('root_xml', name) for name in root_files if fnmatch.fnmatchcase(name, 'g*.xml'))
+    
+    for name, (files, _) in top_dirs.items():
+        if name.startswith('g'):
+            entries.extend(('uuid_dir', rel_path) for rel_path in files)
+    
+    entries.extend(('non_cc', rel_path) for rel_path in dir_files('non_cc_assessments'))
+    
+    # Catch-all phase, a whole-tree rglob never descends into symlinked directories
+    other_files = list(root_files)
+    for name, (files, is_symlink) in top_dirs.items():
+        if name not in OTHER_FILE_SKIP_DIRS and not is_symlink:
+            other_files.extend(files)
+    entries.extend(('other', rel_path) for rel_path in other_files
+                    if os.path.basename(rel_path) != 'imsmanifest.xml')
+    
+    return entries
+
+
+def cartridge_entry_phases(rel_path):
+    """Get the scan phases a file at the given cartridge-relative path belongs to"""
+    rel_path = Path(rel_path)
+    parts = rel_path.parts
+    phases = []
+    
+    if len(parts) == 1 and parts[0] == 'imsmanifest.xml':
+        phases.append('manifest')
+    if len(parts) > 1 and parts[0] == 'course_settings':
+        phases.append('course_settings')
+    if len(parts) > 1 and parts[0] in CONTENT_DIRS:
+        phases.append('content')
+    if len(parts) == 1 and fnmatch.fnmatchcase(parts[0], 'g*.xml'):
+        phases.append('root_xml')
+    if len(parts) > 1 and parts[0].startswith('g'):
+        phases.append('uuid_dir')
+    if len(parts) > 1 and parts[0] == 'non_cc_assessments':
+        phases.append('non_cc')
+    if parts[0] not in OTHER_FILE_SKIP_DIRS and parts[0] != INDEX_DIR and rel_path.name != 'imsmanifest.xml':
+        phases.append('other')
+    
+    return phases
+
+
+def cartridge_entry_sort_key(entry):
+    """Sort key that orders (phase, rel_path) entries the way scan_cartridge visits them"""
+    phase, rel_path = entry
+    if phase == 'content':
+        return (SCAN_PHASES.index(phase), CONTENT_DIRS.index(Path(rel_path).parts[0]))
+    return (SCAN_PHASES.index(phase), 0)
+
+
+def scan_cartridge_entry(input_cartridge_path, phase, rel_path, lazy=False):
+    """
+    Extract the components of a single cartridge entry.
+    
+    Args:
+        input_cartridge_path (str): Path to the unzipped input cartridge directory
+        phase (str): Scan phase the entry belongs to, one of SCAN_PHASES
+        rel_path (str): Path of the file relative to the cartridge root
+        lazy (bool): Replace xml_content with LazyContent handles that read it back from the file when needed
+        
+    Returns:
+        list: Component rows extracted from the entry
+    """
+    rows = _extract_entry_rows(Path(input_cartridge_path), phase, rel_path)
+    if lazy:
+        rows = lazy_entry_rows(Path(input_cartridge_path) / rel_path, rows)
+    return rows
+
+
+def _extract_entry_rows(cartridge_path, phase, rel_path):
+    """Run the extractor of a scan phase on a cartridge entry"""
+    file_path = cartridge_path / rel_path
+    
+    if phase == 'manifest':
+        return _scan_manifest(cartridge_path)
+    elif phase == 'course_settings':
+        return _scan_course_settings_file(cartridge_path, file_path)
+    elif phase == 'content':
+        return _scan_content_file(cartridge_path, file_path, Path(rel_path).parts[0])
+    elif phase == 'root_xml':
+        return _scan_root_xml_file(cartridge_path, file_path)
+    elif phase == 'uuid_dir':
+        return _scan_uuid_dir_file(cartridge_path, file_path)
+    elif phase == 'non_cc':
+        return _scan_non_cc_file(cartridge_path, file_path)
+    elif phase == 'other':
+        return _scan_other_file(cartridge_path, file_path)
+    
+    raise ValueError(f"Unknown scan phase: {phase}")
+
+
+def manifest_dependencies(manifest_rows):
+    """Get the discussion files the manifest rows take resource titles from"""
+    return [str(Path(row['href'])) for row in manifest_rows
+            if row['type'] == 'resource' and row['resource_type'] == 'imsdt_xmlv1p1' and row['href']]
+
+
+def resolve_discussion_titles(entries):
+    """
+    Set the titles of the manifest's discussion resources from the scanned discussion files, so the manifest
+    phase does not read them again.
+    
+    Args:
+        entries (dict): {(phase, rel_path): rows}, the manifest rows are updated in place
+    """
+    manifest_rows = entries.get(('manifest', 'imsmanifest.xml'))
+    if not manifest_rows:
+        return
+    
+    # Topics are scanned from discussions/ or, when written next to the manifest, from the root
+    titles = {}
+    for (phase, rel_path), rows in entries.items():
+        if phase in ('content', 'root_xml'):
+            for row in rows:
+                fields = row.get('fields') or {}
+                if 'title' in fields:
+                    titles[rel_path] = fields['title']
+    
+    for row in manifest_rows:
+        if row['type'] == 'resource' and row['resource_type'] == 'imsdt_xmlv1p1' and row['href']:
+            row['title'] = titles.get(str(Path(row['href'])))
+
+
+def _scan_entry_job(job):
+    """Scan one (cartridge_path, phase, rel_path, lazy) job in a worker process"""
+    cartridge_path, phase, rel_path, lazy = job
+    return scan_cartridge_entry(cartridge_path, phase, rel_path, lazy=lazy)
+
+
+def _scan_entry_list(cartridge_path, entry_list, workers=None, lazy=False):
+    """
+    Scan a list of (phase, rel_path) entries, fanning the parsing out to a process pool when workers > 1.
+    
+    Returns:
+        list: Rows of each entry, in the same order as entry_list
+    """
+    if not workers or workers <= 1 or len(entry_list) <= 1:
+        return [scan_cartridge_entry(cartridge_path, phase, rel_path, lazy=lazy) for phase, rel_path in entry_list]
+    
+    jobs = [(str(cartridge_path), phase, rel_path, lazy) for phase, rel_path in entry_list]
+    # A few chunks per worker keeps the pool busy without paying per-file IPC overhead
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # map() yields results in submission order, so rows merge exactly like a serial scan
+        return list(executor.map(_scan_entry_job, jobs, chunksize=chunksize))
+
+
+def scan_cartridge_entries(input_cartridge_path, use_index=False, workers=None, lazy=False):
+    """
+    Scan an existing cartridge and keep the extracted components grouped by the entry they came from.
+    
+    Args:
+        input_cartridge_path (str): Path to the unzipped input cartridge directory
+        use_index (bool): Reuse rows from the cartridge's .cc_index/ for files whose stat is unchanged,
+                          and update the index with the files that had to be parsed
+        workers (int): Number of processes to parse files with, None or 1 to parse serially
+        lazy (bool): Keep LazyContent handles instead of the text of every file in xml_content
+        
+    Returns:
+        dict: {(phase, rel_path): rows} in scan order
+    """
+    cartridge_path = Path(input_cartridge_path)
+    entry_list = list_cartridge_entries(cartridge_path)
+    
+    if not use_index:
+        entries = dict(zip(entry_list, _scan_entry_list(cartridge_path, entry_list, workers, lazy=lazy)))
+        resolve_discussion_titles(entries)
+        return entries
+    
+    index = load_scan_index(cartridge_path)
+    fresh_index = {'version': index['version'], 'written_ns': index['written_ns'], 'entries': {}}
+    
+    # Reuse cached rows and collect the entries that have to be parsed again
+    entries = {}
+    entries_to_scan = []
+    entry_stats = {}
+    for phase, rel_path in entry_list:
+        rows = cached_entry_rows(cartridge_path, index, phase, rel_path)
+        if rows is not None:
+            fresh_index['entries'][entry_key(phase, rel_path)] = index['entries'][entry_key(phase, rel_path)]
+            if not lazy:
+                rows = load_rows_content(rows)
+        else:
+            # Stat before reading so a write racing with the scan is caught next time
+            entry_stats[(phase, rel_path)] = {rel_path: file_stat(cartridge_path / rel_path)}
+            entries_to_scan.append((phase, rel_path))
+        entries[(phase, rel_path)] = rows
+    
+    for (phase, rel_path), rows in zip(entries_to_scan, _scan_entry_list(cartridge_path, entries_to_scan, workers, lazy=lazy)):
+        # The index only keeps where content lives in the file, not the content itself
+        store_entry_rows(fresh_index, phase, rel_path, rows if lazy else lazy_entry_rows(cartridge_path / rel_path, rows),
+                         entry_stats[(phase, rel_path)])
+        entries[(phase, rel_path)] = rows
+    
+    # Only write the index back when it no longer matches the cartridge
+    if entries_to_scan or len(fresh_index['entries']) != len(index['entries']):
+        save_scan_index(cartridge_path, fresh_index)
+    
+    resolve_discussion_titles(entries)
+    return entries
+
+
+def cartridge_entries_rows(entries):
+    """Flatten components grouped by entry into rows, in scan order"""
+    data = []
+    for _, rows in sorted(entries.items(), key=lambda entry: cartridge_entry_sort_key(entry[0])):
+        data.extend(rows)
+    return data
+
+
+def cartridge_entries_to_dataframe(entries):
+    """Build the scan DataFrame from components grouped by entry, reading lazy content back in"""
+    # pandas is only needed for DataFrame views, keep it out of the engine's import time
+    import pandas as pd
+    return pd.DataFrame(load_rows_content(cartridge_entries_rows(entries)), columns=COLUMNS)
+
+
+def scan_cartridge(input_cartridge_path, use_index=False, workers=None):
     """
     Scan an existing cartridge and extract ALL components into a pandas DataFrame.
     
     Args:
         input_cartridge_path (str): Path to the unzipped input cartridge directory
+        use_index (bool): Reuse and update the cartridge's .cc_index/ scan cache
+        workers (int): Number of processes to parse files with, None or 1 to parse serially
         
     Returns:
         pd.DataFrame: DataFrame containing all extracted metadata and content
     """
+    entries = scan_cartridge_entries(input_cartridge_path, use_index=use_index, workers=workers)
+    return cartridge_entries_to_dataframe(entries)
+
+def _scan_manifest(cartridge_path):
+    """Extract the manifest, its resources and its organization items"""
     data = []
-    cartridge_path = Path(input_cartridge_path)
     
     # Parse imsmanifest.xml - preserve exact content
     manifest_path = cartridge_path / "imsmanifest.xml"
-    if manifest_path.exists():
-        with open(manifest_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Parse for metadata extraction
-        tree = ET.parse(manifest_path)
-        root = tree.getroot()
-        
-        # Extract manifest identifier
-        manifest_id = root.get('identifier')
-        data.append({
-            'type': 'manifest',
-            'identifier': manifest_id,
-            'title': None,
-            'workflow_state': None,
-            'position': None,
-            'content_type': None,
-            'identifierref': None,
-            'href': None,
-            'resource_type': None,
-            'filename': 'imsmanifest.xml',
-            'xml_content': content
-        })
-        
-        # Extract course title from metadata
-        title_elem = root.find('.//{http://ltsc.ieee.org/xsd/imsccv1p1/LOM/manifest}string')
-        course_title = title_elem.text if title_elem is not None else None
-        
-        # Extract resources
-        resources = root.find('.//{http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1}resources')
-        if resources is not None:
-            for resource in resources.findall('.//{http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1}resource'):
-                resource_id = resource.get('identifier')
-                resource_type = resource.get('type')
-                href = resource.get('href')
-                
-                # Extract title from specific resource types
-                title = None
-                if resource_type == 'imsdt_xmlv1p1' and href:
-                    # Discussion topic - extract title from XML file
-                    discussion_file = cartridge_path / href
-                    if discussion_file.exists():
-                        try:
-                            discussion_tree = ET.parse(discussion_file)
-                            discussion_root = discussion_tree.getroot()
-                            # Discussion topics have title in <title> element
-                            title_elem = discussion_root.find('.//{http://www.imsglobal.org/xsd/imsccv1p1/imsdt_v1p1}title')
-                            if title_elem is not None:
-                                title = title_elem.text
-                        except Exception:
-                            title = None
-                
-                data.append({
-                    'type': 'resource',
-                    'identifier': resource_id,
-                    'title': title,
-                    'workflow_state': None,
-                    'position': None,
-                    'content_type': None,
-                    'identifierref': None,
-                    'href': href,
-                    'resource_type': resource_type,
-                    'filename': None,
-                    'xml_content': ET.tostring(resource, encoding='unicode')
-                })
-        
-        # Extract organization items (modules and items)
-        organizations = root.find('.//{http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1}organizations')
-        if organizations is not None:
-            learning_modules = organizations.find('.//{http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1}item[@identifier="LearningModules"]')
-            if learning_modules is not None:
-                for module_item in learning_modules.findall('.//{http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1}item'):
-                    if module_item.get('identifier') != 'LearningModules':
-                        module_id = module_item.get('identifier')
-                        title_elem = module_item.find('.//{http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1}title')
-                        module_title = title_elem.text if title_elem is not None else None
-                        
-                        data.append({
-                            'type': 'module_org',
-                            'identifier': module_id,
-                            'title': module_title,
-                            'workflow_state': None,
-                            'position': None,
-                            'content_type': None,
-                            'identifierref': None,
-                            'href': None,
-                            'resource_type': None,
-                            'filename': None,
-                            'xml_content': ET.tostring(module_item, encoding='unicode')
-                        })
-                        
-                        # Extract module items
-                        for item in module_item.findall('.//{http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1}item'):
-                            if item != module_item:
-                                item_id = item.get('identifier')
-                                item_ref = item.get('identifierref')
-                                title_elem = item.find('.//{http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1}title')
-                                item_title = title_elem.text if title_elem is not None else None
-                                
-                                data.append({
-                                    'type': 'module_item_org',
-                                    'identifier': item_id,
-                                    'title': item_title,
-                                    'workflow_state': None,
-                                    'position': None,
-                                    'content_type': None,
-                                    'identifierref': item_ref,
-                                    'href': None,
-                                    'resource_type': None,
-                                    'filename': None,
-                                    'xml_content': ET.tostring(item, encoding='unicode')
-                                })
-    
-    # Scan ALL course_settings files systematically
-    course_settings_dir = cartridge_path / "course_settings"
-    if course_settings_dir.exists():
-        # Define all possible course_settings files
-        course_settings_files = [
-            'course_settings.xml',
-            'module_meta.xml',
-            'assignment_groups.xml',
-            'late_policy.xml',
-            'files_meta.xml',
-            'context.xml',
-            'media_tracks.xml',
-            'canvas_export.txt',
-            'syllabus.xml',
-            'grading_standards.xml',
-            'rubrics.xml',
-            'discussion_topics.xml',
-            'external_tools.xml',
-            'question_banks.xml',
-            'outcomes.xml',
-            'calendar_events.xml',
-            'learning_outcomes.xml',
-            'content_migrations.xml'
-        ]
-        
-        # Scan all files that actually exist
-        for file_path in course_settings_dir.rglob("*"):
-            if file_path.is_file():
-                rel_path = file_path.relative_to(cartridge_path)
-                filename = file_path.name
-                
-                # Read content
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                except UnicodeDecodeError:
-                    # Handle binary files
-                    with open(file_path, 'rb') as f:
-                        content = f.read().decode('utf-8', errors='replace')
-                
-                # Extract metadata if it's XML
-                identifier = None
-                title = None
-                if filename.endswith('.xml'):
-                    try:
-                        tree = ET.parse(file_path)
-                        root = tree.getroot()
-                        identifier = root.get('identifier')
-                        
-                        # Try to extract title from various possible locations
-                        for title_xpath in [
-                            './/{http://canvas.instructure.com/xsd/cccv1p0}title',
-                            './/title',
-                            './/{http://canvas.instructure.com/xsd/cccv1p0}name',
-                            './/name'
-                        ]:
-                            title_elem = root.find(title_xpath)
-                            if title_elem is not None:
-                                title = title_elem.text
-                                break
-                    except ET.ParseError:
-                        pass
-                
-                # Determine file type
-                if filename == 'course_settings.xml':
-                    file_type = 'course_settings'
-                elif filename == 'module_meta.xml':
-                    file_type = 'module_meta'
-                elif filename == 'assignment_groups.xml':
-                    file_type = 'assignment_groups'
-                elif filename == 'late_policy.xml':
-                    file_type = 'late_policy'
-                elif filename == 'files_meta.xml':
-                    file_type = 'files_meta'
-                elif filename == 'context.xml':
-                    file_type = 'context'
-                elif filename == 'media_tracks.xml':
-                    file_type = 'media_tracks'
-                elif filename == 'canvas_export.txt':
-                    file_type = 'canvas_export'
-                elif filename == 'syllabus.xml':
-                    file_type = 'syllabus'
-                elif filename == 'grading_standards.xml':
-                    file_type = 'grading_standards'
-                elif filename == 'rubrics.xml':
-                    file_type = 'rubrics'
-                elif filename == 'discussion_topics.xml':
-                    file_type = 'discussion_topics'
-                elif filename == 'external_tools.xml':
-                    file_type = 'external_tools'
-                elif filename == 'question_banks.xml':
-                    file_type = 'question_banks'
-                elif filename == 'outcomes.xml':
-                    file_type = 'outcomes'
-                elif filename == 'calendar_events.xml':
-                    file_type = 'calendar_events'
-                elif filename == 'learning_outcomes.xml':
-                    file_type = 'learning_outcomes'
-                elif filename == 'content_migrations.xml':
-                    file_type = 'content_migrations'
-                else:
-                    file_type = 'course_settings_file'
-                
-                data.append({
-                    'type': file_type,
-                    'identifier': identifier,
-                    'title': title,
-                    'workflow_state': None,
-                    'position': None,
-                    'content_type': None,
-                    'identifierref': None,
-                    'href': None,
-                    'resource_type': None,
-                    'filename': str(rel_path),
-                    'xml_content': content
-                })
-                
-                # For module_meta.xml, also extract individual modules
-                if filename == 'module_meta.xml' and content.strip():
-                    try:
-                        tree = ET.parse(file_path)
-                        root = tree.getroot()
-                        
-                        for module in root.findall('.//{http://canvas.instructure.com/xsd/cccv1p0}module'):
-                            module_id = module.get('identifier')
-                            title_elem = module.find('.//{http://canvas.instructure.com/xsd/cccv1p0}title')
-                            module_title = title_elem.text if title_elem is not None else None
-                            workflow_elem = module.find('.//{http://canvas.instructure.com/xsd/cccv1p0}workflow_state')
-                            workflow_state = workflow_elem.text if workflow_elem is not None else None
-                            position_elem = module.find('.//{http://canvas.instructure.com/xsd/cccv1p0}position')
-                            position = position_elem.text if position_elem is not None else None
-                            
-                            data.append({
-                                'type': 'module',
-                                'identifier': module_id,
-                                'title': module_title,
-                                'workflow_state': workflow_state,
-                                'position': position,
-                                'content_type': None,
-                                'identifierref': None,
-                                'href': None,
-                                'resource_type': None,
-                                'filename': None,
-                                'xml_content': ET.tostring(module, encoding='unicode')
-                            })
-                            
-                            # Extract module items
-                            items = module.find('.//{http://canvas.instructure.com/xsd/cccv1p0}items')
-                            if items is not None:
-                                for item in items.findall('.//{http://canvas.instructure.com/xsd/cccv1p0}item'):
-                                    item_id = item.get('identifier')
-                                    content_type_elem = item.find('.//{http://canvas.instructure.com/xsd/cccv1p0}content_type')
-                                    content_type = content_type_elem.text if content_type_elem is not None else None
-                                    workflow_elem = item.find('.//{http://canvas.instructure.com/xsd/cccv1p0}workflow_state')
-                                    workflow_state = workflow_elem.text if workflow_elem is not None else None
-                                    title_elem = item.find('.//{http://canvas.instructure.com/xsd/cccv1p0}title')
-                                    item_title = title_elem.text if title_elem is not None else None
-                                    ref_elem = item.find('.//{http://canvas.instructure.com/xsd/cccv1p0}identifierref')
-                                    item_ref = ref_elem.text if ref_elem is not None else None
-                                    position_elem = item.find('.//{http://canvas.instructure.com/xsd/cccv1p0}position')
-                                    position = position_elem.text if position_elem is not None else None
-                                    
-                                    data.append({
-                                        'type': 'module_item',
-                                        'identifier': item_id,
-                                        'title': item_title,
-                                        'workflow_state': workflow_state,
-                                        'position': position,
-                                        'content_type': content_type,
-                                        'identifierref': item_ref,
-                                        'href': None,
-                                        'resource_type': None,
-                                        'filename': None,
-                                        'xml_content': ET.tostring(item, encoding='unicode')
-                                    })
-                    except ET.ParseError:
-                        pass
-    
-    # Scan ALL content directories and files
-    content_dirs = ['wiki_content', 'web_content', 'web_resources', 'assignments', 'discussions', 'quizzes', 'files', 'media', 'external_tools']
-    
-    for content_dir in content_dirs:
-        content_path = cartridge_path / content_dir
-        if content_path.exists():
-            for file_path in content_path.rglob("*"):
-                if file_path.is_file():
-                    rel_path = file_path.relative_to(cartridge_path)
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    
+    # Parse for metadata extraction
+    root = parse_xml_content(content)
+    
+    # Extract manifest identifier
+    manifest_id = root.get('identifier')
+    data.append({
+        'type': 'manifest',
+        'identifier': manifest_id,
+        'title': None,
+        'workflow_state': None,
+        'position': None,
+        'content_type': None,
+        'identifierref': None,
+        'href': None,
+        'resource_type': None,
+        'filename': 'imsmanifest.xml',
+        'xml_content': content
+    })
+    
+    # Extract course title from metadata
+    title_elem = root.find('.//{http://ltsc.ieee.org/xsd/imsccv1p1/LOM/manifest}string')
+    course_title = title_elem.text if title_elem is not None else None
+    
+    # Extract resources
+    resources = root.find('.//{http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1}resources')
+    if resources is not None:
+        for resource in resources.findall('.//{http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1}resource'):
+            resource_id = resource.get('identifier')
+            resource_type = resource.get('type')
+            href = resource.get('href')
+            
+            # Discussion titles are set from the scanned discussion files by resolve_discussion_titles
+            title = None
+            
+            data.append({
+                'type': 'resource',
+                'identifier': resource_id,
+                'title': title,
+                'workflow_state': None,
+                'position': None,
+                'content_type': None,
+                'identifierref': None,
+                'href': href,
+                'resource_type': resource_type,
+                'filename': None,
+                'xml_content': ET.tostring(resource, encoding='unicode')
+            })
+    
+    # Extract organization items (modules and items)
+    organizations = root.find('.//{http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1}organizations')
+    if organizations is not None:
+        learning_modules = organizations.find('.//{http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1}item[@identifier="LearningModules"]')
+        if learning_modules is not None:
+            for module_item in learning_modules.findall('.//{http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1}item'):
+                if module_item.get('identifier') != 'LearningModules':
+                    module_id = module_item.get('identifier')
+                    title_elem = module_item.find('.//{http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1}title')
+                    module_title = title_elem.text if title_elem is not None else None
                     
-                    # Read content
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                    except UnicodeDecodeError:
-                        # Handle binary files
-                        with open(file_path, 'rb') as f:
-                            content = f.read().decode('utf-8', errors='replace')
+                    data.append({
+                        'type': 'module_org',
+                        'identifier': module_id,
+                        'title': module_title,
+                        'workflow_state': None,
+                        'position': None,
+                        'content_type': None,
+                        'identifierref': None,
+                        'href': None,
+                        'resource_type': None,
+                        'filename': None,
+                        'xml_content': ET.tostring(module_item, encoding='unicode')
+                    })
                     
-                    # Special handling for wiki pages
-                    if content_dir == 'wiki_content' and file_path.suffix == '.html':
-                        # Parse HTML to extract metadata
-                        try:
-                            root = ET.fromstring(content)
-                            title_elem = root.find('.//title')
-                            title = title_elem.text if title_elem is not None else None
-                            
-                            # Extract identifier from meta tag
-                            identifier_meta = root.find('.//meta[@name="identifier"]')
-                            identifier = identifier_meta.get('content') if identifier_meta is not None else None
+                    # Extract module items
+                    for item in module_item.findall('.//{http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1}item'):
+                        if item != module_item:
+                            item_id = item.get('identifier')
+                            item_ref = item.get('identifierref')
+                            title_elem = item.find('.//{http://www.imsglobal.org/xsd/imsccv1p1/imscp_v1p1}title')
+                            item_title = title_elem.text if title_elem is not None else None
                             
-                            # Extract workflow state
-                            workflow_meta = root.find('.//meta[@name="workflow_state"]')
-                            workflow_state = workflow_meta.get('content') if workflow_meta is not None else None
-                            
-                            data.append({
-                                'type': 'wiki_page',
-                                'identifier': identifier,
-                                'title': title,
-                                'workflow_state': workflow_state,
-                                'position': None,
-                                'content_type': 'WikiPage',
-                                'identifierref': None,
-                                'href': str(rel_path),
-                                'resource_type': None,
-                                'filename': str(rel_path),
-                                'xml_content': content
-                            })
-                        except ET.ParseError:
-                            # If HTML parsing fails, store as-is
-                            data.append({
-                                'type': 'wiki_page',
-                                'identifier': None,
-                                'title': file_path.stem,
-                                'workflow_state': None,
-                                'position': None,
-                                'content_type': 'WikiPage',
-                                'identifierref': None,
-                                'href': str(rel_path),
-                                'resource_type': None,
-                                'filename': str(rel_path),
-                                'xml_content': content
-                            })
-                    elif content_dir == 'discussions' and file_path.suffix == '.xml':
-                        # Handle discussion topics
-                        try:
-                            tree = ET.parse(file_path)
-                            root = tree.getroot()
-                            
-                            # Extract metadata from discussion XML
-                            identifier = root.get('identifier')
-                            title_elem = root.find('.//title')
-                            title = title_elem.text if title_elem is not None else None
-                            
-                            data.append({
-                                'type': 'discussion_topic',
-                                'identifier': identifier,
-                                'title': title,
-                                'workflow_state': None,
-                                'position': None,
-                                'content_type': 'DiscussionTopic',
-                                'identifierref': None,
-                                'href': str(rel_path),
-                                'resource_type': None,
-                                'filename': str(rel_path),
-                                'xml_content': content
-                            })
-                        except ET.ParseError:
-                            # If parsing fails, store as generic file
                             data.append({
-                                'type': 'discussions_file',
-                                'identifier': None,
-                                'title': file_path.stem,
+                                'type': 'module_item_org',
+                                'identifier': item_id,
+                                'title': item_title,
                                 'workflow_state': None,
                                 'position': None,
                                 'content_type': None,
-                                'identifierref': None,
-                                'href': str(rel_path),
+                                'identifierref': item_ref,
+                                'href': None,
                                 'resource_type': None,
-                                'filename': str(rel_path),
-                                'xml_content': content
+                                'filename': None,
+                                'xml_content': ET.tostring(item, encoding='unicode')
                             })
-                    else:
-                        # Generic content file
-                        data.append({
-                            'type': f'{content_dir}_file',
-                            'identifier': None,
-                            'title': file_path.stem,
-                            'workflow_state': None,
-                            'position': None,
-                            'content_type': None,
-                            'identifierref': None,
-                            'href': str(rel_path),
-                            'resource_type': None,
-                            'filename': str(rel_path),
-                            'xml_content': content
-                        })
-    
-    # Scan for UUID-named XML files in root directory (announcements, discussions, etc.)
-    for xml_file in cartridge_path.glob("g*.xml"):
-        if xml_file.is_file():
-            rel_path = xml_file.relative_to(cartridge_path)
+    
+    return data
+
+
+# File types of the known course_settings files
+COURSE_SETTINGS_FILE_TYPES = {
+    'course_settings.xml': 'course_settings',
+    'module_meta.xml': 'module_meta',
+    'assignment_groups.xml': 'assignment_groups',
+    'late_policy.xml': 'late_policy',
+    'files_meta.xml': 'files_meta',
+    'context.xml': 'context',
+    'media_tracks.xml': 'media_tracks',
+    'canvas_export.txt': 'canvas_export',
+    'syllabus.xml': 'syllabus',
+    'grading_standards.xml': 'grading_standards',
+    'rubrics.xml': 'rubrics',
+    'discussion_topics.xml': 'discussion_topics',
+    'external_tools.xml': 'external_tools',
+    'question_banks.xml': 'question_banks',
+    'outcomes.xml': 'outcomes',
+    'calendar_events.xml': 'calendar_events',
+    'learning_outcomes.xml': 'learning_outcomes',
+    'content_migrations.xml': 'content_migrations'
+}
+
+
+def _scan_course_settings_file(cartridge_path, file_path):
+    """Extract a course_settings file, plus modules and module items for module_meta.xml"""
+    data = []
+    rel_path = file_path.relative_to(cartridge_path)
+    filename = file_path.name
+    
+    # Read content
+    content = _read_file_content(file_path)
+    
+    # Extract metadata if it's XML
+    root = None
+    identifier = None
+    title = None
+    fields = None
+    if filename.endswith('.xml'):
+        try:
+            root = parse_xml_content(content)
+            identifier = root.get('identifier')
             
-            # Read content
-            with open(xml_file, 'r', encoding='utf-8') as f:
-                content = f.read()
+            # Try to extract title from various possible locations
+            for title_xpath in [
+                './/{http://canvas.instructure.com/xsd/cccv1p0}title',
+                './/title',
+                './/{http://canvas.instructure.com/xsd/cccv1p0}name',
+                './/name'
+            ]:
+                title_elem = root.find(title_xpath)
+                if title_elem is not None:
+                    title = title_elem.text
+                    break
             
-            # Parse XML to extract metadata
-            try:
-                tree = ET.parse(xml_file)
-                root = tree.getroot()
-                
-                # Determine content type based on root element
-                root_tag = root.tag
-                if 'topicMeta' in root_tag:
-                    content_type = 'discussion_topic_meta'
-                    rel_path = Path('discussions') / rel_path.name
-                elif 'topic' in root_tag:
-                    content_type = 'discussion_topic_content'
-                    rel_path = Path('discussions') / rel_path.name
-                else:
-                    content_type = 'unknown_xml'
-                
-                # Extract common metadata
-                identifier = root.get('identifier')
+            if filename == 'course_settings.xml':
                 title_elem = root.find('.//{http://canvas.instructure.com/xsd/cccv1p0}title')
-                if title_elem is None:
-                    title_elem = root.find('.//title')
-                title = title_elem.text if title_elem is not None else None
-                workflow_elem = root.find('.//{http://canvas.instructure.com/xsd/cccv1p0}workflow_state')
-                workflow_state = workflow_elem.text if workflow_elem is not None else None
-                position_elem = root.find('.//{http://canvas.instructure.com/xsd/cccv1p0}position')
-                position = position_elem.text if position_elem is not None else None
+                code_elem = root.find('.//{http://canvas.instructure.com/xsd/cccv1p0}course_code')
+                fields = {
+                    'course_title': title_elem.text if title_elem is not None else None,
+                    'course_code': code_elem.text if code_elem is not None else None
+                }
+        except ET.ParseError:
+            root = None
+    
+    # Determine file type
+    file_type = COURSE_SETTINGS_FILE_TYPES.get(filename, 'course_settings_file')
+    
+    data.append({
+        'type': file_type,
+        'identifier': identifier,
+        'title': title,
+        'workflow_state': None,
+        'position': None,
+        'content_type': None,
+        'identifierref': None,
+        'href': None,
+        'resource_type': None,
+        'filename': str(rel_path),
+        'xml_content': content
+    })
+    if fields is not None:
+        data[0]['fields'] = fields
+    
+    # For module_meta.xml, also extract individual modules
+    if filename == 'module_meta.xml' and root is not None:
+        for module in root.findall('.//{http://canvas.instructure.com/xsd/cccv1p0}module'):
+            module_id = module.get('identifier')
+            title_elem = module.find('.//{http://canvas.instructure.com/xsd/cccv1p0}title')
+            module_title = title_elem.text if title_elem is not None else None
+            workflow_elem = module.find('.//{http://canvas.instructure.com/xsd/cccv1p0}workflow_state')
+            workflow_state = workflow_elem.text if workflow_elem is not None else None
+            position_elem = module.find('.//{http://canvas.instructure.com/xsd/cccv1p0}position')
+            position = position_elem.text if position_elem is not None else None
                 
-                data.append({
-                    'type': content_type,
-                    'identifier': identifier,
-                    'title': title,
-                    'workflow_state': workflow_state,
-                    'position': position,
-                    'content_type': content_type,
-                    'identifierref': None,
-                    'href': None,
-                    'resource_type': None,
-                    'filename': str(rel_path),
-                    'xml_content': content
-                })
-            except ET.ParseError:
-                # If parsing fails, store as generic file
-                data.append({
-                    'type': 'xml_file',
-                    'identifier': None,
-                    'title': xml_file.stem,
-                    'workflow_state': None,
-                    'position': None,
-                    'content_type': None,
-                    'identifierref': None,
-                    'href': None,
-                    'resource_type': None,
-                    'filename': str(rel_path),
-                    'xml_content': content
-                })
-    
-    # Scan for UUID-named directories (assignments, quizzes, etc.)
-    for uuid_dir in cartridge_path.glob("g*"):
-        if uuid_dir.is_dir():
-            for file_path in uuid_dir.rglob("*"):
-                if file_path.is_file():
-                    rel_path = file_path.relative_to(cartridge_path)
-                    filename = file_path.name
-                    
-                    # Read content
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                    except UnicodeDecodeError:
-                        # Handle binary files
-                        with open(file_path, 'rb') as f:
-                            content = f.read().decode('utf-8', errors='replace')
-                    
-                    # Determine content type based on filename
-                    if filename == 'assignment_settings.xml':
-                        content_type = 'assignment_settings'
-                    elif filename == 'assessment_meta.xml':
-                        content_type = 'assessment_meta'
-                    elif filename == 'assessment_qti.xml':
-                        content_type = 'assessment_qti'
-                    elif filename.endswith('.html'):
-                        content_type = 'assignment_content'
-                    else:
-                        content_type = 'uuid_directory_file'
-                    
-                    # Extract metadata if it's XML
-                    identifier = None
-                    title = None
-                    workflow_state = None
-                    position = None
-                    
-                    if filename.endswith('.xml'):
-                        try:
-                            tree = ET.parse(file_path)
-                            root = tree.getroot()
-                            identifier = root.get('identifier')
-                            
-                            # Try to extract title from various possible locations
-                            for title_xpath in [
-                                './/{http://canvas.instructure.com/xsd/cccv1p0}title',
-                                './/title'
-                            ]:
-                                title_elem = root.find(title_xpath)
-                                if title_elem is not None:
-                                    title = title_elem.text
-                                    break
-                            
-                            # Extract workflow state
-                            workflow_elem = root.find('.//{http://canvas.instructure.com/xsd/cccv1p0}workflow_state')
-                            workflow_state = workflow_elem.text if workflow_elem is not None else None
-                            
-                            # Extract position
-                            position_elem = root.find('.//{http://canvas.instructure.com/xsd/cccv1p0}position')
-                            position = position_elem.text if position_elem is not None else None
-                            
-                        except ET.ParseError:
-                            pass
-                    elif filename.endswith('.html'):
-                        # Extract title from HTML
-                        try:
-                            root = ET.fromstring(content)
-                            title_elem = root.find('.//title')
-                            title = title_elem.text if title_elem is not None else None
-                        except ET.ParseError:
-                            pass
-                    
+            data.append({
+                'type': 'module',
+                'identifier': module_id,
+                'title': module_title,
+                'workflow_state': workflow_state,
+                'position': position,
+                'content_type': None,
+                'identifierref': None,
+                'href': None,
+                'resource_type': None,
+                'filename': None,
+                'xml_content': ET.tostring(module, encoding='unicode')
+            })
+                
+            # Extract module items
+            items = module.find('.//{http://canvas.instructure.com/xsd/cccv1p0}items')
+            if items is not None:
+                for item in items.findall('.//{http://canvas.instructure.com/xsd/cccv1p0}item'):
+                    item_id = item.get('identifier')
+                    content_type_elem = item.find('.//{http://canvas.instructure.com/xsd/cccv1p0}content_type')
+                    content_type = content_type_elem.text if content_type_elem is not None else None
+                    workflow_elem = item.find('.//{http://canvas.instructure.com/xsd/cccv1p0}workflow_state')
+                    workflow_state = workflow_elem.text if workflow_elem is not None else None
+                    title_elem = item.find('.//{http://canvas.instructure.com/xsd/cccv1p0}title')
+                    item_title = title_elem.text if title_elem is not None else None
+                    ref_elem = item.find('.//{http://canvas.instructure.com/xsd/cccv1p0}identifierref')
+                    item_ref = ref_elem.text if ref_elem is not None else None
+                    position_elem = item.find('.//{http://canvas.instructure.com/xsd/cccv1p0}position')
+                    position = position_elem.text if position_elem is not None else None
+                        
                     data.append({
-                        'type': content_type,
-                        'identifier': identifier,
-                        'title': title,
+                        'type': 'module_item',
+                        'identifier': item_id,
+                        'title': item_title,
                         'workflow_state': workflow_state,
                         'position': position,
                         'content_type': content_type,
-                        'identifierref': None,
+                        'identifierref': item_ref,
                         'href': None,
                         'resource_type': None,
-                        'filename': str(rel_path),
-                        'xml_content': content
+                        'filename': None,
+                        'xml_content': ET.tostring(item, encoding='unicode')
                     })
     
-    # Scan non_cc_assessments directory for QTI files
-    non_cc_path = cartridge_path / 'non_cc_assessments'
-    if non_cc_path.exists():
-        for file_path in non_cc_path.rglob("*"):
-            if file_path.is_file():
-                rel_path = file_path.relative_to(cartridge_path)
-                
-                # Read content
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                except UnicodeDecodeError:
-                    # Handle binary files
-                    with open(file_path, 'rb') as f:
-                        content = f.read().decode('utf-8', errors='replace')
-                
-                # Extract metadata if it's QTI XML
-                identifier = None
-                title = None
-                
-                if file_path.suffix == '.qti':
-                    try:
-                        tree = ET.parse(file_path)
-                        root = tree.getroot()
-                        
-                        # Look for assessment element
-                        assessment = root.find('.//{http://www.imsglobal.org/xsd/ims_qtiasiv1p2}assessment')
-                        if assessment is not None:
-                            identifier = assessment.get('ident')
-                            title = assessment.get('title')
-                    except ET.ParseError:
-                        pass
-                
-                data.append({
-                    'type': 'qti_assessment',
-                    'identifier': identifier,
-                    'title': title,
-                    'workflow_state': None,
-                    'position': None,
-                    'content_type': 'qti_assessment',
-                    'identifierref': None,
-                    'href': None,
-                    'resource_type': None,
-                    'filename': str(rel_path),
-                    'xml_content': content
-                })
-    
-    # Scan any remaining directories and files not covered above
-    for file_path in cartridge_path.rglob("*"):
-        if file_path.is_file():
-            rel_path = file_path.relative_to(cartridge_path)
+    return data
+
+
+def _scan_content_file(cartridge_path, file_path, content_dir):
+    """Extract a file from one of the content directories"""
+    rel_path = file_path.relative_to(cartridge_path)
+    
+    # Read content
+    content = _read_file_content(file_path)
+    
+    # Special handling for wiki pages
+    if content_dir == 'wiki_content' and file_path.suffix == '.html':
+        # Parse HTML to extract metadata
+        try:
+            root = ET.fromstring(content)
+            title_elem = root.find('.//title')
+            title = title_elem.text if title_elem is not None else None
             
-            # Skip if already processed
-            if (rel_path.parts[0] in ['course_settings', 'wiki_content', 'web_content', 'assignments', 'discussions', 'quizzes', 'files', 'media', 'external_tools'] or 
-                rel_path.name == 'imsmanifest.xml'):
-                continue
+            # Extract identifier from meta tag
+            identifier_meta = root.find('.//meta[@name="identifier"]')
+            identifier = identifier_meta.get('content') if identifier_meta is not None else None
             
-            # Read content
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            except UnicodeDecodeError:
-                # Handle binary files
-                with open(file_path, 'rb') as f:
-                    content = f.read().decode('utf-8', errors='replace')
+            # Extract workflow state
+            workflow_meta = root.find('.//meta[@name="workflow_state"]')
+            workflow_state = workflow_meta.get('content') if workflow_meta is not None else None
             
-            data.append({
-                'type': 'other_file',
+            return [{
+                'type': 'wiki_page',
+                'identifier': identifier,
+                'title': title,
+                'workflow_state': workflow_state,
+                'position': None,
+                'content_type': 'WikiPage',
+                'identifierref': None,
+                'href': str(rel_path),
+                'resource_type': None,
+                'filename': str(rel_path),
+                'xml_content': content,
+                'fields': {'body': html_body_content(content, root)}
+            }]
+        except ET.ParseError:
+            # If HTML parsing fails, store as-is
+            return [{
+                'type': 'wiki_page',
+                'identifier': None,
+                'title': file_path.stem,
+                'workflow_state': None,
+                'position': None,
+                'content_type': 'WikiPage',
+                'identifierref': None,
+                'href': str(rel_path),
+                'resource_type': None,
+                'filename': str(rel_path),
+                'xml_content': content,
+                'fields': {'body': content}
+            }]
+    elif content_dir == 'discussions' and file_path.suffix == '.xml':
+        # Handle discussion topics
+        try:
+            root = parse_xml_content(content)
+            
+            # Extract metadata from discussion XML
+            identifier = root.get('identifier')
+            title_elem = root.find('.//title')
+            title = title_elem.text if title_elem is not None else None
+            
+            return [{
+                'type': 'discussion_topic',
+                'identifier': identifier,
+                'title': title,
+                'workflow_state': None,
+                'position': None,
+                'content_type': 'DiscussionTopic',
+                'identifierref': None,
+                'href': str(rel_path),
+                'resource_type': None,
+                'filename': str(rel_path),
+                'xml_content': content,
+                'fields': discussion_file_fields(content, root)
+            }]
+        except ET.ParseError:
+            # If parsing fails, store as generic file
+            return [{
+                'type': 'discussions_file',
                 'identifier': None,
                 'title': file_path.stem,
                 'workflow_state': None,
@@ -674,20 +763,266 @@ def scan_cartridge(input_cartridge_path):
                 'href': str(rel_path),
                 'resource_type': None,
                 'filename': str(rel_path),
-                'xml_content': content
-            })
+                'xml_content': content,
+                'fields': discussion_file_fields(content, None)
+            }]
     
-    return pd.DataFrame(data)
+    # Generic content file, attachments are not read as text
+    content, fields = _read_entry_content(file_path)
+    return [_with_fields({
+        'type': f'{content_dir}_file',
+        'identifier': None,
+        'title': file_path.stem,
+        'workflow_state': None,
+        'position': None,
+        'content_type': None,
+        'identifierref': None,
+        'href': str(rel_path),
+        'resource_type': None,
+        'filename': str(rel_path),
+        'xml_content': content
+    }, fields)]
 
 
-def generate_course_structure(df, output_dir):
+def _scan_root_xml_file(cartridge_path, xml_file):
+    """Extract a UUID-named XML file from the root directory (announcements, discussions, etc.)"""
+    rel_path = xml_file.relative_to(cartridge_path)
+    
+    # Read content
+    with open(xml_file, 'r', encoding='utf-8') as f:
+        content = f.read()
+    
+    # Parse XML to extract metadata
+    try:
+        root = parse_xml_content(content)
+        
+        # Determine content type based on root element
+        root_tag = root.tag
+        if 'topicMeta' in root_tag:
+            content_type = 'discussion_topic_meta'
+            rel_path = Path('discussions') / rel_path.name
+        elif 'topic' in root_tag:
+            content_type = 'discussion_topic_content'
+            rel_path = Path('discussions') / rel_path.name
+        else:
+            content_type = 'unknown_xml'
+        
+        # Extract common metadata
+        identifier = root.get('identifier')
+        title_elem = root.find('.//{http://canvas.instructure.com/xsd/cccv1p0}title')
+        if title_elem is None:
+            title_elem = root.find('.//title')
+        title = title_elem.text if title_elem is not None else None
+        workflow_elem = root.find('.//{http://canvas.instructure.com/xsd/cccv1p0}workflow_state')
+        workflow_state = workflow_elem.text if workflow_elem is not None else None
+        position_elem = root.find('.//{http://canvas.instructure.com/xsd/cccv1p0}position')
+        position = position_elem.text if position_elem is not None else None
+        
+        fields = None
+        if content_type == 'discussion_topic_content':
+            # Title of the topic for the manifest resource pointing at it
+            topic_title_elem = root.find('.//{http://www.imsglobal.org/xsd/imsccv1p1/imsdt_v1p1}title')
+            fields = {'title': topic_title_elem.text if topic_title_elem is not None else None}
+        
+        return [_with_fields({
+            'type': content_type,
+            'identifier': identifier,
+            'title': title,
+            'workflow_state': workflow_state,
+            'position': position,
+            'content_type': content_type,
+            'identifierref': None,
+            'href': None,
+            'resource_type': None,
+            'filename': str(rel_path),
+            'xml_content': content
+        }, fields)]
+    except ET.ParseError:
+        # If parsing fails, store as generic file
+        return [{
+            'type': 'xml_file',
+            'identifier': None,
+            'title': xml_file.stem,
+            'workflow_state': None,
+            'position': None,
+            'content_type': None,
+            'identifierref': None,
+            'href': None,
+            'resource_type': None,
+            'filename': str(rel_path),
+            'xml_content': content
+        }]
+
+
+def _settings_fields(root):
+    """Structured fields of an assignment_settings.xml or assessment_meta.xml file"""
+    points_elem = root.find('.//{http://canvas.instructure.com/xsd/cccv1p0}points_possible')
+    desc_elem = root.find('.//{http://canvas.instructure.com/xsd/cccv1p0}description')
+    assignment_elem = root.find('.//{http://canvas.instructure.com/xsd/cccv1p0}assignment')
+    assignment_group_elem = root.find('.//{http://canvas.instructure.com/xsd/cccv1p0}assignment_group_identifierref')
+    return {
+        'points_possible': points_elem.text if points_elem is not None else None,
+        # The description is HTML, kept as the inner HTML of its body like page bodies
+        'description': html_body_content(desc_elem.text) if desc_elem is not None and desc_elem.text else None,
+        'assignment_identifier': assignment_elem.get('identifier') if assignment_elem is not None else None,
+        'assignment_group_identifierref': assignment_group_elem.text if assignment_group_elem is not None else None
+    }
+
+
+def _scan_uuid_dir_file(cartridge_path, file_path):
+    """Extract a file from a UUID-named directory (assignments, quizzes, etc.)"""
+    rel_path = file_path.relative_to(cartridge_path)
+    filename = file_path.name
+    
+    # Read content
+    content = _read_file_content(file_path)
+    
+    # Determine content type based on filename
+    if filename == 'assignment_settings.xml':
+        content_type = 'assignment_settings'
+    elif filename == 'assessment_meta.xml':
+        content_type = 'assessment_meta'
+    elif filename == 'assessment_qti.xml':
+        content_type = 'assessment_qti'
+    elif filename.endswith('.html'):
+        content_type = 'assignment_content'
+    else:
+        content_type = 'uuid_directory_file'
+    
+    # Extract metadata if it's XML
+    identifier = None
+    title = None
+    workflow_state = None
+    position = None
+    fields = None
+    
+    if filename.endswith('.xml'):
+        try:
+            root = parse_xml_content(content)
+            identifier = root.get('identifier')
+            
+            # Try to extract title from various possible locations
+            for title_xpath in [
+                './/{http://canvas.instructure.com/xsd/cccv1p0}title',
+                './/title'
+            ]:
+                title_elem = root.find(title_xpath)
+                if title_elem is not None:
+                    title = title_elem.text
+                    break
+            
+            # Extract workflow state
+            workflow_elem = root.find('.//{http://canvas.instructure.com/xsd/cccv1p0}workflow_state')
+            workflow_state = workflow_elem.text if workflow_elem is not None else None
+            
+            # Extract position
+            position_elem = root.find('.//{http://canvas.instructure.com/xsd/cccv1p0}position')
+            position = position_elem.text if position_elem is not None else None
+            
+            if content_type in ('assignment_settings', 'assessment_meta'):
+                fields = _settings_fields(root)
+        except ET.ParseError:
+            pass
+    elif filename.endswith('.html'):
+        # Extract title from HTML
+        root = None
+        try:
+            root = ET.fromstring(content)
+            title_elem = root.find('.//title')
+            title = title_elem.text if title_elem is not None else None
+        except ET.ParseError:
+            pass
+        fields = {'body': html_body_content(content, root) if root is not None else content}
+    
+    row = {
+        'type': content_type,
+        'identifier': identifier,
+        'title': title,
+        'workflow_state': workflow_state,
+        'position': position,
+        'content_type': content_type,
+        'identifierref': None,
+        'href': None,
+        'resource_type': None,
+        'filename': str(rel_path),
+        'xml_content': content
+    }
+    if fields is not None:
+        row['fields'] = fields
+    return [row]
+
+
+def _scan_non_cc_file(cartridge_path, file_path):
+    """Extract a QTI file from the non_cc_assessments directory"""
+    rel_path = file_path.relative_to(cartridge_path)
+    
+    # Read content
+    content = _read_file_content(file_path)
+    
+    # Extract metadata if it's QTI XML
+    identifier = None
+    title = None
+    
+    if file_path.suffix == '.qti':
+        try:
+            root = parse_xml_content(content)
+            
+            # Look for assessment element
+            assessment = root.find('.//{http://www.imsglobal.org/xsd/ims_qtiasiv1p2}assessment')
+            if assessment is not None:
+                identifier = assessment.get('ident')
+                title = assessment.get('title')
+        except ET.ParseError:
+            pass
+    
+    return [{
+        'type': 'qti_assessment',
+        'identifier': identifier,
+        'title': title,
+        'workflow_state': None,
+        'position': None,
+        'content_type': 'qti_assessment',
+        'identifierref': None,
+        'href': None,
+        'resource_type': None,
+        'filename': str(rel_path),
+        'xml_content': content
+    }]
+
+
+def _scan_other_file(cartridge_path, file_path):
+    """Extract a file not covered by the other scan phases"""
+    rel_path = file_path.relative_to(cartridge_path)
+    
+    # Read content, attachments are not read as text
+    content, fields = _read_entry_content(file_path)
+    
+    return [_with_fields({
+        'type': 'other_file',
+        'identifier': None,
+        'title': file_path.stem,
+        'workflow_state': None,
+        'position': None,
+        'content_type': None,
+        'identifierref': None,
+        'href': str(rel_path),
+        'resource_type': None,
+        'filename': str(rel_path),
+        'xml_content': content
+    }, fields)]
+
+
+def generate_course_structure(df, output_dir, input_dir=None):
     """
     Generate the course structure using data from the DataFrame.
     
     Args:
         df (pd.DataFrame): DataFrame containing scanned cartridge data
         output_dir (str): Path to the output directory
+        input_dir (str): Path to the scanned cartridge, binary files are copied from it as they have no content rows
     """
+    import pandas as pd
+    
     output_path = Path(output_dir)
     output_path.mkdir(exist_ok=True)
     
@@ -733,6 +1068,12 @@ def generate_course_structure(df, output_dir):
             file_path = output_path / row['filename']
             file_path.parent.mkdir(parents=True, exist_ok=True)
             
+            if not isinstance(row['xml_content'], str):
+                # Binary files are copied byte for byte
+                if input_dir is not None:
+                    shutil.copyfile(Path(input_dir) / row['filename'], file_path)
+                continue
+            
             # Write the exact original content
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.write(row['xml_content'])
@@ -833,17 +1174,18 @@ def main():
     parser.add_argument("input_cartridge", help="Path to input cartridge directory")
     parser.add_argument("output_cartridge", help="Path to output cartridge directory")
     parser.add_argument("--verify", action="store_true", help="Verify that output matches input")
+    parser.add_argument("--workers", type=int, default=None, help="Number of processes to parse files with")
     
     args = parser.parse_args()
     
     # Scan the input cartridge
     print(f"Scanning cartridge: {args.input_cartridge}")
-    df = scan_cartridge(args.input_cartridge)
+    df = scan_cartridge(args.input_cartridge, workers=args.workers)
     print(f"Found {len(df)} components: {df['type'].value_counts().to_dict()}")
     
     # Generate the course structure
     print(f"Generating course structure: {args.output_cartridge}")
-    generate_course_structure(df, args.output_cartridge)
+    generate_course_structure(df, args.output_cartridge, input_dir=args.input_cartridge)
     
     # Make modules
     print("Creating modules...")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Scan Index
+Sidecar cache stored inside a cartridge directory (.cc_index/) that keeps the rows extracted
+by scan_cartridge per file, so later scans only parse files whose stat changed.
+Row content is not stored, cached rows point back into the cartridge files with lazy handles
+"""
+
+import os
+import re
+import json
+import time
+from pathlib import Path
+from .lazy_content import LazyContent, content_hash
+
+# Directory inside the cartridge holding the index, never part of the cartridge itself
+INDEX_DIR = '.cc_index'
+INDEX_FILE = 'scan.json'
+INDEX_VERSION = 5
+
+# Scanned fields left out of the index, like xml_content they are file text that is read back when needed
+UNINDEXED_FIELDS = ('body',)
+
+# Temporary files cartridge files are written to before being renamed over them, as named by temp_file_path.
+# Those a crash left behind are not part of the cartridge, so they are neither scanned nor packaged
+TEMP_FILE_PATTERN = re.compile(r'\.\d+\.tmp$')
+
+# Files modified this close to the index being written may change again without their stat changing,
+# so their content hash is checked before their cached rows are trusted
+RACY_WINDOW_NS = 2_000_000_000
+
+
+def file_stat(file_path):
+    """Get the (mtime_ns, size) stat key of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def temp_file_path(file_path):
+    """Path of the temporary file a file is written to before it is renamed over it"""
+    return f"{file_path}.{os.getpid()}.tmp"
+
+
+def is_temp_file(name):
+    """Whether a file name is that of a temporary file left by a write"""
+    return TEMP_FILE_PATTERN.search(name) is not None
+
+
+def entry_key(phase, rel_path):
+    """Key of a (phase, rel_path) scan entry in the index"""
+    return f"{phase}:{rel_path}"
+
+
+def load_scan_index(cartridge_path):
+    """
+    Load the scan index of a cartridge.
+
+    Args:
+        cartridge_path (str): Path to the unzipped cartridge directory
+
+    Returns:
+        dict: The index, or an empty index if there is none or it cannot be read
+    """
+    index_path = Path(cartridge_path) / INDEX_DIR / INDEX_FILE
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('version') == INDEX_VERSION and isinstance(index.get('entries'), dict):
+            return index
+    except (OSError, ValueError):
+        pass
+
+    return {'version': INDEX_VERSION, 'written_ns': 0, 'entries': {}}
+
+
+def save_scan_index(cartridge_path, index):
+    """Write the scan index of a cartridge, replacing the previous one atomically"""
+    index_dir = Path(cartridge_path) / INDEX_DIR
+    try:
+        index_dir.mkdir(exist_ok=True)
+        index['written_ns'] = time.time_ns()
+
+        temp_path = index_dir / f"{INDEX_FILE}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(temp_path, index_dir / INDEX_FILE)
+    except OSError as e:
+        # The index is only a cache, scanning still works without it
+        print(f"Warning: Could not write scan index for {cartridge_path}: {e}")
+
+
+def cached_entry_rows(cartridge_path, index, phase, rel_path):
+    """
+    Get the cached rows of a scan entry if the files it was extracted from are unchanged.
+
+    Returns:
+        list: Cached rows with lazy xml_content handles, or None if the entry has to be scanned again
+    """
+    cached = index['entries'].get(entry_key(phase, rel_path))
+    if cached is None:
+        return None
+
+    cartridge_path = str(cartridge_path)
+    for dependency_path, stat in cached['stats'].items():
+        current_stat = file_stat(os.path.join(cartridge_path, dependency_path))
+        if current_stat != stat:
+            return None
+
+        # Written right around the last index save, the same stat does not prove the same content
+        if current_stat is not None and current_stat[0] + RACY_WINDOW_NS >= index.get('written_ns', 0):
+            if dependency_path != rel_path:
+                return None
+            try:
+                with open(os.path.join(cartridge_path, dependency_path), 'r', encoding='utf-8') as f:
+                    current_hash = content_hash(f.read())
+            except (OSError, UnicodeDecodeError):
+                return None
+            if current_hash != cached['hash']:
+                return None
+
+    file_path = os.path.join(cartridge_path, rel_path)
+    rows = []
+    for row in cached['rows']:
+        content = row['xml_content']
+        if isinstance(content, dict):
+            content = LazyContent(file_path, content['element_index'], cached['hash'])
+        rows.append(dict(row, xml_content=content))
+    return rows
+
+
+def store_entry_rows(index, phase, rel_path, rows, stats):
+    """
+    Record the rows extracted from a scan entry along with the stats of the files they came from.
+    Rows are expected to carry lazy xml_content handles, only their position in the file is stored.
+    """
+    stored_rows = []
+    for row in rows:
+        content = row['xml_content']
+        if isinstance(content, LazyContent):
+            content = {'element_index': content.element_index}
+        stored_row = dict(row, xml_content=content)
+        fields = {key: value for key, value in (row.get('fields') or {}).items() if key not in UNINDEXED_FIELDS}
+        if fields:
+            stored_row['fields'] = fields
+        else:
+            stored_row.pop('fields', None)
+        stored_rows.append(stored_row)
+
+    index['entries'][entry_key(phase, rel_path)] = {
+        'stats': stats,
+        'hash': getattr(rows[0]['xml_content'], 'digest', None) if rows else None,
+        'rows': stored_rows
+    }
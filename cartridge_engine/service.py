@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Cartridge Service
+In-process engine API that keeps hydrated CartridgeGenerator instances in memory,
+so callers such as the web tier can edit cartridges without spawning cartridge_cli.py
+"""
+
+import os
+import shutil
+from .generator import CartridgeGenerator
+from .cartridge_lock import cartridge_lock
+from .hot_cache import DEFAULT_MAX_BYTES, HotCache
+from ._cartridge_update_mixin import decode_marked_files
+
+
+class CartridgeService:
+    """Holds one hydrated CartridgeGenerator per cartridge path and exposes course operations on it"""
+
+    # Lookup method used to resolve an item title for each content type
+    FINDERS = {
+        'WikiPage': 'find_wiki_id',
+        'Assignment': 'find_assignment_id',
+        'DiscussionTopic': 'find_discussion_id',
+        'Quiz': 'find_quiz_id',
+        'File': 'find_file_id'
+    }
+
+    def __init__(self, verbose=False, max_bytes=DEFAULT_MAX_BYTES, blob_store=None):
+        self.verbose = verbose
+        # Optional BlobStore the binary files of all cartridges are deduplicated through
+        self.blob_store = blob_store
+        # Least recently used cartridges are dropped once the held generators exceed max_bytes
+        self._generators = HotCache(max_bytes=max_bytes)
+
+    def _key(self, cartridge_path):
+        """Normalize a cartridge path into the key used for held generators"""
+        return os.path.abspath(cartridge_path)
+
+    def get_generator(self, cartridge_path):
+        """Get the hydrated generator for a cartridge, hydrating it on first use"""
+        key = self._key(cartridge_path)
+        with cartridge_lock(key):
+            generator = self._generators.get(key)
+            if generator is not None:
+                return generator
+
+            generator = CartridgeGenerator("temp", "temp", verbose=self.verbose)  # Will be overridden during hydration
+            generator.blob_store = self.blob_store
+            if not generator.hydrate_from_existing_cartridge(key):
+                self.release(key)
+                raise ValueError(f"Failed to load cartridge '{cartridge_path}'")
+
+            self._generators.put(key, generator)
+            return generator
+
+    def sync(self, cartridge_path):
+        """Mark the held generator as current after it wrote the cartridge through its own methods"""
+        self._generators.touch(self._key(cartridge_path))
+
+    def release(self, cartridge_path):
+        """Drop the held generator for a cartridge"""
+        self._generators.pop(self._key(cartridge_path))
+
+    def collect_garbage(self):
+        """Remove the blobs of the blob store no cartridge links to any more, after files were deleted"""
+        if self.blob_store is None:
+            return {'blobs': 0, 'bytes': 0}
+        return self.blob_store.collect_garbage()
+
+    def cache_stats(self):
+        """Get the hit, miss and eviction counters and the memory use of the held generators"""
+        return self._generators.stats()
+
+    def _apply(self, cartridge_path, operation):
+        """
+        Run an operation against a cartridge's generator and return (success, message).
+        The cartridge lock is held from the freshness check to the final write, so concurrent operations
+        on one cartridge, from this process or another, cannot drop each other's changes.
+        """
+        key = self._key(cartridge_path)
+        with cartridge_lock(key):
+            try:
+                generator = self.get_generator(key)
+                with generator.transaction():
+                    message = operation(generator)
+            except Exception as e:
+                print(f"Error: {e}")
+                # In-memory state may be half applied, hydrate again on next use
+                self.release(key)
+                return False, str(e)
+
+            self._generators.touch(key)
+            return True, message
+
+    def transaction(self, cartridge_path):
+        """
+        Batch several generator operations on a cartridge into one locked write.
+
+        Usage:
+            with service.transaction(path) as generator:
+                generator.add_module(...)
+                generator.add_wiki_page_to_module(...)
+        """
+        return _ServiceTransaction(self, self._key(cartridge_path))
+
+    def _find_item_id(self, generator, item_title, content_type):
+        """Resolve an item title to its identifier for the given content type"""
+        finder = self.FINDERS.get(content_type)
+        if not finder:
+            raise ValueError(f"Unsupported content type: {content_type}")
+        return getattr(generator, finder)(item_title)
+
+    def create_cartridge(self, cartridge_path, title, code):
+        """Create a new cartridge"""
+        if os.path.exists(cartridge_path):
+            return False, f"Cartridge '{cartridge_path}' already exists"
+
+        key = self._key(cartridge_path)
+        generator = CartridgeGenerator(title, code, verbose=self.verbose)
+        generator.blob_store = self.blob_store
+        generator.create_base_cartridge(key)
+
+        self._generators.put(key, generator)
+        return True, f"Cartridge '{cartridge_path}' created"
+
+    def rename_cartridge(self, old_path, new_path):
+        """Rename a cartridge directory"""
+        if not os.path.exists(old_path) or os.path.exists(new_path):
+            return False, f"Cannot rename '{old_path}' to '{new_path}'"
+
+        with cartridge_lock(old_path):
+            self.release(old_path)
+            os.rename(old_path, new_path)
+        return True, f"Cartridge renamed to '{new_path}'"
+
+    def delete_cartridge(self, cartridge_path):
+        """Delete a cartridge directory"""
+        with cartridge_lock(cartridge_path):
+            self.release(cartridge_path)
+            if os.path.exists(cartridge_path):
+                shutil.rmtree(cartridge_path)
+        self.collect_garbage()
+        return True, f"Cartridge '{cartridge_path}' deleted"
+
+    def decode_marked_files(self, cartridge_path):
+        """Decode the marked payloads a cartridge saved before they were decoded on update still holds"""
+        key = self._key(cartridge_path)
+        with cartridge_lock(key):
+            decoded_files = decode_marked_files(key)
+            if decoded_files:
+                # Held entities still carry the encoded payloads
+                self.release(key)
+        return len(decoded_files)
+
+    def get_modules(self, cartridge_path):
+        """Get the module/item structure of a cartridge"""
+        with cartridge_lock(cartridge_path):
+            return self.get_generator(cartridge_path).get_modules_data()
+
+    def add_module(self, cartridge_path, title, position=None, published=True):
+        """Add a module to a cartridge"""
+        def operation(generator):
+            module_id = generator.add_module(title, position=position, published=published)
+            return f"Module '{title}' added (ID: {module_id})"
+
+        return self._apply(cartridge_path, operation)
+
+    def update_module(self, cartridge_path, title, new_title=None, position=None):
+        """Rename and/or reposition a module"""
+        def operation(generator):
+            if new_title is None and position is None:
+                raise ValueError("At least one of new_title or position must be specified")
+
+            module_id = generator.find_module_id(title)
+            if position is not None:
+                generator.update_module_with_position(module_id, new_title, position)
+            else:
+                generator.rename_module(module_id, new_title)
+            return f"Module '{title}' updated"
+
+        return self._apply(cartridge_path, operation)
+
+    def delete_module(self, cartridge_path, title):
+        """Delete a module and all its contents"""
+        def operation(generator):
+            generator.delete_module_by_id(generator.find_module_id(title))
+            return f"Module '{title}' deleted"
+
+        success, message = self._apply(cartridge_path, operation)
+        if success:
+            # The module's files may have been the last links to their blobs
+            self.collect_garbage()
+        return success, message
+
+    def add_item(self, cartridge_path, module_title, item_title, content_type, **kwargs):
+        """Add an item of the given content type to a module"""
+        def operation(generator):
+            module_id = generator.find_module_id(module_title)
+
+            if content_type == "WikiPage":
+                generator.add_wiki_page_to_module(module_id, item_title, page_content=kwargs.get("content", ""), published=True, position=None)
+            elif content_type == "Assignment":
+                generator.add_assignment_to_module(module_id, item_title, assignment_content=kwargs.get("content", ""), points=kwargs.get("points", 100), published=True, position=None)
+            elif content_type == "DiscussionTopic":
+                generator.add_discussion_to_module(module_id, item_title, kwargs.get("description", ""), published=True, position=None)
+            elif content_type == "File":
+                generator.add_file_to_module(module_id, item_title, kwargs.get("content", ""), position=None)
+            elif content_type == "Quiz":
+                generator.add_quiz_to_module(module_id, item_title, quiz_description=kwargs.get("description", ""), points=kwargs.get("points", 10), published=True, position=None)
+            else:
+                raise ValueError(f"Unsupported content type: {content_type}")
+
+            return f"{content_type} '{item_title}' added to module '{module_title}'"
+
+        return self._apply(cartridge_path, operation)
+
+    def delete_item(self, cartridge_path, item_title, content_type):
+        """Delete an item of the given content type"""
+        def operation(generator):
+            item_id = self._find_item_id(generator, item_title, content_type)
+
+            if content_type == "WikiPage":
+                generator.delete_wiki_page_by_id(item_id)
+            elif content_type == "Assignment":
+                generator.delete_assignment_by_id(item_id)
+            elif content_type == "DiscussionTopic":
+                generator.delete_discussion_by_id(item_id)
+            elif content_type == "File":
+                generator.delete_file_by_id(item_id)
+            elif content_type == "Quiz":
+                generator.delete_quiz_by_id(item_id)
+
+            return f"{content_type} '{item_title}' deleted"
+
+        success, message = self._apply(cartridge_path, operation)
+        if success and content_type == "File":
+            self.collect_garbage()
+        return success, message
+
+    def update_item(self, cartridge_path, item_title, content_type, **kwargs):
+        """Update an item of the given content type"""
+        def operation(generator):
+            item_id = self._find_item_id(generator, item_title, content_type)
+
+            if content_type == "WikiPage":
+                generator.update_wiki(item_id, page_title=kwargs.get("new_title"), page_content=kwargs.get("content"),
+                                      published=kwargs.get("published"), position=kwargs.get("position"))
+            elif content_type == "Assignment":
+                generator.update_assignment(item_id, assignment_title=kwargs.get("new_title"), assignment_content=kwargs.get("content"),
+                                            points=kwargs.get("points"), published=kwargs.get("published"), position=kwargs.get("position"))
+            elif content_type == "DiscussionTopic":
+                generator.update_discussion(item_id, title=kwargs.get("new_title"), body=kwargs.get("content"),
+                                            published=kwargs.get("published"), position=kwargs.get("position"))
+            elif content_type == "Quiz":
+                generator.update_quiz(item_id, quiz_title=kwargs.get("new_title"), quiz_description=kwargs.get("description"),
+                                      points=kwargs.get("points"), published=kwargs.get("published"), position=kwargs.get("position"))
+            elif content_type == "File":
+                generator.update_file(item_id, filename=kwargs.get("new_filename"), file_content=kwargs.get("content"),
+                                      position=kwargs.get("position"))
+
+            return f"{content_type} '{item_title}' updated"
+
+        return self._apply(cartridge_path, operation)
+
+    def copy_item(self, cartridge_path, item_title, target_module, content_type):
+        """Copy an item of the given content type to another module"""
+        def operation(generator):
+            item_id = self._find_item_id(generator, item_title, content_type)
+            target_module_id = generator.find_module_id(target_module)
+
+            if content_type == "WikiPage":
+                new_id = generator.copy_wiki_page(item_id, target_module_id)
+            elif content_type == "Assignment":
+                new_id = generator.copy_assignment(item_id, target_module_id)
+            elif content_type == "DiscussionTopic":
+                new_id = generator.copy_discussion(item_id, target_module_id)
+            elif content_type == "File":
+                new_id = generator.copy_file(item_id, target_module_id)
+            elif content_type == "Quiz":
+                new_id = generator.copy_quiz(item_id, target_module_id)
+
+            return f"{content_type} '{item_title}' copied to module '{target_module}' (ID: {new_id})"
+
+        return self._apply(cartridge_path, operation)
+
+    def get_item_details(self, cartridge_path, item_title, content_type):
+        """Get the display information of an item of the given content type"""
+        with cartridge_lock(cartridge_path):
+            generator = self.get_generator(cartridge_path)
+            item_id = self._find_item_id(generator, item_title, content_type)
+
+            if content_type == "WikiPage":
+                return generator.display_wiki(item_id)
+            elif content_type == "Assignment":
+                return generator.display_assignment(item_id)
+            elif content_type == "DiscussionTopic":
+                return generator.display_discussion(item_id)
+            elif content_type == "Quiz":
+                return generator.display_quiz(item_id)
+            elif content_type == "File":
+                return generator.display_file(item_id)
+
+
+class _ServiceTransaction:
+    """Context manager behind CartridgeService.transaction"""
+
+    def __init__(self, service, key):
+        self.service = service
+        self.key = key
+        self.lock = cartridge_lock(key)
+        self.generator = None
+        self._transaction = None
+
+    def __enter__(self):
+        self.lock.acquire()
+        try:
+            self.generator = self.service.get_generator(self.key)
+            self._transaction = self.generator.transaction()
+            return self._transaction.__enter__()
+        except BaseException:
+            self.lock.release()
+            raise
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._transaction.__exit__(exc_type, exc, tb)
+            self.service.sync(self.key)
+        except BaseException:
+            # In-memory state may be half applied, hydrate again on next use
+            self.service.release(self.key)
+            raise
+        finally:
+            self.lock.release()
+        return False
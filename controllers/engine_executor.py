@@ -0,0 +1,66 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List
+
+
+class EngineExecutor:
+    """
+    Runs blocking cartridge engine work off the event loop.
+    Jobs run in a bounded thread pool, one at a time per course so edits to a course never interleave,
+    and at most jobs_per_user at a time per user so one user's long import cannot take every worker.
+    Course locks and user slots only exist while a job holds or waits for them.
+    """
+
+    def __init__(self, max_workers: int = 4, jobs_per_user: int = 2):
+        self.max_workers = max_workers
+        self.jobs_per_user = jobs_per_user
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="engine")
+        # Lock or semaphore per key, with the number of jobs holding or waiting for it
+        self._course_locks: Dict[str, List] = {}
+        self._user_slots: Dict[str, List] = {}
+
+    @asynccontextmanager
+    async def _hold(self, table: Dict[str, List], key: str, factory: Callable):
+        """Hold the lock or semaphore of a key, created on first use and dropped once no job uses it"""
+        entry = table.get(key)
+        if entry is None:
+            entry = table[key] = [factory(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            # Only the event loop thread touches the tables, so no job can pick the entry up in between
+            entry[1] -= 1
+            if entry[1] == 0:
+                del table[key]
+
+    async def _run_in_pool(self, func, args, kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def _run_for_course(self, course, func, args, kwargs):
+        if course is None:
+            return await self._run_in_pool(func, args, kwargs)
+        async with self._hold(self._course_locks, course, asyncio.Lock):
+            return await self._run_in_pool(func, args, kwargs)
+
+    async def run(self, func, *args, course: str = None, user: str = None, **kwargs):
+        """
+        Run func(*args, **kwargs) in the pool and return its result.
+
+        Args:
+            func: Blocking callable to run
+            course: Course the job reads or writes, jobs for the same course run one after another
+            user: User the job runs for, counted against their concurrency limit
+        """
+        if user is None:
+            return await self._run_for_course(course, func, args, kwargs)
+        async with self._hold(self._user_slots, user, lambda: asyncio.Semaphore(self.jobs_per_user)):
+            return await self._run_for_course(course, func, args, kwargs)
+
+    def shutdown(self):
+        """Stop the pool once running jobs finish"""
+        self._executor.shutdown(wait=True)
@@ -1,17 +1,36 @@
-from fastapi import APIRouter, WebSocket, Request, Depends, Form
+from fastapi import APIRouter, WebSocket, Request, Depends, Form, File, UploadFile
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 import json
 from .asyncqueue import AsyncQueue
+from .engine_executor import EngineExecutor
 from .auth import require_login, verify_credentials
 from models.user_state import UserState
 from models.courses import Courses
+from cartridge_engine.package_cache import PackageCache
+from cartridge_engine.course_catalog import DEFAULT_PAGE_SIZE
 import asyncio
 
 router = APIRouter()
 templates = Jinja2Templates(directory="views")
 message_queue = AsyncQueue()
 
+# Packaged courses kept in memory for repeated downloads, least recently used evicted past this many bytes
+PACKAGE_CACHE_BYTES = 256 * 1024 * 1024
+package_cache = PackageCache(max_bytes=PACKAGE_CACHE_BYTES)
+
+# Engine work runs off the event loop, in at most ENGINE_WORKERS threads and ENGINE_JOBS_PER_USER jobs per user
+ENGINE_WORKERS = 4
+ENGINE_JOBS_PER_USER = 2
+engine = EngineExecutor(max_workers=ENGINE_WORKERS, jobs_per_user=ENGINE_JOBS_PER_USER)
+
+
+async def _course_page(request: Request, courses: Courses, username: str):
+    """Get the page of course summaries the user last opened on the index"""
+    page = request.session.get("course_page", 1)
+    per_page = request.session.get("course_per_page", DEFAULT_PAGE_SIZE)
+    return await engine.run(courses.catalog_page, page, per_page, user=username)
+
 
 @router.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
@@ -60,12 +79,12 @@ async def add_course(request: Request, course_name: str = Form(...)):
     
     # Add course using CLI
     courses = Courses()
-    success, message = courses.add_course(course_name)
+    success, message = await engine.run(courses.add_course, course_name, course=course_name, user=username)
     
     if success:
         # Render the accordion macro to get HTML content
         macro_template = templates.get_template("index/course_pagination_component.html")
-        html_content = macro_template.module.course_accordion(courses.courses)
+        html_content = macro_template.module.course_accordion(await _course_page(request, courses, username))
         
         # Update DOM with new course list
         jquery_update = f'$("div.demo-container").html(`{html_content}`);'
@@ -96,11 +115,11 @@ async def edit_course(request: Request, course_name: str, new_course_name: str =
     
     # Update course name in shelve
     courses = Courses()
-    courses.update_course_name(course_name, new_course_name)
+    await engine.run(courses.update_course_name, course_name, new_course_name, course=course_name, user=username)
     
     # Render the accordion macro to get updated HTML content
     macro_template = templates.get_template("index/course_pagination_component.html")
-    html_content = macro_template.module.course_accordion(courses.courses)
+    html_content = macro_template.module.course_accordion(await _course_page(request, courses, username))
     
     # Update DOM with new course list
     jquery_update = f'$("div.demo-container").html(`{html_content}`);'
@@ -127,11 +146,11 @@ async def delete_course(request: Request, course_name: str):
     
     # Delete course from shelve
     courses = Courses()
-    courses.delete_course(course_name)
+    await engine.run(courses.delete_course, course_name, course=course_name, user=username)
     
     # Render the accordion macro to get updated HTML content
     macro_template = templates.get_template("index/course_pagination_component.html")
-    html_content = macro_template.module.course_accordion(courses.courses)
+    html_content = macro_template.module.course_accordion(await _course_page(request, courses, username))
     
     # Update DOM with new course list
     jquery_update = f'$("div.demo-container").html(`{html_content}`);'
@@ -158,16 +177,17 @@ async def add_module(request: Request, course_name: str, module_name: str = Form
     
     # Add module to course using CLI
     courses = Courses()
-    success, message = courses.add_module(course_name, module_name)
+    success, message = await engine.run(courses.add_module, course_name, module_name, course=course_name, user=username)
     
     if success:
         # Render the accordion macro to get updated HTML content
         macro_template = templates.get_template("index/course_pagination_component.html")
-        html_content = macro_template.module.course_accordion(courses.courses)
+        html_content = macro_template.module.course_accordion(await _course_page(request, courses, username))
         
         # Update DOM with new course list
         jquery_update = f'$("div.demo-container").html(`{html_content}`);'
         await message_queue.broadcast_js_to_user(jquery_update, username)
+        await message_queue.broadcast_js_to_user(f'openCourseModules({json.dumps(course_name)});', username)
         
         # Hide loading overlay and show success
         await message_queue.broadcast_js_to_user('$.LoadingOverlay("hide", true);', username)
@@ -195,16 +215,18 @@ async def update_module(request: Request, course_name: str, module_title: str,
     
     # Update module using CLI
     courses = Courses()
-    success, message = courses.update_module(course_name, module_title, new_title, position)
+    success, message = await engine.run(courses.update_module, course_name, module_title, new_title, position,
+                                        course=course_name, user=username)
     
     if success:
         # Render the accordion macro to get updated HTML content
         macro_template = templates.get_template("index/course_pagination_component.html")
-        html_content = macro_template.module.course_accordion(courses.courses)
+        html_content = macro_template.module.course_accordion(await _course_page(request, courses, username))
         
         # Update DOM with new course list
         jquery_update = f'$("div.demo-container").html(`{html_content}`);'
         await message_queue.broadcast_js_to_user(jquery_update, username)
+        await message_queue.broadcast_js_to_user(f'openCourseModules({json.dumps(course_name)});', username)
         
         # Hide loading overlay and show success
         await message_queue.broadcast_js_to_user('$.LoadingOverlay("hide", true);', username)
@@ -231,15 +253,16 @@ async def edit_module(request: Request, course_name: str, module_name: str, new_
     
     # Update module name in shelve
     courses = Courses()
-    courses.update_module_name(course_name, module_name, new_module_name)
+    await engine.run(courses.update_module_name, course_name, module_name, new_module_name, course=course_name, user=username)
     
     # Render the accordion macro to get updated HTML content
     macro_template = templates.get_template("index/course_pagination_component.html")
-    html_content = macro_template.module.course_accordion(courses.courses)
+    html_content = macro_template.module.course_accordion(await _course_page(request, courses, username))
     
     # Update DOM with new course list
     jquery_update = f'$("div.demo-container").html(`{html_content}`);'
     await message_queue.broadcast_js_to_user(jquery_update, username)
+    await message_queue.broadcast_js_to_user(f'openCourseModules({json.dumps(course_name)});', username)
     
     # Hide loading overlay
     await message_queue.broadcast_js_to_user('$.LoadingOverlay("hide", true);', username)
@@ -262,7 +285,7 @@ async def delete_module(request: Request, course_name: str, module_name: str):
     
     # Delete module from course
     courses = Courses()
-    success, message = courses.delete_module(course_name, module_name)
+    success, message = await engine.run(courses.delete_module, course_name, module_name, course=course_name, user=username)
     
     # Hide loading overlay
     await message_queue.broadcast_js_to_user('$.LoadingOverlay("hide", true);', username)
@@ -270,11 +293,12 @@ async def delete_module(request: Request, course_name: str, module_name: str):
     if success:
         # Render the accordion macro to get updated HTML content
         macro_template = templates.get_template("index/course_pagination_component.html")
-        html_content = macro_template.module.course_accordion(courses.courses)
+        html_content = macro_template.module.course_accordion(await _course_page(request, courses, username))
         
         # Update DOM with new course list
         jquery_update = f'$("div.demo-container").html(`{html_content}`);'
         await message_queue.broadcast_js_to_user(jquery_update, username)
+        await message_queue.broadcast_js_to_user(f'openCourseModules({json.dumps(course_name)});', username)
         
         await message_queue.broadcast_js_to_user('''alertify.success("Success");''', username)
     else:
@@ -298,7 +322,7 @@ async def view_module(request: Request, course_name: str, module_name: str):
     
     # Get courses from shelve to verify module exists
     courses = Courses()
-    modules = courses.get_course_modules(course_name)
+    modules = await engine.run(courses.get_course_modules, course_name, course=course_name, user=username)
     
 
     module_names_arr = []
@@ -311,8 +335,8 @@ async def view_module(request: Request, course_name: str, module_name: str):
     if not module_exists:
         return RedirectResponse(url="/", status_code=303)
     
-    # Get module items
-    module_items = courses.get_module_items(course_name, module_name)
+    # Get module items from the modules already loaded
+    module_items = next(module.get("items", []) for module in modules if module.get("title") == module_name)
     
     return templates.TemplateResponse("view_module/view_module.html", {
         "request": request,
@@ -336,22 +360,76 @@ async def add_item(request: Request, course_name: str, module_name: str, item_ti
     
     # Add item to module using CLI with default values for additional parameters
     courses = Courses()
-    success, message = courses.add_module_item(
+    success, message = await engine.run(
+        courses.add_module_item,
         course_name, 
         module_name, 
         item_title, 
         content_type,
         content="Default content",
         description="Default description", 
-        points=10
+        points=10,
+        course=course_name,
+        user=username
     )
     
     if success:
-        # Get updated module items
-        module_items = courses.get_module_items(course_name, module_name)
+        # Get updated modules, the items of this one and the module names array for the macro
+        modules = await engine.run(courses.get_course_modules, course_name, course=course_name, user=username)
+        module_items = next((module.get("items", []) for module in modules if module.get("title") == module_name), [])
+        module_names_arr = [module.get("title") for module in modules] if modules else []
+        
+        # Render the module items macro to get updated HTML content
+        macro_template = templates.get_template("view_module/module_items_component.html")
+        html_content = macro_template.module.module_items_display(module_items, course_name, module_name, module_names_arr)
+        
+        # Update DOM with new module items
+        jquery_update = f'$("div.module-items-container").html(`{html_content}`);'
+        await message_queue.broadcast_js_to_user(jquery_update, username)
         
-        # Get module names array for the macro
-        modules = courses.get_course_modules(course_name)
+        # Hide loading overlay and show success
+        await message_queue.broadcast_js_to_user('$.LoadingOverlay("hide", true);', username)
+        await message_queue.broadcast_js_to_user('''alertify.success("Success");''', username)
+    else:
+        # Hide loading overlay and show error
+        await message_queue.broadcast_js_to_user('$.LoadingOverlay("hide", true);', username)
+        await message_queue.broadcast_js_to_user('''alertify.error("Error, please check logs");''', username)
+
+    # Close modal
+    await message_queue.broadcast_js_to_user(''' $('.jquery-modal.blocker.current').remove(); ''', username)
+
+    return RedirectResponse(url=f"/view_module/{course_name}/{module_name}", status_code=303)
+
+
+@router.post("/upload-file/{course_name}/{module_name}")
+async def upload_file(request: Request, course_name: str, module_name: str, upload: UploadFile = File(...)):
+    # Check if user is logged in
+    username = request.session.get("username")
+    if not username:
+        return RedirectResponse(url="/login", status_code=303)
+    
+    # Show loading overlay
+    await message_queue.broadcast_js_to_user('$.LoadingOverlay("show");', username)
+    
+    # Stream the uploaded file into the module, it is copied in chunks and never decoded
+    courses = Courses()
+    try:
+        success, message = await engine.run(
+            courses.upload_module_file,
+            course_name,
+            module_name,
+            upload.filename,
+            upload.file,
+            course=course_name,
+            user=username
+        )
+    finally:
+        await upload.close()
+    
+    if success:
+        # Get updated modules, the items of this one and the module names array for the macro
+        modules = await engine.run(courses.get_course_modules, course_name, course=course_name, user=username)
+        module_items = next((module.get("items", []) for module in modules if module.get("title") == module_name), [])
         module_names_arr = [module.get("title") for module in modules] if modules else []
         
         # Render the module items macro to get updated HTML content
@@ -387,14 +465,13 @@ async def delete_item(request: Request, course_name: str, module_name: str, item
     
     # Delete item from module using CLI
     courses = Courses()
-    success, message = courses.delete_module_item(course_name, module_name, item_title, content_type)
+    success, message = await engine.run(courses.delete_module_item, course_name, module_name, item_title, content_type,
+                                        course=course_name, user=username)
     
     if success:
-        # Get updated module items
-        module_items = courses.get_module_items(course_name, module_name)
-        
-        # Get module names array for the macro
-        modules = courses.get_course_modules(course_name)
+        # Get updated modules, the items of this one and the module names array for the macro
+        modules = await engine.run(courses.get_course_modules, course_name, course=course_name, user=username)
+        module_items = next((module.get("items", []) for module in modules if module.get("title") == module_name), [])
         module_names_arr = [module.get("title") for module in modules] if modules else []
         
         # Render the module items macro to get updated HTML content
@@ -430,14 +507,13 @@ async def copy_item(request: Request, course_name: str, module_name: str, item_t
     
     # Copy item using CLI
     courses = Courses()
-    success, message = courses.copy_item(course_name, item_title, destination_module, content_type)
+    success, message = await engine.run(courses.copy_item, course_name, item_title, destination_module, content_type,
+                                        course=course_name, user=username)
     
     if success:
-        # Get updated module items
-        module_items = courses.get_module_items(course_name, module_name)
-        
-        # Get module names array for the macro
-        modules = courses.get_course_modules(course_name)
+        # Get updated modules, the items of this one and the module names array for the macro
+        modules = await engine.run(courses.get_course_modules, course_name, course=course_name, user=username)
+        module_items = next((module.get("items", []) for module in modules if module.get("title") == module_name), [])
         module_names_arr = [module.get("title") for module in modules] if modules else []
         
         # Render the module items macro to get updated HTML content
@@ -473,7 +549,8 @@ async def view_item(request: Request, course_name: str, module_name: str, item_t
     
     # Get item details from CLI
     courses = Courses()
-    item = courses.get_item_details(course_name, module_name, item_title, content_type)
+    item = await engine.run(courses.get_item_details, course_name, module_name, item_title, content_type,
+                            course=course_name, user=username)
     print("dubug!!!!!!!!!!!!!!!!!!!!")
     print(item)
     
@@ -552,7 +629,8 @@ async def update_item(request: Request, course_name: str, module_name: str, item
     
     # Update item using CLI
     courses = Courses()
-    success, message = courses.update_module_item(course_name, module_name, item_title, content_type, **kwargs)
+    success, message = await engine.run(courses.update_module_item, course_name, module_name, item_title, content_type, **kwargs,
+                                        course=course_name, user=username)
     
     # Hide loading overlay
     await message_queue.broadcast_js_to_user('$.LoadingOverlay("hide", true);', username)
@@ -597,9 +675,7 @@ async def download_course(request: Request, course_name: str):
         return RedirectResponse(url="/login", status_code=303)
     
     import os
-    import base64
-    import subprocess
-    from fastapi.responses import FileResponse
+    from fastapi.responses import Response, StreamingResponse
     
     # Define the course directory path
     course_dir = os.path.join("cartridge_current_working_state", course_name)
@@ -608,106 +684,39 @@ async def download_course(request: Request, course_name: str):
         print(f"Course directory not found: {course_dir}")
         return {"message": "Course directory not found", "course_name": course_name}
     
-    changed_files = []
+    # The archive is addressed by the digest of the course tree, so an unchanged course needs no packaging
+    package_filename = f"{course_name}.imscc"
+    digest = await engine.run(package_cache.digest, course_dir, course=course_name, user=username)
+    etag = f'"{digest}"'
+    headers = {
+        'ETag': etag,
+        'Content-Disposition': f'attachment; filename="{package_filename}"'
+    }
     
-    # Recursively walk through all directories and files
-    for root, dirs, files in os.walk(course_dir):
-        for file in files:
-            # Skip table_inspect.html
-            if file == "table_inspect.html":
-                print(f"Skipping file: {file}")
-                continue
-                
-            file_path = os.path.join(root, file)
-            
-            try:
-                # Read file content
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # Check if file contains base64 markers
-                if "@@@@@@@@@@" in content:
-                    # Count occurrences to ensure we have at least 2 markers
-                    marker_count = content.count("@@@@@@@@@@")
-                    if marker_count >= 2:
-                        # Split content by markers
-                        parts = content.split("@@@@@@@@@@")
-                        
-                        if len(parts) >= 3:
-                            # Get the base64 content (middle part)
-                            base64_content = parts[1]
-                            
-                            try:
-                                # Decode base64
-                                decoded_content = base64.b64decode(base64_content).decode('utf-8')
-                                
-                                # Replace the content: keep everything before first marker,
-                                # add decoded content, keep everything after last marker
-                                new_content = parts[0] + decoded_content + parts[2]
-                                
-                                # Write back to file
-                                with open(file_path, 'w', encoding='utf-8') as f:
-                                    f.write(new_content)
-                                
-                                changed_files.append(file_path)
-                                print(f"Changed file: {file_path}")
-                                
-                            except Exception as e:
-                                print(f"Error decoding base64 in {file_path}: {e}")
-                                
-            except Exception as e:
-                # Skip files that can't be read as text (binary files, etc.)
-                continue
-    
-    print(f"Total files changed: {len(changed_files)}")
-    for file_path in changed_files:
-        print(f"File changed: {file_path}")
-    
-    # Run CLI commands
-    try:
-        # Run list command
-        list_cmd = [".venv/bin/python", "cartridge_cli.py", "list", course_dir]
-        print(f"Running command: {' '.join(list_cmd)}")
-        list_result = subprocess.run(list_cmd, capture_output=True, text=True, check=True)
-        print(f"List command output: {list_result.stdout}")
-        
-        # Run package command
-        package_cmd = [".venv/bin/python", "cartridge_cli.py", "package", course_dir]
-        print(f"Running command: {' '.join(package_cmd)}")
-        package_result = subprocess.run(package_cmd, capture_output=True, text=True, check=True)
-        print(f"Package command output: {package_result.stdout}")
-        
-        # Look for the generated zip file (assuming it's created in the course directory or parent)
-        zip_filename = f"{course_name}.zip"
-        zip_path = os.path.join(course_dir, zip_filename)
-        
-        # If not found in course dir, check parent directory
-        if not os.path.exists(zip_path):
-            zip_path = os.path.join("cartridge_current_working_state", zip_filename)
-        
-        # If still not found, check current directory
-        if not os.path.exists(zip_path):
-            zip_path = zip_filename
-        
-        if os.path.exists(zip_path):
-            print(f"Serving download file: {zip_path}")
-            return FileResponse(
-                path=zip_path,
-                filename=zip_filename,
-                media_type='application/zip'
-            )
-        else:
-            print(f"Generated zip file not found: {zip_filename}")
-            return {"message": "Package created but zip file not found", "course_name": course_name}
-            
-    except subprocess.CalledProcessError as e:
-        print(f"CLI command failed: {e}")
-        print(f"Error output: {e.stderr}")
-        return {"message": "CLI command failed", "course_name": course_name, "error": str(e)}
+    if_none_match = request.headers.get("if-none-match", "")
+    client_etags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    if etag in client_etags or "*" in client_etags:
+        print(f"Download not modified: {package_filename}")
+        return Response(status_code=304, headers={'ETag': etag})
+    
+    archive = package_cache.get(digest)
+    if archive is not None:
+        print(f"Serving cached download file: {package_filename}")
+        return Response(content=archive, media_type='application/zip', headers=headers)
+    
+    # Stream from a snapshot of the course taken under its lock, the archive is cached once complete
+    print(f"Streaming download file: {package_filename}")
+    digest, chunks = await engine.run(package_cache.stream, course_dir, course=course_name, user=username)
+    headers['ETag'] = f'"{digest}"'
+    return StreamingResponse(
+        chunks,
+        media_type='application/zip',
+        headers=headers
+    )
 
 
 @router.get("/", response_class=HTMLResponse)
-async def get_index(request: Request):
+async def get_index(request: Request, page: int = 1, per_page: int = DEFAULT_PAGE_SIZE):
     # Check if user is logged in
     username = request.session.get("username")
     if not username:
@@ -716,15 +725,39 @@ async def get_index(request: Request):
     # Create user state for request
     user_state = UserState(username)
     
-    # Get courses from shelve
+    # Get one page of course summaries from the catalog, module lists are loaded when a course is opened
     courses = Courses()
+    catalog = await engine.run(courses.catalog_page, page, per_page, user=username)
+    course_names = [course["name"] for course in catalog["courses"]]
+    
+    # Remember the page, so the course list re-rendered after a change stays on it
+    request.session["course_page"] = catalog["page"]
+    request.session["course_per_page"] = catalog["per_page"]
     
     return templates.TemplateResponse("index/index.html", {
         "request": request, 
         "message": user_state.message,
         "username": username,
-        "courses": courses.course_names,
-        "courses_data": courses.courses
+        "courses": course_names,
+        "catalog": catalog,
+        "page": catalog["page"],
+        "pages": catalog["pages"]
     })
 
 
+@router.get("/course-modules/{course_name}", response_class=HTMLResponse)
+async def course_modules(request: Request, course_name: str):
+    # Check if user is logged in
+    username = request.session.get("username")
+    if not username:
+        return HTMLResponse("", status_code=401)
+    
+    # Modules come from the course summary record, the course is not loaded
+    courses = Courses()
+    modules = await engine.run(courses.course_modules, course_name, user=username)
+    
+    # Render the module list of this course only, with its modals
+    macro_template = templates.get_template("index/course_pagination_component.html")
+    return HTMLResponse(str(macro_template.module.course_modules(course_name, modules)))
+
+
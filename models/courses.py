@@ -1,177 +1,121 @@
-import subprocess
-import json
 import os
 from typing import List, Dict, Any
+from cartridge_engine import CartridgeService
+from cartridge_engine.course_catalog import CourseCatalog, DEFAULT_PAGE_SIZE, read_cartridge_summary
+from cartridge_engine.blob_store import BlobStore
+
+# Memory ceiling of the hydrated cartridges kept between requests
+CARTRIDGE_CACHE_BYTES = 512 * 1024 * 1024
+
+# Variable naming a blob store directory, binary files uploaded to any course are then stored once there and
+# hardlinked into the courses. It should be on the same filesystem as the working directory. Off when not set
+BLOB_STORE_ENV = "CARTRIDGE_BLOB_STORE"
+BLOB_STORE_DIR = os.environ.get(BLOB_STORE_ENV)
+
+# Shared across requests so hydrated cartridges stay in memory
+cartridge_service = CartridgeService(max_bytes=CARTRIDGE_CACHE_BYTES,
+                                     blob_store=BlobStore(BLOB_STORE_DIR) if BLOB_STORE_DIR else None)
 
 class Courses:
-    def __init__(self, working_dir: str = "cartridge_current_working_state"):
+    def __init__(self, working_dir: str = "cartridge_current_working_state", service: CartridgeService = None):
         self.working_dir = working_dir
-        self.python_bin = ".venv/bin/python"
-        self.cli_script = "cartridge_cli.py"
-    
-    def _run_command(self, args: List[str]) -> tuple[str, str, bool]:
-        """Run cartridge CLI command and return (stdout, stderr, success)"""
-        cmd = [self.python_bin, self.cli_script] + args
-        print(f"Running command: {' '.join(cmd)}")
-        
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            stdout = result.stdout.strip()
-            print(f"Command succeeded: {stdout}")
-            return stdout, "", True
-        except subprocess.CalledProcessError as e:
-            stderr = e.stderr.strip()
-            print(f"Command failed: {' '.join(cmd)}")
-            print(f"Error: {stderr}")
-            return "", stderr, False
-    
+        self.service = service or cartridge_service
+
     def _get_cartridge_path(self, course_name: str) -> str:
         """Get full path to cartridge directory"""
         return os.path.join(self.working_dir, course_name)
-    
+
     @property
     def courses(self) -> List[List]:
         """Get courses in the old format for compatibility"""
-        course_list = []
-        
-        if not os.path.exists(self.working_dir):
+        catalog = self.catalog_page(per_page=None)
+        return [[course["name"], course["modules"]] for course in catalog["courses"]]
+
+    def catalog_page(self, page: int = 1, per_page: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+        """Get a page of course summaries (title, code, modules and item counts) without loading the courses"""
+        return CourseCatalog(self.working_dir).page(page, per_page)
+
+    def course_modules(self, course_name: str) -> List[dict]:
+        """Get the modules of a course (title, item_count and items) from its summary record, without loading it"""
+        course_path = self._get_cartridge_path(course_name)
+        if not os.path.isdir(course_path):
             return []
-        
-        for course_name in os.listdir(self.working_dir):
-            course_path = self._get_cartridge_path(course_name)
-            if os.path.isdir(course_path):
-                # Get course data
-                output, error, success = self._run_command(["list", course_path, "--json"])
-                if success and output:
-                    try:
-                        course_data = json.loads(output)
-                        modules = []
-                        for module in course_data.get("modules", []):
-                            module_dict = {
-                                "title": module["title"],
-                                "items": []
-                            }
-                            for item in module.get("items", []):
-                                module_dict["items"].append({
-                                    "title": item["title"],
-                                    "content_type": item["content_type"],
-                                    "content": "placeholder content"
-                                })
-                            modules.append(module_dict)
-                        course_list.append([course_name, modules])
-                    except json.JSONDecodeError:
-                        course_list.append([course_name, []])
-        
-        return course_list
-    
+        return read_cartridge_summary(course_path)["modules"]
+
     @property
     def course_names(self) -> List[str]:
         """Get course names from directories"""
         if not os.path.exists(self.working_dir):
             return []
-        
-        return [name for name in os.listdir(self.working_dir) 
+
+        return [name for name in os.listdir(self.working_dir)
                 if os.path.isdir(os.path.join(self.working_dir, name))]
-    
+
     def add_course(self, course_name: str, title: str = None, code: str = None):
         """Create a new cartridge"""
         course_path = self._get_cartridge_path(course_name)
         if os.path.exists(course_path):
             return  # Course already exists
-        
-        # Create cartridge with CLI
-        args = ["create", course_path]
-        if title:
-            args.extend(["--title", title.strip()])
-        else:
-            args.extend(["--title", course_name.strip()])
-        if code:
-            args.extend(["--code", code.strip()])
-        else:
-            args.extend(["--code", course_name.strip().upper()])
-        
-        output, error, success = self._run_command(args)
-        return success, output if success else error
-    
+
+        title = title.strip() if title else course_name.strip()
+        code = code.strip() if code else course_name.strip().upper()
+
+        return self.service.create_cartridge(course_path, title, code)
+
     def update_course_name(self, old_name: str, new_name: str):
         """Rename a course directory"""
         old_path = self._get_cartridge_path(old_name)
         new_path = self._get_cartridge_path(new_name)
-        
+
         if os.path.exists(old_path) and not os.path.exists(new_path):
-            os.rename(old_path, new_path)
-    
+            self.service.rename_cartridge(old_path, new_path)
+
     def delete_course(self, course_name: str):
         """Delete a course and its cartridge"""
         course_path = self._get_cartridge_path(course_name)
         if os.path.exists(course_path):
-            import shutil
-            shutil.rmtree(course_path)
-    
+            self.service.delete_cartridge(course_path)
+
     def add_module(self, course_name: str, module_name: str):
         """Add a module to a cartridge"""
         course_path = self._get_cartridge_path(course_name)
         if not os.path.exists(course_path):
             return False, f"Course '{course_name}' not found"
-        
+
         # Get current modules to determine position
         modules = self.get_course_modules(course_name)
         position = len(modules) + 1
-        
-        output, error, success = self._run_command([
-            "add-module", course_path, 
-            "--title", module_name.strip(), 
-            "--position", str(position)
-        ])
-        return success, output if success else error
-    
+
+        return self.service.add_module(course_path, module_name.strip(), position=position)
+
     def update_module(self, course_name: str, current_title: str, new_title: str, position: int = None):
-        """Update a module using the cartridge CLI"""
+        """Update a module using the cartridge engine"""
         course_path = self._get_cartridge_path(course_name)
         if not os.path.exists(course_path):
             return False, f"Course '{course_name}' not found"
-        
-        # Build command arguments
-        args = [
-            "update-module", course_path,
-            "--title", current_title.strip(),
-            "--new-title", new_title.strip()
-        ]
-        
-        # Add position if provided
-        if position is not None:
-            args.extend(["--position", str(position)])
-        
-        output, error, success = self._run_command(args)
-        return success, output if success else error
-    
+
+        return self.service.update_module(course_path, current_title.strip(), new_title=new_title.strip(), position=position)
+
     def delete_module(self, course_name: str, module_name: str):
-        """Delete a module using the cartridge CLI"""
+        """Delete a module using the cartridge engine"""
         course_path = self._get_cartridge_path(course_name)
         if not os.path.exists(course_path):
             return False, f"Course '{course_name}' not found"
-        
-        output, error, success = self._run_command([
-            "delete-module", course_path,
-            "--title", module_name.strip()
-        ])
-        return success, output if success else error
-    
+
+        return self.service.delete_module(course_path, module_name.strip())
+
     def get_course_modules(self, course_name: str) -> List[dict]:
         """Get all modules for a specific course"""
         course_path = self._get_cartridge_path(course_name)
         if not os.path.exists(course_path):
             return []
-        
-        output, error, success = self._run_command(["list", course_path, "--json"])
-        if success and output:
-            try:
-                course_data = json.loads(output)
-                return course_data.get("modules", [])
-            except json.JSONDecodeError:
-                return []
-        return []
-    
+
+        try:
+            return self.service.get_modules(course_path)
+        except Exception as e:
+            print(f"Failed to load course '{course_name}': {e}")
+            return []
+
     def get_module_items(self, course_name: str, module_name: str) -> List[dict]:
         """Get all items for a specific module"""
         modules = self.get_course_modules(course_name)
@@ -179,171 +123,79 @@ class Courses:
             if module.get("title") == module_name:
                 return module.get("items", [])
         return []
-    
+
     def add_module_item(self, course_name: str, module_name: str, item_title: str, content_type: str, **kwargs):
         """Add an item to a specific module"""
         course_path = self._get_cartridge_path(course_name)
         if not os.path.exists(course_path):
             return False, f"Course '{course_name}' not found"
-        
+
         if content_type == "WikiPage":
-            output, error, success = self._run_command([
-                "add-wiki", course_path,
-                "--module", module_name.strip(),
-                "--title", item_title.strip(),
-                "--content", kwargs.get("content", "placeholder content").strip()
-            ])
-            return success, output if success else error
-            
+            item_kwargs = {"content": kwargs.get("content", "placeholder content").strip()}
         elif content_type == "Assignment":
-            output, error, success = self._run_command([
-                "add-assignment", course_path,
-                "--module", module_name.strip(),
-                "--title", item_title.strip(),
-                "--content", kwargs.get("content", "Assignment description").strip(),
-                "--points", str(kwargs.get("points", 10))
-            ])
-            return success, output if success else error
-            
+            item_kwargs = {"content": kwargs.get("content", "Assignment description").strip(), "points": int(kwargs.get("points", 10))}
         elif content_type == "DiscussionTopic":
-            output, error, success = self._run_command([
-                "add-discussion", course_path,
-                "--module", module_name.strip(),
-                "--title", item_title.strip(),
-                "--description", kwargs.get("description", "Discussion topic description").strip()
-            ])
-            return success, output if success else error
-            
+            item_kwargs = {"description": kwargs.get("description", "Discussion topic description").strip()}
         elif content_type == "File":
-            output, error, success = self._run_command([
-                "add-file", course_path,
-                "--module", module_name.strip(),
-                "--filename", item_title.strip(),
-                "--content", kwargs.get("content", "File content here").strip()
-            ])
-            return success, output if success else error
-            
+            item_kwargs = {"content": kwargs.get("content", "File content here").strip()}
         elif content_type == "Quiz":
-            output, error, success = self._run_command([
-                "add-quiz", course_path,
-                "--module", module_name.strip(),
-                "--title", item_title.strip(),
-                "--description", kwargs.get("description", "Quiz description").strip(),
-                "--points", str(kwargs.get("points", 10))
-            ])
-            return success, output if success else error
-            
-        return False, f"Unsupported content type: {content_type}"
-    
+            item_kwargs = {"description": kwargs.get("description", "Quiz description").strip(), "points": int(kwargs.get("points", 10))}
+        else:
+            return False, f"Unsupported content type: {content_type}"
+
+        return self.service.add_item(course_path, module_name.strip(), item_title.strip(), content_type, **item_kwargs)
+
+    def upload_module_file(self, course_name: str, module_name: str, filename: str, stream):
+        """Add an uploaded file to a specific module, its bytes are streamed from the given file object as they are"""
+        course_path = self._get_cartridge_path(course_name)
+        if not os.path.exists(course_path):
+            return False, f"Course '{course_name}' not found"
+
+        # Only the name of the uploaded file is kept, never a path
+        filename = os.path.basename((filename or "").replace("\\", "/")).strip()
+        if not filename:
+            return False, "No file uploaded"
+
+        return self.service.add_item(course_path, module_name.strip(), filename, "File", content=stream)
+
     def delete_module_item(self, course_name: str, module_name: str, item_title: str, content_type: str):
         """Delete an item from a specific module"""
         course_path = self._get_cartridge_path(course_name)
         if not os.path.exists(course_path):
             return False, f"Course '{course_name}' not found"
-        
-        if content_type == "WikiPage":
-            output, error, success = self._run_command([
-                "delete-wiki", course_path,
-                "--title", item_title.strip()
-            ])
-            return success, output if success else error
-            
-        elif content_type == "Assignment":
-            output, error, success = self._run_command([
-                "delete-assignment", course_path,
-                "--title", item_title.strip()
-            ])
-            return success, output if success else error
-            
-        elif content_type == "DiscussionTopic":
-            output, error, success = self._run_command([
-                "delete-discussion", course_path,
-                "--title", item_title.strip()
-            ])
-            return success, output if success else error
-            
-        elif content_type == "File":
-            output, error, success = self._run_command([
-                "delete-file", course_path,
-                "--filename", item_title.strip()
-            ])
-            return success, output if success else error
-            
-        elif content_type == "Quiz":
-            output, error, success = self._run_command([
-                "delete-quiz", course_path,
-                "--title", item_title.strip()
-            ])
-            return success, output if success else error
-            
-        return False, f"Unsupported content type: {content_type}"
-    
+
+        if content_type not in CartridgeService.FINDERS:
+            return False, f"Unsupported content type: {content_type}"
+
+        return self.service.delete_item(course_path, item_title.strip(), content_type)
+
     def update_module_item(self, course_name: str, module_name: str, old_item_title: str, content_type: str, **kwargs):
         """Update an item in a specific module"""
         course_path = self._get_cartridge_path(course_name)
         if not os.path.exists(course_path):
             return False, f"Course '{course_name}' not found"
-        
-        if content_type == "WikiPage":
-            args = ["update-wiki", course_path, "--title", old_item_title.strip()]
-            if kwargs.get("new_title"):
-                args.extend(["--new-title", kwargs["new_title"].strip()])
-            if kwargs.get("content"):
-                args.extend(["--content", kwargs["content"].strip()])
-            if kwargs.get("position") is not None:
-                args.extend(["--position", str(kwargs["position"])])
-                
-        elif content_type == "Assignment":
-            args = ["update-assignment", course_path, "--title", old_item_title.strip()]
-            if kwargs.get("new_title"):
-                args.extend(["--new-title", kwargs["new_title"].strip()])
-            if kwargs.get("content"):
-                args.extend(["--content", kwargs["content"].strip()])
-            if kwargs.get("points") is not None:
-                args.extend(["--points", str(int(kwargs["points"]))])
-            if kwargs.get("position") is not None:
-                args.extend(["--position", str(kwargs["position"])])
-                
-        elif content_type == "DiscussionTopic":
-            args = ["update-discussion", course_path, "--title", old_item_title.strip()]
-            if kwargs.get("new_title"):
-                args.extend(["--new-title", kwargs["new_title"].strip()])
-            if kwargs.get("content"):
-                args.extend(["--content", kwargs["content"].strip()])
-            if kwargs.get("position") is not None:
-                args.extend(["--position", str(kwargs["position"])])
-                
-        elif content_type == "Quiz":
-            args = ["update-quiz", course_path, "--title", old_item_title.strip()]
-            if kwargs.get("new_title"):
-                args.extend(["--new-title", kwargs["new_title"].strip()])
-            if kwargs.get("description"):
-                args.extend(["--description", kwargs["description"].strip()])
-            if kwargs.get("points") is not None:
-                args.extend(["--points", str( int(kwargs["points"]) ) ])
-            if kwargs.get("position") is not None:
-                args.extend(["--position", str(kwargs["position"])])
-                
-        elif content_type == "File":
-            args = ["update-file", course_path, "--filename", old_item_title.strip()]
-            if kwargs.get("new_filename"):
-                args.extend(["--new-filename", kwargs["new_filename"].strip()])
-            if kwargs.get("content"):
-                args.extend(["--content", kwargs["content"].strip()])
-            if kwargs.get("position") is not None:
-                args.extend(["--position", str(kwargs["position"])])
-        else:
+
+        if content_type not in CartridgeService.FINDERS:
             return False, f"Unsupported content type: {content_type}"
-        
-        output, error, success = self._run_command(args)
-        return success, output if success else error
-    
+
+        # Only pass fields that were actually provided, like the CLI flags did
+        item_kwargs = {}
+        for field in ["new_title", "content", "description", "new_filename"]:
+            if kwargs.get(field):
+                item_kwargs[field] = kwargs[field].strip()
+        if kwargs.get("points") is not None and content_type in ["Assignment", "Quiz"]:
+            item_kwargs["points"] = int(kwargs["points"])
+        if kwargs.get("position") is not None:
+            item_kwargs["position"] = int(kwargs["position"])
+
+        return self.service.update_item(course_path, old_item_title.strip(), content_type, **item_kwargs)
+
     def get_item_details(self, course_name: str, module_name: str, item_title: str, content_type: str = None) -> Dict[str, Any]:
         """Get detailed information about a specific item"""
         course_path = self._get_cartridge_path(course_name)
         if not os.path.exists(course_path):
             return {}
-        
+
         # If no content_type provided, try to find it from module items
         if not content_type:
             module_items = self.get_module_items(course_name, module_name)
@@ -351,79 +203,28 @@ class Courses:
                 if item.get("title") == item_title:
                     content_type = item.get("content_type")
                     break
-        
-        if not content_type:
+
+        if content_type not in CartridgeService.FINDERS:
             return {}
-        
-        # Map content types to CLI commands
-        command_map = {
-            "WikiPage": ["display-wiki", "--title", item_title.strip()],
-            "Assignment": ["display-assignment", "--title", item_title.strip()],
-            "DiscussionTopic": ["display-discussion", "--title", item_title.strip()],
-            "Quiz": ["display-quiz", "--title", item_title.strip()],
-            "File": ["display-file", "--filename", item_title.strip()]
-        }
-        
-        command_args = command_map.get(content_type)
-        if not command_args:
+
+        try:
+            data = self.service.get_item_details(course_path, item_title.strip(), content_type)
+        except Exception as e:
+            print(f"Failed to get item details: {e}")
             return {}
-        
-        output, error, success = self._run_command([command_args[0], course_path] + command_args[1:])
-        
-        if success and output:
-            try:
-                data = json.loads(output)
-                # Ensure content_type is included in the response
-                data["content_type"] = content_type
-                return data
-            except json.JSONDecodeError:
-                return {}
-        return {}
-    
+
+        # Ensure content_type is included in the response
+        data = dict(data)
+        data["content_type"] = content_type
+        return data
+
     def copy_item(self, course_name: str, item_title: str, target_module: str, content_type: str):
         """Copy an item to a different module"""
         course_path = self._get_cartridge_path(course_name)
         if not os.path.exists(course_path):
             return False, f"Course '{course_name}' not found"
-        
-        if content_type == "WikiPage":
-            output, error, success = self._run_command([
-                "copy-wiki", course_path,
-                "--title", item_title.strip(),
-                "--target-module", target_module.strip()
-            ])
-            return success, output if success else error
-            
-        elif content_type == "Assignment":
-            output, error, success = self._run_command([
-                "copy-assignment", course_path,
-                "--title", item_title.strip(),
-                "--target-module", target_module.strip()
-            ])
-            return success, output if success else error
-            
-        elif content_type == "DiscussionTopic":
-            output, error, success = self._run_command([
-                "copy-discussion", course_path,
-                "--title", item_title.strip(),
-                "--target-module", target_module.strip()
-            ])
-            return success, output if success else error
-            
-        elif content_type == "File":
-            output, error, success = self._run_command([
-                "copy-file", course_path,
-                "--filename", item_title.strip(),
-                "--target-module", target_module.strip()
-            ])
-            return success, output if success else error
-            
-        elif content_type == "Quiz":
-            output, error, success = self._run_command([
-                "copy-quiz", course_path,
-                "--title", item_title.strip(),
-                "--target-module", target_module.strip()
-            ])
-            return success, output if success else error
-            
-        return False, f"Unsupported content type: {content_type}"
\ No newline at end of file
+
+        if content_type not in CartridgeService.FINDERS:
+            return False, f"Unsupported content type: {content_type}"
+
+        return self.service.copy_item(course_path, item_title.strip(), target_module.strip(), content_type)